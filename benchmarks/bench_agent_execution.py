@@ -0,0 +1,79 @@
+"""
+无工具 Agent 执行方式基准测试
+
+用零延迟的 FakeListChatModel 代替真实模型，测得的耗时全部是框架开销；
+比较 ReplyAgent / AnalysisAgent 在 agent_executor 与 pipeline 两种执行方式下的单次调用耗时
+
+运行: python benchmarks/bench_agent_execution.py
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.agents.reply_agent import ReplyAgent
+from src.agents.analysis_agent import AnalysisAgent
+from src.memory.brainchain import BrainChainMemory
+
+CALLS = 200
+REPLY = json.dumps({"host_reply": "是的", "reply_type": "yes", "notes": "与谜底一致"}, ensure_ascii=False)
+ANALYSIS = json.dumps({"analysis_note": "方向正确", "path_similarity": 0.6}, ensure_ascii=False)
+
+
+def build_memory() -> BrainChainMemory:
+    memory = BrainChainMemory()
+    chain_id = memory.create_chain()
+    for i in range(8):
+        memory.add_node(
+            content=f"第 {i} 个问题：他是司机吗？", chain_id=chain_id, parent_id=memory.current_focus_id,
+            host_reply="是", reply_type="yes", notes=""
+        )
+    return memory
+
+
+def build_agent(name: str, execution: str):
+    if name == "ReplyAgent":
+        llm = FakeListChatModel(responses=[REPLY])
+        return ReplyAgent(llm=llm, memory=build_memory(), execution=execution)
+    # memory 未设置谜底评分器，AnalysisAgent 每次都会调用模型
+    llm = FakeListChatModel(responses=[ANALYSIS])
+    return AnalysisAgent(llm=llm, memory=build_memory(), execution=execution)
+
+
+async def measure(name: str, execution: str) -> float:
+    """返回平均单次调用耗时（毫秒）"""
+    agent = build_agent(name, execution)
+    inputs = {"current_question": "他是司机吗？", "true_answer": "他是司机"}
+    await agent.run(inputs)  # 预热
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        await agent.run(inputs)
+    return (time.perf_counter() - start) / CALLS * 1000
+
+
+async def main():
+    logging.disable(logging.WARNING)
+    # AgentExecutor 的 verbose 输出会写到标准输出，计时期间丢弃
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        rows = []
+        for name in ("ReplyAgent", "AnalysisAgent"):
+            executor_ms = await measure(name, "agent_executor")
+            pipeline_ms = await measure(name, "pipeline")
+            rows.append((name, executor_ms, pipeline_ms))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    print(f"每种方式调用 {CALLS} 次，模型零延迟，耗时即框架开销\n")
+    for name, executor_ms, pipeline_ms in rows:
+        print(f"{name:<14} | agent_executor {executor_ms:.2f}ms | pipeline {pipeline_ms:.2f}ms "
+              f"| 每次调用减少 {executor_ms - pipeline_ms:.2f}ms ({1 - pipeline_ms / executor_ms:.1%})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+SQLite 检查点基准测试
+
+先写入 100k 个等待玩家输入的会话检查点（完整 GameState），再在这个规模下测量：
+- 写入: 只有少数通道变化的增量写入 vs 全部通道重写
+- 读取: 按 game_id 随机读取最新检查点
+- 恢复: 从检查点恢复任意一局并跑完一个回合
+
+运行: python benchmarks/bench_checkpointer.py [会话数]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langgraph.types import Command
+from langgraph.checkpoint.base.id import uuid6
+from src.utils.checkpointer import SqliteCheckpointSaver
+from src.workflow import build_graph, build_workflow_nodes, session_config
+from src.state_schema import GameState
+
+SESSIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+SAMPLES = 2_000
+
+
+def thread_config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+
+
+async def park_template(saver: SqliteCheckpointSaver):
+    """跑一次流程图得到一个真实的挂起检查点，作为批量写入的模板"""
+    config = session_config(build_workflow_nodes(), "template")
+    await build_graph(checkpointer=saver).ainvoke(GameState(player_action="None").model_dump(), config)
+    return saver.get_tuple(config)
+
+
+def put(saver, thread_id: str, template, versions: dict) -> None:
+    checkpoint = {**template.checkpoint, "id": str(uuid6())}
+    saver.put(thread_config(thread_id), checkpoint, template.metadata, versions)
+
+
+def per_call_us(func, items) -> float:
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+async def main():
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "checkpoints.sqlite"
+        saver = SqliteCheckpointSaver(path)
+        template = await park_template(saver)
+        full_versions = template.checkpoint["channel_versions"]
+        delta_channels = ["current_question", "current_host_reply"]
+        delta_versions = {k: full_versions[k] for k in delta_channels if k in full_versions}
+
+        start = time.perf_counter()
+        for i in range(SESSIONS):
+            put(saver, f"game_{i}", template, full_versions)
+        fill = (time.perf_counter() - start) / SESSIONS * 1e6
+
+        sample = [f"game_{random.randrange(SESSIONS)}" for _ in range(SAMPLES)]
+        write_full = per_call_us(lambda t: put(saver, t, template, full_versions), sample)
+        write_delta = per_call_us(lambda t: put(saver, t, template, delta_versions), sample)
+        read = per_call_us(lambda t: saver.get_tuple(thread_config(t)), sample)
+
+        graph = build_graph(checkpointer=saver)
+        nodes = build_workflow_nodes()
+        resume = {"player_action": "question", "current_question": "他是司机吗？"}
+        start = time.perf_counter()
+        for thread_id in sample[:200]:
+            await graph.ainvoke(Command(resume=resume), session_config(nodes, thread_id))
+        turn = (time.perf_counter() - start) / 200 * 1000
+
+        saver._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        size = path.stat().st_size / 1024 / 1024
+        print(f"已保存 {saver.thread_count} 个会话，每个会话 {len(full_versions)} 个通道，数据库 {size:.1f}MB\n")
+        print(f"{'批量写入（全部通道）':<18} | 平均 {fill:.0f}µs")
+        print(f"{'写入（全部通道）':<18} | 平均 {write_full:.0f}µs")
+        print(f"{'写入（{} 个通道变化）'.format(len(delta_versions)):<18} | 平均 {write_delta:.0f}µs")
+        print(f"{'读取最新检查点':<18} | 平均 {read:.0f}µs")
+        print(f"{'恢复并跑完一回合':<18} | 平均 {turn:.2f}ms（mock Agent）")
+        saver.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
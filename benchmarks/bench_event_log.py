@@ -0,0 +1,88 @@
+"""
+思维链持久化基准测试
+
+每回合加一个节点后保存一次，对比:
+- save_to_file: 每回合整体重写 GameContext JSON，代价随节点数线性增长（整局为平方级）
+- event_log: 每回合追加一行事件，快照间隔至少 snapshot_every 条事件并随快照规模增长
+
+运行: python benchmarks/bench_event_log.py
+"""
+import os
+import sys
+import time
+import logging
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.context import GameContext, Story
+from src.memory.event_log import BrainChainEventLog
+from src.config import CONTEXT_CONFIG
+
+TURNS = 2_000
+CHECKPOINTS = (100, 1_000, 2_000)
+REPLIES = ["yes", "no", "irrelevant"]
+
+
+def make_context() -> GameContext:
+    return GameContext(
+        game_id="game_001",
+        story=Story(
+            story_id="story_001",
+            content="一个男人上了公交车，车上有很多空位。他选择了一个座位坐下，但很快就下车了。为什么？",
+            answer="这个男人是公交车司机，他下班了。"
+        )
+    )
+
+
+def play_turn(context: GameContext, i: int) -> None:
+    memory = context.brain_chain
+    if i % 10 == 0:
+        memory.create_chain()
+    chain_id = memory.current_chain_id
+    memory.add_node(
+        content=f"问题{i}：他是不是在车上见过什么人？", chain_id=chain_id,
+        parent_id=memory.brainchains[chain_id].current_focus_id,
+        host_reply="是的", reply_type=REPLIES[i % 3], notes=""
+    )
+
+
+def measure(save, context: GameContext) -> dict:
+    """
+    返回 {回合数: 最近 100 回合的平均耗时（毫秒）}，包含加节点与保存，事件日志在加节点时写入；
+    "total" 为整局合计耗时（毫秒）
+    """
+    window, costs = [], {}
+    for i in range(TURNS):
+        start = time.perf_counter()
+        play_turn(context, i)
+        save(context)
+        window.append(time.perf_counter() - start)
+        if i + 1 in CHECKPOINTS:
+            costs[i + 1] = sum(window[-100:]) / len(window[-100:]) * 1000
+    costs["total"] = sum(window) * 1000
+    return costs
+
+
+def main():
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "game_001.json"
+        full = measure(lambda context: context.save_to_file(str(path)), make_context())
+
+        context = make_context()
+        context.brain_chain.attach_event_log(BrainChainEventLog(Path(tmp) / "game_001.jsonl"))
+        incremental = measure(lambda context: None, context)
+        in_memory = measure(lambda context: None, make_context())
+
+    snapshot_every = CONTEXT_CONFIG["event_log"]["snapshot_every"]
+    print(f"每回合加一个节点并保存，共 {TURNS} 回合，数值为最近 100 回合的平均耗时")
+    print(f"event_log 快照间隔至少 {snapshot_every} 条事件，快照耗时已摊入；不保存为只加节点的基线\n")
+    print(f"{'回合':>6} | {'不保存':>10} | {'save_to_file':>14} | {'event_log':>12}")
+    for turn in CHECKPOINTS:
+        print(f"{turn:>6} | {in_memory[turn]:>8.3f}ms | {full[turn]:>12.3f}ms | {incremental[turn]:>10.3f}ms")
+    print(f"{'整局合计':>4} | {in_memory['total']:>8.0f}ms | {full['total']:>12.0f}ms | {incremental['total']:>10.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+融合回合基准测试
+
+用带固定延迟的 Mock Agent 模拟 LLM 调用，比较提问回合在 multi_agent 与 fused
+两种模式下的单回合延迟和模型调用次数；fused 模式按给定比例模拟校验失败后的回退
+
+运行: python benchmarks/bench_fused_turn.py
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.workflow import build_graph
+from src.state_schema import GameState
+from src.mock_data import (
+    MockReplyAgent,
+    MockStructureAgent,
+    MockAnalysisAgent,
+    MockDetectionAgent,
+    MockStuckDetector,
+    MockFusedTurnAgent,
+)
+
+# 模拟的单次 LLM 调用延迟（秒）
+LATENCY = {
+    "reply": 0.30,
+    "structure": 0.25,
+    "analysis": 0.35,
+    "detection": 0.40,
+    "stuck": 0.30,
+    # 融合输出更长，单次调用比回复略慢
+    "fused": 0.45,
+}
+TURNS = 10
+FALLBACK_RATES = (0.0, 0.1, 0.3)
+
+
+def delayed(mock_cls, latency: float, calls: list):
+    """为 Mock 组件的 run 加上固定延迟，并记录调用次数"""
+    class Delayed(mock_cls):
+        async def run(self, state):
+            calls.append(mock_cls.__name__)
+            await asyncio.sleep(latency)
+            return await super().run(state)
+    return Delayed()
+
+
+def flaky_fused(calls: list, fallback_rate: float):
+    """每 1/fallback_rate 回合输出一次未通过校验的结果"""
+    turn = {"n": 0}
+
+    class Flaky(MockFusedTurnAgent):
+        async def run(self, state):
+            calls.append("MockFusedTurnAgent")
+            await asyncio.sleep(LATENCY["fused"])
+            turn["n"] += 1
+            if fallback_rate and turn["n"] % round(1 / fallback_rate) == 0:
+                return {"valid": False}
+            return await super().run(state)
+    return Flaky()
+
+
+async def measure(turn_mode: str, fallback_rate: float = 0.0):
+    """返回 (平均单回合耗时, 平均单回合模型调用次数)"""
+    calls = []
+    graph = build_graph(
+        reply_agent=delayed(MockReplyAgent, LATENCY["reply"], calls),
+        structure_agent=delayed(MockStructureAgent, LATENCY["structure"], calls),
+        analysis_agent=delayed(MockAnalysisAgent, LATENCY["analysis"], calls),
+        detection_agent=delayed(MockDetectionAgent, LATENCY["detection"], calls),
+        stuck_detector=delayed(MockStuckDetector, LATENCY["stuck"], calls),
+        fused_agent=flaky_fused(calls, fallback_rate),
+        turn_mode=turn_mode,
+    )
+    state = GameState(player_action="question", current_question="他是司机吗？").model_dump()
+    start = time.perf_counter()
+    for _ in range(TURNS):
+        await graph.ainvoke(state)
+    return (time.perf_counter() - start) / TURNS, len(calls) / TURNS
+
+
+async def main():
+    logging.disable(logging.WARNING)
+    print(f"模拟延迟(秒): {LATENCY}\n")
+    baseline, baseline_calls = await measure("multi_agent")
+    print(f"{'multi_agent':<22} | 平均每回合 {baseline:.3f}s | 模型调用 {baseline_calls:.1f} 次")
+    for rate in FALLBACK_RATES:
+        latency, calls = await measure("fused", rate)
+        label = f"fused (回退 {rate:.0%})"
+        print(f"{label:<20} | 平均每回合 {latency:.3f}s | 模型调用 {calls:.1f} 次 "
+              f"| 比 multi_agent 节省 {1 - latency / baseline:.1%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+"""
+思维链节点存储基准测试
+
+对比原先的 {node_id: BrainNode} 字典（每次添加都做 pydantic 校验）
+与 NodeStore 列式紧凑存储在 100k 节点下的内存占用与写入吞吐
+
+运行: python benchmarks/bench_node_store.py
+"""
+import os
+import sys
+import gc
+import time
+import uuid
+import tracemalloc
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.memory.brainchain import BrainNode
+from src.memory.node_store import NodeStore
+
+NODE_COUNT = 100_000
+REPLIES = [("是的", "yes"), ("不是", "no"), ("与此无关", "irrelevant")]
+
+
+def make_rows(count: int):
+    """预先生成节点字段，避免把数据生成计入测量"""
+    rows = []
+    parent_id = None
+    for i in range(count):
+        node_id = str(uuid.uuid4())
+        host_reply, reply_type = REPLIES[i % 3]
+        rows.append((node_id, f"问题{i}：他是不是在车上？", float(i), parent_id, host_reply, reply_type, ""))
+        parent_id = node_id if i % 10 else None
+    return rows
+
+
+def fill_dict(rows):
+    nodes = {}
+    for node_id, content, ts, parent_id, host_reply, reply_type, notes in rows:
+        nodes[node_id] = BrainNode(
+            id=node_id, content=content, timestamp=ts, parent_id=parent_id,
+            host_reply=host_reply, reply_type=reply_type, notes=notes
+        )
+    return nodes
+
+
+def fill_store(rows):
+    store = NodeStore()
+    for row in rows:
+        store.append(*row)
+    return store
+
+
+def measure(fill, rows):
+    """返回 (写入耗时秒, 常驻内存字节)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    container = fill(rows)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del container
+    return elapsed, current
+
+
+def main():
+    rows = make_rows(NODE_COUNT)
+    print(f"节点数: {NODE_COUNT:,}")
+    print(f"{'存储':<22} | {'写入(节点/秒)':>14} | {'内存(MB)':>10} | {'字节/节点':>10}")
+    results = {}
+    for name, fill in (("dict[str, BrainNode]", fill_dict), ("NodeStore", fill_store)):
+        elapsed, current = measure(fill, rows)
+        results[name] = (elapsed, current)
+        print(f"{name:<22} | {NODE_COUNT / elapsed:>14,.0f} | {current / 2**20:>10.1f} | {current / NODE_COUNT:>10.0f}")
+    (t_dict, m_dict), (t_store, m_store) = results.values()
+    print(f"\n内存降低: {m_dict / m_store:.1f}x，写入加速: {t_dict / t_store:.1f}x")
+    print("（字符串内容由两种存储共享引用，统计的是容器自身新增的内存）")
+
+
+if __name__ == "__main__":
+    main()
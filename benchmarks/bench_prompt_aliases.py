@@ -0,0 +1,74 @@
+"""
+思维链提示词短别名基准测试
+
+回放 benchmarks/data/recorded_sessions.json 中记录的对局，
+统计每回合提示词中思维链部分在 full 与 compact 两种格式下的 token 数（本地估算）
+
+运行: python benchmarks/bench_prompt_aliases.py
+"""
+import os
+import sys
+import json
+import logging
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.memory.brainchain import BrainChainMemory
+from src.utils.token_utils import estimate_tokens
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "recorded_sessions.json")
+
+
+def replay(session, on_turn):
+    """按记录回放一局游戏，每回合结束后回调 on_turn(memory)"""
+    memory = BrainChainMemory()
+    chains, node_ids = [], []
+    for turn in session["turns"]:
+        structure_type = turn["structure_type"]
+        parent_id = None
+        if structure_type == "new":
+            chain_id = memory.create_chain()
+            chains.append(chain_id)
+        elif structure_type == "old":
+            chain_id = chains[turn["chain"]]
+            memory.current_chain_id = chain_id
+            parent_id = node_ids[turn["parent"]]
+        else:
+            chain_id = memory.current_chain_id
+            parent_id = memory.current_focus_id
+        node_ids.append(memory.add_node(
+            content=turn["question"],
+            chain_id=chain_id,
+            parent_id=parent_id,
+            host_reply=turn["host_reply"],
+            reply_type=turn["reply_type"],
+            notes=turn["notes"]
+        ))
+        on_turn(memory)
+
+
+def main():
+    logging.disable(logging.WARNING)
+    with open(DATA_PATH, "r", encoding="utf-8") as f:
+        sessions = json.load(f)
+
+    print(f"{'对局':<10} | {'回合':>4} | {'full(tokens)':>12} | {'compact(tokens)':>15} | {'节省':>6}")
+    total = {"full": 0, "compact": 0}
+    for session in sessions:
+        counts = {"full": 0, "compact": 0}
+
+        def on_turn(memory):
+            for prompt_format in counts:
+                counts[prompt_format] += estimate_tokens(memory.summarize_brainchains(prompt_format))
+
+        replay(session, on_turn)
+        for prompt_format in counts:
+            total[prompt_format] += counts[prompt_format]
+        saved = 1 - counts["compact"] / counts["full"]
+        print(f"{session['story_id']:<10} | {len(session['turns']):>4} | {counts['full']:>12} | {counts['compact']:>15} | {saved:>6.1%}")
+    saved = 1 - total["compact"] / total["full"]
+    print(f"{'合计':<10} | {'':>4} | {total['full']:>12} | {total['compact']:>15} | {saved:>6.1%}")
+    print("（每回合统计一次完整思维链摘要，即提示词中随对局增长的部分）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+开放式问题规则分类评估
+
+在人工标注的问题集上计算不同置信度阈值下的 precision / recall：
+precision 低意味着封闭式问题被误拦截（玩家收到错误的 error 回复），
+recall 低只意味着更多开放式问题交给 ReplyAgent 判断
+
+运行: python benchmarks/bench_question_rules.py
+"""
+import os
+import sys
+import json
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils.question_rules import classify_question
+from src.config import WORKFLOW_CONFIG
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "labeled_questions.json")
+THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95)
+
+
+def evaluate(samples, threshold: float):
+    """返回 (precision, recall, 误拦截的问题, 漏判的问题)"""
+    tp, false_positives, false_negatives = 0, [], []
+    for sample in samples:
+        predicted = classify_question(sample["question"], threshold).is_open
+        actual = sample["label"] == "open"
+        if predicted and actual:
+            tp += 1
+        elif predicted:
+            false_positives.append(sample["question"])
+        elif actual:
+            false_negatives.append(sample["question"])
+    predicted_open = tp + len(false_positives)
+    actual_open = tp + len(false_negatives)
+    precision = tp / predicted_open if predicted_open else 1.0
+    recall = tp / actual_open if actual_open else 1.0
+    return precision, recall, false_positives, false_negatives
+
+
+def main():
+    with open(DATA_PATH, encoding="utf-8") as f:
+        samples = json.load(f)
+    default = WORKFLOW_CONFIG["open_question_threshold"]
+    print(f"标注问题 {len(samples)} 条，其中开放式 {sum(s['label'] == 'open' for s in samples)} 条\n")
+    print(f"{'threshold':>9} | {'precision':>9} | {'recall':>6}")
+    for threshold in THRESHOLDS:
+        precision, recall, _, _ = evaluate(samples, threshold)
+        mark = "  <- 当前配置" if threshold == default else ""
+        print(f"{threshold:>9.2f} | {precision:>9.1%} | {recall:>6.1%}{mark}")
+
+    _, _, false_positives, false_negatives = evaluate(samples, default)
+    print(f"\n阈值 {default} 下误拦截的封闭式问题: {false_positives or '无'}")
+    print(f"阈值 {default} 下交给 ReplyAgent 的开放式问题: {false_negatives or '无'}")
+
+
+if __name__ == "__main__":
+    main()
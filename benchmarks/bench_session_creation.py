@@ -0,0 +1,64 @@
+"""
+会话创建基准测试
+
+cold: 每个会话新建一个 RuntimeFactory，相当于每局游戏都重新编译流程图、构建流水线和读取模板
+warm: 所有会话共用进程级 RuntimeFactory，只创建记忆与轻量 Agent 包装
+
+运行: python benchmarks/bench_session_creation.py
+"""
+import os
+import sys
+import time
+import logging
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.runtime import RuntimeFactory
+from src.context import GameContext, Story
+from src.tools.hint_generator import load_hint_templates
+
+SESSIONS = 50
+
+
+def make_context(i: int) -> GameContext:
+    return GameContext(
+        game_id=f"game_{i:03d}",
+        story=Story(
+            story_id="story_001",
+            content="一个男人上了公交车，车上有很多空位。他选择了一个座位坐下，但很快就下车了。为什么？",
+            answer="这个男人是公交车司机，他下班了。"
+        )
+    )
+
+
+def measure_cold() -> float:
+    """返回平均单个会话创建耗时（毫秒）"""
+    llm = FakeListChatModel(responses=["{}"])
+    start = time.perf_counter()
+    for i in range(SESSIONS):
+        load_hint_templates.cache_clear()
+        RuntimeFactory(llm).create_session(make_context(i))
+    return (time.perf_counter() - start) / SESSIONS * 1000
+
+
+def measure_warm() -> float:
+    """返回平均单个会话创建耗时（毫秒），不含一次性的工厂构建"""
+    factory = RuntimeFactory(FakeListChatModel(responses=["{}"]))
+    start = time.perf_counter()
+    for i in range(SESSIONS):
+        factory.create_session(make_context(i))
+    return (time.perf_counter() - start) / SESSIONS * 1000
+
+
+def main():
+    logging.disable(logging.WARNING)
+    measure_warm()  # 预热导入与故事级缓存
+    cold = measure_cold()
+    warm = measure_warm()
+    print(f"每种方式创建 {SESSIONS} 个会话\n")
+    print(f"{'cold（每局重建）':<16} | 平均每个会话 {cold:.2f}ms")
+    print(f"{'warm（共享工厂）':<16} | 平均每个会话 {warm:.2f}ms | 减少 {1 - warm / cold:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+state_history 存储基准测试
+
+对比每回合保存完整 GameState 副本（深拷贝，与后续回合互不影响）的 List[GameState]
+与关键帧 + 差分的 StateHistory：常驻内存、存档 JSON 大小、单回合追加耗时与随机读取耗时。
+消息按 add_messages 的行为逐回合累积，是差分收益最大、重建代价也最高的情形
+
+运行: python benchmarks/bench_state_history.py
+"""
+import os
+import sys
+import gc
+import json
+import time
+import random
+import tracemalloc
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_core.messages import AIMessage, HumanMessage
+from src.memory.state_history import StateHistory
+from src.state_schema import GameState
+
+TURNS = 500
+
+
+def make_states(turns: int):
+    """消息逐回合累积（add_messages 的行为），其余字段每回合部分变化"""
+    states, messages = [], []
+    for i in range(turns):
+        question = f"问题{i}：他是不是在车上见过什么人？"
+        messages = messages + [HumanMessage(content=question), AIMessage(content="是的")]
+        states.append(GameState(
+            player_action="question",
+            game_id="game_001",
+            messages=messages,
+            current_question=question,
+            current_host_reply="是的",
+            current_reply_type="yes",
+            current_brain_context="当前思维链: 他是司机吗？ -> 是的；他上车时车上有乘客吗？ -> 不是",
+            detection_result={"path_similarity": i / TURNS, "is_deviated": False, "is_looping": False},
+        ))
+    return states
+
+
+def measure(fill, states):
+    """返回 (容器, 常驻内存字节, 平均追加微秒)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    container = fill(states)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return container, current, elapsed / len(states) * 1e6
+
+
+def fill_list(states):
+    return [state.model_copy(deep=True) for state in states]
+
+
+def fill_history(states):
+    history = StateHistory()
+    for state in states:
+        history.append(state)
+    return history
+
+
+def main():
+    states = make_states(TURNS)
+    full, full_mem, full_append = measure(fill_list, states)
+    history, delta_mem, delta_append = measure(fill_history, states)
+
+    full_size = len(json.dumps([s.model_dump(mode="json") for s in full], ensure_ascii=False).encode("utf-8"))
+    delta_size = len(json.dumps(history.to_dict(), ensure_ascii=False).encode("utf-8"))
+
+    indices = [random.randrange(TURNS) for _ in range(200)]
+    start = time.perf_counter()
+    for i in indices:
+        history[i]
+    random_read = (time.perf_counter() - start) / len(indices) * 1e6
+    start = time.perf_counter()
+    for _ in history:
+        pass
+    stream = (time.perf_counter() - start) / TURNS * 1e6
+
+    print(f"{TURNS} 回合，关键帧间隔 {history.keyframe_every}\n")
+    print(f"{'List[GameState]':<16} | 内存 {full_mem / 1024 / 1024:7.1f}MB | 存档 {full_size / 1024 / 1024:7.1f}MB | 追加 {full_append:6.0f}µs")
+    print(f"{'StateHistory':<16} | 内存 {delta_mem / 1024 / 1024:7.1f}MB | 存档 {delta_size / 1024 / 1024:7.1f}MB | 追加 {delta_append:6.0f}µs")
+    print(f"\nStateHistory 随机读取 {random_read:.0f}µs / 回合，顺序遍历 {stream:.0f}µs / 回合")
+
+
+if __name__ == "__main__":
+    main()
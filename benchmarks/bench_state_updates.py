@@ -0,0 +1,112 @@
+"""
+状态更新与 Agent 输入的分配基准测试
+
+before: 每回合构建 GameState 再 model_dump 作为初始状态，每个 Agent 节点 dict(state) 复制整份状态，
+        copy_with_updates 走 dict() → update → 全量校验
+after:  初始状态由控制器模板浅拷贝得到，Agent 拿到只读投影，copy_with_updates 为 model_copy(update=...)
+
+用 tracemalloc 统计每回合的分配次数（新分配的内存块数）与分配字节数
+
+运行: python benchmarks/bench_state_updates.py
+"""
+import os
+import sys
+import gc
+import time
+import tracemalloc
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.state_schema import GameState
+from src.game_controller import GameController
+from src.context import GameContext, Story
+from src.utils.state_utils import AnalysisView, DetectionView, ReplyView, StructureView
+from src.mock_data import (
+    MockReplyAgent,
+    MockStructureAgent,
+    MockAnalysisAgent,
+    MockDetectionAgent,
+    MockStuckDetector,
+    MockHintTool,
+)
+
+TURNS = 2_000
+ANSWER = "这个男人是公交车司机，他下班了。"
+
+
+def make_controller() -> GameController:
+    context = GameContext(
+        game_id="game_001",
+        story=Story(story_id="story_001", content="一个男人上了公交车……", answer=ANSWER)
+    )
+    return GameController(
+        reply_agent=MockReplyAgent(),
+        structure_agent=MockStructureAgent(),
+        analysis_agent=MockAnalysisAgent(),
+        detection_agent=MockDetectionAgent(),
+        hint_tool=MockHintTool(),
+        stuck_detector=MockStuckDetector(),
+        context=context
+    )
+
+
+def turn_before(node_state: GameState, i: int):
+    """原先一回合中的状态处理"""
+    initial = GameState(player_action="question", current_question=f"问题{i}", current_answer=None, true_answer=ANSWER)
+    inputs = initial.model_dump()
+    agent_inputs = [dict(node_state) for _ in range(4)]
+    data = node_state.dict()
+    data.update(current_host_reply="是的")
+    updated = GameState(**data)
+    return inputs, agent_inputs, updated
+
+
+def turn_after(controller: GameController, node_state: GameState, i: int):
+    """现在一回合中的状态处理"""
+    inputs = controller._initial_state(f"问题{i}", "question", None)
+    agent_inputs = [view(node_state) for view in (ReplyView, StructureView, AnalysisView, DetectionView)]
+    updated = node_state.copy_with_updates(current_host_reply="是的")
+    return inputs, agent_inputs, updated
+
+
+def measure(turn) -> tuple:
+    """返回 (每回合分配次数, 每回合分配字节, 每回合微秒)"""
+    for i in range(100):
+        turn(i)
+    gc.collect()
+    gc.disable()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [turn(i) for i in range(TURNS)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+    size = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+    del kept
+    gc.enable()
+
+    start = time.perf_counter()
+    for i in range(TURNS):
+        turn(i)
+    elapsed = time.perf_counter() - start
+    return blocks / TURNS, size / TURNS, elapsed / TURNS * 1e6
+
+
+def main():
+    controller = make_controller()
+    node_state = GameState.model_validate(controller._initial_state("他是司机吗？", "question", None))
+    results = {
+        "before": measure(lambda i: turn_before(node_state, i)),
+        "after": measure(lambda i: turn_after(controller, node_state, i)),
+    }
+    print(f"每回合：初始状态 + 4 个 Agent 的输入 + 一次 copy_with_updates，共 {TURNS} 回合（保留结果以统计分配）\n")
+    base_blocks, base_size, base_time = results["before"]
+    for name, (blocks, size, elapsed) in results.items():
+        print(
+            f"{name:<7} | 分配 {blocks:6.1f} 块 / 回合 | {size / 1024:6.2f}KB / 回合 | {elapsed:6.1f}µs / 回合"
+            + ("" if name == "before" else f" | 分配次数减少 {1 - blocks / base_blocks:.0%}，字节减少 {1 - size / base_size:.0%}")
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+思维链摘要渲染缓存基准测试
+
+对比每次全量重新渲染与增量缓存渲染的耗时：
+每轮新增一个节点，然后像一回合内多个 Agent 那样连续读取 4 次摘要
+
+运行: python benchmarks/bench_summary_cache.py
+"""
+import os
+import sys
+import time
+import logging
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.memory.brainchain import BrainChainMemory
+
+NODES_PER_CHAIN = 50
+READS_PER_TURN = 4
+TURNS = 20
+
+
+def build_memory(node_count: int) -> BrainChainMemory:
+    """构建包含指定节点数的思维链记忆"""
+    memory = BrainChainMemory()
+    chain_id = None
+    for i in range(node_count):
+        if i % NODES_PER_CHAIN == 0:
+            chain_id = memory.create_chain()
+        memory.add_node(
+            content=f"问题{i}：死者是不是自己锁的门？",
+            chain_id=chain_id,
+            host_reply="是的",
+            reply_type="yes",
+            notes=f"备注{i}"
+        )
+    return memory
+
+
+def run_turns(memory: BrainChainMemory, use_cache: bool) -> float:
+    """模拟若干回合，返回平均每回合耗时（毫秒）"""
+    chain_id = memory.current_chain_id
+    start = time.perf_counter()
+    for turn in range(TURNS):
+        memory.add_node(
+            content=f"新问题{turn}",
+            chain_id=chain_id,
+            host_reply="不是",
+            reply_type="no",
+            notes=""
+        )
+        for _ in range(READS_PER_TURN):
+            if not use_cache:
+                memory.invalidate_render_cache()
+            memory.summarize_brainchains()
+    return (time.perf_counter() - start) / TURNS * 1000
+
+
+def main():
+    logging.disable(logging.WARNING)
+    print(f"{'节点数':>8} | {'全量渲染(ms/回合)':>18} | {'增量缓存(ms/回合)':>18} | {'加速比':>8}")
+    for node_count in (1_000, 10_000):
+        full = run_turns(build_memory(node_count), use_cache=False)
+        cached = run_turns(build_memory(node_count), use_cache=True)
+        print(f"{node_count:>8} | {full:>18.2f} | {cached:>18.2f} | {full / cached:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+工作流检测拓扑基准测试
+
+用带固定延迟的 Mock Agent 模拟 LLM 调用，比较结构分析之后
+analysis / detection / detect_stuck 顺序执行与并发扇出的单回合延迟
+
+运行: python benchmarks/bench_workflow_topology.py
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.workflow import build_graph
+from src.state_schema import GameState
+from src.mock_data import (
+    MockReplyAgent,
+    MockStructureAgent,
+    MockAnalysisAgent,
+    MockDetectionAgent,
+    MockStuckDetector,
+)
+
+# 模拟的单次 LLM 调用延迟（秒）
+LATENCY = {
+    "reply": 0.30,
+    "structure": 0.25,
+    "analysis": 0.35,
+    "detection": 0.40,
+    "stuck": 0.30,
+}
+TURNS = 5
+
+
+def delayed(mock_cls, latency: float):
+    """为 Mock 组件的 run 加上固定延迟"""
+    class Delayed(mock_cls):
+        async def run(self, state):
+            await asyncio.sleep(latency)
+            return await super().run(state)
+    return Delayed()
+
+
+async def measure(topology: str) -> float:
+    """返回平均单回合耗时（秒）"""
+    graph = build_graph(
+        reply_agent=delayed(MockReplyAgent, LATENCY["reply"]),
+        structure_agent=delayed(MockStructureAgent, LATENCY["structure"]),
+        analysis_agent=delayed(MockAnalysisAgent, LATENCY["analysis"]),
+        detection_agent=delayed(MockDetectionAgent, LATENCY["detection"]),
+        stuck_detector=delayed(MockStuckDetector, LATENCY["stuck"]),
+        detection_topology=topology,
+    )
+    state = GameState(player_action="question", current_question="他是司机吗？").model_dump()
+    start = time.perf_counter()
+    for _ in range(TURNS):
+        await graph.ainvoke(state)
+    return (time.perf_counter() - start) / TURNS
+
+
+async def main():
+    logging.disable(logging.WARNING)
+    head = LATENCY["reply"] + LATENCY["structure"]
+    branches = [LATENCY["analysis"], LATENCY["detection"], LATENCY["stuck"]]
+    print(f"模拟延迟(秒): {LATENCY}")
+    print(f"理论值: sequential={head + sum(branches):.2f}s, parallel={head + max(branches):.2f}s\n")
+    results = {}
+    for topology in ("sequential", "parallel"):
+        results[topology] = await measure(topology)
+        print(f"{topology:<10} | 平均每回合 {results[topology]:.3f}s")
+    print(f"\n并发扇出每回合节省 {results['sequential'] - results['parallel']:.3f}s "
+          f"({1 - results['parallel'] / results['sequential']:.1%})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,14 +1,31 @@
 """思维链分析 Agent"""
-from typing import Dict, Any
+from typing import Dict, Any, Literal, Optional, Tuple
 from langchain.agents import AgentExecutor, create_openai_functions_agent
 from langchain_deepseek import ChatDeepSeek
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import Runnable
 from src.memory.brainchain import BrainChainMemory
 from src.prompts.agent_prompts import ANALYSIS_AGENT_PROMPT
+from src.config import AGENT_CONFIG
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+def build_analysis_prompt() -> ChatPromptTemplate:
+    """分析 Agent 的 prompt"""
+    return ChatPromptTemplate.from_messages([
+        ("system", ANALYSIS_AGENT_PROMPT),
+        MessagesPlaceholder(variable_name="agent_scratchpad")
+    ])
+
+
+def build_analysis_pipeline(llm: ChatDeepSeek) -> Runnable:
+    """构建分析流水线 prompt → model → 文本，不含会话状态，可在会话间共用"""
+    return build_analysis_prompt().partial(agent_scratchpad=[]) | llm | StrOutputParser()
+
+
 class AnalysisAgent:
     """
     负责分析思维链内容，包括:
@@ -17,30 +34,43 @@ class AnalysisAgent:
     3. 生成分析报告
     """
     
-    def __init__(self, llm: ChatDeepSeek, memory: BrainChainMemory):
+    def __init__(
+        self,
+        llm: ChatDeepSeek,
+        memory: BrainChainMemory,
+        execution: Optional[Literal["pipeline", "agent_executor"]] = None,
+        chain: Optional[Runnable] = None
+    ):
         """
         初始化分析 Agent
         
         Args:
             llm: LLM 实例
             memory: BrainChainMemory 实例
+            execution: 执行方式，默认取 AGENT_CONFIG["execution"]
+            chain: 预先构建的共享流水线（见 build_analysis_pipeline），pipeline 模式下使用
         """
-        # 创建 prompt
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", ANALYSIS_AGENT_PROMPT),
-            MessagesPlaceholder(variable_name="agent_scratchpad")
-        ])
         self.memory = memory
-        # 创建 functions agent
-        agent = create_openai_functions_agent(llm, tools=[], prompt=prompt)
-        
-        # 包装进 AgentExecutor
-        self.executor = AgentExecutor(
-            agent=agent,
-            tools=[],
-            memory=self.memory,
-            verbose=True
-        )
+        self.execution = execution or AGENT_CONFIG["execution"]
+        if self.execution == "pipeline":
+            # 无工具调用，直接 prompt → model → 文本，由 run 显式写回记忆
+            self.chain = chain or build_analysis_pipeline(llm)
+        else:
+            # 创建 functions agent
+            agent = create_openai_functions_agent(llm, tools=[], prompt=build_analysis_prompt())
+            
+            # 包装进 AgentExecutor
+            self.executor = AgentExecutor(
+                agent=agent,
+                tools=[],
+                memory=self.memory,
+                verbose=True
+            )
+        self.llm_every_n_turns = AGENT_CONFIG["analysis"]["llm_every_n_turns"]
+        self.llm_delta = AGENT_CONFIG["analysis"]["llm_delta"]
+        # 上一次 LLM 分析时的 (chain_id, 本地分数)，以及此后经过的回合数
+        self._last_llm_run: Optional[Tuple[str, float]] = None
+        self._turns_since_llm = 0
         
     async def run(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -52,20 +82,59 @@ class AnalysisAgent:
         Returns:
             Dict[str, Any]: 包含以下字段:
                 - analysis_note: 分析说明
-                - path_similarity: 相似度分数 (0-1)
+                - path_similarity: 相似度分数 (0-1)，启用本地评分时每回合都是本地分数，
+                  LLM 给出的分数只保存在链元数据中
         """
+        current_chain_id = self.memory.current_chain_id
+        local = self.memory.local_similarity(current_chain_id)
+        if local is not None and not self._needs_llm(current_chain_id, local):
+            # 本地分数变化平稳，沿用上一次的分析说明
+            self._turns_since_llm += 1
+            chain = self.memory.get_chain(current_chain_id)
+            return {
+                "analysis_note": chain.metadata.get("analysis_note", ""),
+                "path_similarity": local
+            }
+
         # 转换输入格式以匹配 prompt 模板
         self.memory.action_type = "inference"
-        current_chain_id = self.executor.memory.current_chain_id
-        current_chain = self.executor.memory.brainchains[current_chain_id]
+        # 只发送当前焦点所在的分支，而不是整条链
         agent_inputs = {
-            "current_chain": current_chain,
+            "current_chain": self.memory.summarize_focus_path(current_chain_id),
+            "action_type": "inference",
         }
         
-        # 执行分析，结果会自动写入 memory
-        result = await self.executor.ainvoke(agent_inputs)
+        if self.execution == "pipeline":
+            output = await self.chain.ainvoke(agent_inputs)
+            self.memory.save_context(agent_inputs, {"output": output})
+        else:
+            # 执行分析，结果会自动写入 memory
+            await self.executor.ainvoke(agent_inputs)
+        if local is not None:
+            self._last_llm_run = (current_chain_id, local)
+            self._turns_since_llm = 0
         
+        # 分析结果由 save_context 写入链的元数据
+        chain = self.memory.get_chain(current_chain_id)
+        metadata = chain.metadata if chain is not None else {}
         return {
-            "analysis_note": result.get("analysis_note", ""),
-            "path_similarity": result.get("path_similarity", 0.0)
-        } 
\ No newline at end of file
+            "analysis_note": metadata.get("analysis_note", ""),
+            "path_similarity": self.memory.reported_similarity(current_chain_id)
+        }
+
+    def _needs_llm(self, chain_id: str, local: float) -> bool:
+        """
+        判断本回合是否需要调用 LLM 分析
+        
+        Args:
+            chain_id: 当前链ID
+            local: 当前链的本地相似度分数
+            
+        Returns:
+            bool: 换链、距上次分析已满 N 回合或本地分数变化剧烈时为 True
+        """
+        if self._last_llm_run is None or self._last_llm_run[0] != chain_id:
+            return True
+        if self._turns_since_llm + 1 >= self.llm_every_n_turns:
+            return True
+        return abs(local - self._last_llm_run[1]) >= self.llm_delta
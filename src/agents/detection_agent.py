@@ -1,12 +1,20 @@
 """思维链状态检测 Agent"""
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+import json
+import logging
+import re
 from langchain.agents import AgentExecutor, create_openai_functions_agent
 from langchain_deepseek import ChatDeepSeek
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from src.memory.brainchain import BrainChainMemory
 from src.prompts.agent_prompts import DETECTION_AGENT_PROMPT
 from src.tools.hint_generator import create_hint_tool
+from src.memory.loop_index import LoopDetector, LoopVerdict
 from src.context import GameContext
+from src.config import AGENT_CONFIG
+
+logger = logging.getLogger(__name__)
+
 class DetectionAgent:
     """
     负责状态检测，包括:
@@ -22,21 +30,33 @@ class DetectionAgent:
         Args:
             llm: LLM 实例
             memory: BrainChainMemory 实例
+            context: 游戏上下文，提示工具从中读取故事与思维链
         """
-        # 创建 prompt
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", DETECTION_AGENT_PROMPT),
-            MessagesPlaceholder(variable_name="agent_scratchpad")
-        ])
-        
-        # 创建提示工具（无 hint_type，交给 agent 来决定）
-        hint_tool = create_hint_tool(llm, context)
+        self.llm = llm
         self.memory = memory
-        # 创建 functions agent
-        agent = create_openai_functions_agent(llm, tools=[hint_tool], prompt=prompt)
+        self.context = context
+        # 本地绕圈检测覆盖大多数回合，AgentExecutor 在第一次需要 LLM 时才创建
+        self._executor: Optional[AgentExecutor] = None
+        self.loop_detector = LoopDetector(memory) if AGENT_CONFIG["loop_detection"]["enabled"] else None
 
-        # Executor 包装
-        self.executor = AgentExecutor(agent=agent, tools=[hint_tool], memory=self.memory, verbose=True)
+    @property
+    def executor(self) -> AgentExecutor:
+        """带 generate_hint 工具的 AgentExecutor，首次访问时创建"""
+        if self._executor is None:
+            # 创建 prompt
+            prompt = ChatPromptTemplate.from_messages([
+                ("system", DETECTION_AGENT_PROMPT),
+                MessagesPlaceholder(variable_name="agent_scratchpad")
+            ])
+            
+            # 创建提示工具（无 hint_type，交给 agent 来决定）
+            hint_tool = create_hint_tool(self.llm, self.context)
+            # 创建 functions agent
+            agent = create_openai_functions_agent(self.llm, tools=[hint_tool], prompt=prompt)
+
+            # Executor 包装
+            self._executor = AgentExecutor(agent=agent, tools=[hint_tool], memory=self.memory, verbose=True)
+        return self._executor
 
     async def run(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -48,13 +68,64 @@ class DetectionAgent:
         Returns:
             Dict[str, Any]: 包含检测结果
         """
-        # 后期优化可放入相关字段
-        self.memory.action_type = "detection"
-        agent_inputs = {}
+        verdict = None
+        if self.loop_detector is not None:
+            verdict = self.loop_detector.check(
+                inputs.get("current_question", ""),
+                exclude_node_id=inputs.get("current_node_id")
+            )
+            if verdict.is_looping is not None:
+                logger.info("[DetectionAgent] 本地绕圈检测: %s (相似度 %.2f)", verdict.is_looping, verdict.similarity)
+                if AGENT_CONFIG["loop_detection"]["skip_llm_when_definite"]:
+                    # 不再调用 LLM：偏离检测固定为 False，只有绕圈时给出本地提示
+                    return {
+                        "is_deviated": False,
+                        "is_looping": verdict.is_looping,
+                        "hint": self._loop_hint(verdict)
+                    }
+
+        # 后期优化可放入相关字段；action_type 随输入传给 save_context，不改动共享的 memory
+        agent_inputs = {"action_type": "no_action"}
         
-        result = await self.executor.ainvoke(agent_inputs)
+        result = self._parse_output(await self.executor.ainvoke(agent_inputs))
+        is_looping = result.get("is_looping", False)
+        hint = result.get("hint", "")
+        if verdict is not None and verdict.is_looping is not None:
+            # 本地索引只决定是否绕圈，偏离检测与提示仍由 LLM 给出
+            is_looping = verdict.is_looping
+            hint = hint or self._loop_hint(verdict)
         return {
             "is_deviated": result.get("is_deviated", False),
-            "is_looping": result.get("is_looping", False),
-            "hint": result.get("hint", "")
-        } 
\ No newline at end of file
+            "is_looping": is_looping,
+            "hint": hint
+        }
+
+    @staticmethod
+    def _parse_output(result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        从 AgentExecutor 的 output 字符串中解析检测结果 JSON
+
+        Args:
+            result: AgentExecutor.ainvoke 的返回值，检测结果在 result["output"] 中
+
+        Returns:
+            Dict[str, Any]: 解析出的检测结果，无法解析时为空字典（各字段取默认值）
+        """
+        output = result.get("output", "")
+        match = re.search(r"\{[\s\S]*\}", output) if isinstance(output, str) else None
+        if match is None:
+            logger.error("[DetectionAgent] 无法从输出中提取 JSON 对象: %s", str(output)[:100])
+            return {}
+        try:
+            parsed = json.loads(match.group(0))
+        except json.JSONDecodeError as e:
+            logger.error("[DetectionAgent] JSON解析失败: %s", e)
+            return {}
+        return parsed if isinstance(parsed, dict) else {}
+
+    @staticmethod
+    def _loop_hint(verdict: LoopVerdict) -> str:
+        """本地判定为绕圈时的提示，未绕圈时为空"""
+        if not verdict.is_looping:
+            return ""
+        return f"你之前问过类似的问题：「{verdict.match_content}」，试着换个方向思考"
@@ -0,0 +1,137 @@
+"""融合 Agent：一次模型调用同时完成回复、结构判断与推理分析"""
+from typing import Dict, Any, Optional
+import json
+import logging
+from langchain_deepseek import ChatDeepSeek
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import Runnable
+from langchain.output_parsers import PydanticOutputParser
+from src.memory.brainchain import BrainChainMemory
+from src.prompts.fused_prompts import FUSED_AGENT_PROMPT, FusedTurnOutput
+from src.config import CONTEXT_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+def build_fused_pipeline(llm: ChatDeepSeek) -> Runnable:
+    """构建融合回合流水线 prompt → model → 文本，不含会话状态，可在会话间共用"""
+    return FUSED_AGENT_PROMPT | llm | StrOutputParser()
+
+
+class FusedTurnAgent:
+    """
+    负责在一次调用中生成:
+    1. 主持人回复（host_reply / reply_type / notes）
+    2. 结构判断（structure_type / chain_id / parent_id）
+    3. 推理分析（analysis_note / path_similarity）
+
+    输出通过校验后才写入 BrainChainMemory；校验失败时不写入任何内容，
+    由工作流回退到多 Agent 路径
+    """
+
+    def __init__(self, llm: ChatDeepSeek, memory: BrainChainMemory, chain: Optional[Runnable] = None):
+        """
+        初始化融合 Agent
+        
+        Args:
+            llm: LLM 实例
+            memory: BrainChainMemory 实例
+            chain: 预先构建的共享流水线（见 build_fused_pipeline）
+        """
+        self.memory = memory
+        self.output_parser = PydanticOutputParser(pydantic_object=FusedTurnOutput)
+        self.chain = chain or build_fused_pipeline(llm)
+
+    async def run(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        运行融合回合（工作流节点调用入口）
+        
+        Args:
+            inputs: 输入状态字典
+            
+        Returns:
+            Dict[str, Any]: 包含以下字段:
+                - valid: 输出是否通过校验，为 False 时其余字段缺省
+                - current_host_reply / current_reply_type / current_reply_notes / current_reply_invalid
+                - chain_id / node_id: 写入后的当前链与节点
+                - analysis_note / path_similarity
+        """
+        context_budget = CONTEXT_CONFIG["token_budgets"]["reply"]
+        chain_inputs = {
+            "question": inputs.get("current_question", ""),
+            "true_answer": inputs.get("true_answer", ""),
+            "current_brainchain": inputs.get("current_brainchain") or self.memory.build_context_window(context_budget),
+            "current_chain_id": self.memory.prompt_id(self.memory.current_chain_id, "chain"),
+            "current_node_id": self.memory.prompt_id(self.memory.current_focus_id, "node"),
+        }
+        try:
+            content = await self.chain.ainvoke(chain_inputs)
+            output = self.output_parser.parse(content)
+            error = self._validate_structure(output)
+        except Exception as e:
+            error = str(e)
+        if error:
+            logger.warning("[FusedTurnAgent] 输出校验失败，回退到多 Agent 路径: %s", error)
+            return {"valid": False}
+
+        self._dispatch(chain_inputs["question"], output)
+        return {
+            "valid": True,
+            "current_host_reply": output.host_reply,
+            "current_reply_type": output.reply_type,
+            "current_reply_notes": output.notes,
+            "current_reply_invalid": output.reply_type == "error",
+            "chain_id": self.memory.current_chain_id,
+            "node_id": self.memory.current_focus_id,
+            "analysis_note": output.analysis_note,
+            "path_similarity": self.memory.reported_similarity(),
+        }
+
+    def _validate_structure(self, output: FusedTurnOutput) -> Optional[str]:
+        """
+        检查结构判断能否落到已有的链与节点上
+        
+        Args:
+            output: 解析后的模型输出
+            
+        Returns:
+            Optional[str]: 错误说明，校验通过时为 None
+        """
+        if output.structure_type == "new":
+            return None
+        if output.structure_type == "old":
+            chain_id = self.memory.resolve_id(output.chain_id)
+            if not chain_id or chain_id not in self.memory.brainchains:
+                return f"旧思维链 {output.chain_id} 不存在"
+        else:
+            chain_id = self.memory.current_chain_id
+            if self.memory.get_chain(chain_id) is None:
+                return "当前思维链不存在"
+        parent_id = self.memory.resolve_id(output.parent_id)
+        if parent_id and parent_id not in self.memory.brainchains[chain_id].nodes:
+            return f"父节点 {output.parent_id} 不在思维链 {output.chain_id or chain_id} 中"
+        return None
+
+    def _dispatch(self, question: str, output: FusedTurnOutput) -> None:
+        """按多 Agent 路径相同的规则把结构判断与分析结果写入 memory"""
+        self.memory.save_context(
+            {
+                "question": question,
+                "host_reply": output.host_reply,
+                "reply_type": output.reply_type,
+                "notes": output.notes,
+                "action_type": "creat_add",
+            },
+            {"output": json.dumps({
+                "structure_type": output.structure_type,
+                "chain_id": output.chain_id,
+                "parent_id": output.parent_id,
+            })}
+        )
+        self.memory.save_context(
+            {"action_type": "inference"},
+            {"output": json.dumps({
+                "analysis_note": output.analysis_note,
+                "path_similarity": output.path_similarity,
+            })}
+        )
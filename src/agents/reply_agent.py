@@ -1,51 +1,77 @@
 """
 回复生成Agent模块
 """
-from typing import Dict, Any, Union, Optional
+from typing import AsyncIterator, Dict, Any, List, Literal, Union, Optional
 import logging
 from langchain_community.chat_models import ChatOpenAI
 from langchain.agents import AgentExecutor, create_openai_functions_agent
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.output_parsers import PydanticOutputParser
 from langchain_core.messages import BaseMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import Runnable
 from src.memory.brainchain import BrainChainMemory
 from src.prompts.reply_prompts import REPLY_AGENT_PROMPT, ReplyOutput
+from src.config import AGENT_CONFIG, CONTEXT_CONFIG
+from src.utils.json_stream import JsonFieldExtractor
 
 logger = logging.getLogger(__name__)
 
+
+def build_reply_pipeline(llm: ChatOpenAI) -> Runnable:
+    """构建回复生成流水线 prompt → model → 文本，不含会话状态，可在会话间共用"""
+    return REPLY_AGENT_PROMPT.partial(agent_scratchpad=[]) | llm | StrOutputParser()
+
+
 class ReplyAgent:
     """负责生成对玩家问题的回复"""
     
-    def __init__(self, llm: ChatOpenAI, memory: BrainChainMemory):
+    def __init__(
+        self,
+        llm: ChatOpenAI,
+        memory: BrainChainMemory,
+        execution: Optional[Literal["pipeline", "agent_executor"]] = None,
+        chain: Optional[Runnable] = None
+    ):
         """
         初始化ReplyAgent
         
         Args:
             llm: LLM模型
             memory: 思维链记忆
+            execution: 执行方式，默认取 AGENT_CONFIG["execution"]
+            chain: 预先构建的共享流水线（见 build_reply_pipeline），pipeline 模式下使用
         """
         self.llm = llm
         self.memory = memory
         self.memory.brainchains = memory.brainchains
         self.memory.current_chain_id = memory.current_chain_id
         self.output_parser = PydanticOutputParser(pydantic_object=ReplyOutput)
+        self.execution = execution or AGENT_CONFIG["execution"]
         
-        # 创建 agent
-        self.agent = create_openai_functions_agent(
-            llm=llm,
-            tools=[],  # 无工具调用
-            prompt=REPLY_AGENT_PROMPT
-        )
-        
+        if self.execution == "pipeline":
+            # 无工具调用，直接 prompt → model → 文本；记忆读取在 _prepare_inputs 中显式完成
+            self.chain = chain or build_reply_pipeline(llm)
+        else:
+            # 创建 agent
+            self.agent = create_openai_functions_agent(
+                llm=llm,
+                tools=[],  # 无工具调用
+                prompt=REPLY_AGENT_PROMPT
+            )
 
-        # 创建executor
-        self.executor = AgentExecutor.from_agent_and_tools(
-            self.agent,
-            tools=[],
-            memory=self.memory,
-            verbose=True
-        )
+            # 创建executor
+            self.executor = AgentExecutor.from_agent_and_tools(
+                self.agent,
+                tools=[],
+                memory=self.memory,
+                verbose=True
+            )
         
+    async def run(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """运行回复生成（工作流节点调用入口）"""
+        return await self._arun(inputs)
+
     async def _arun(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
         """
         运行回复生成
@@ -58,47 +84,121 @@ class ReplyAgent:
                 - current_host_reply: 主持人回复
                 - current_reply_type: 回复类型
                 - current_reply_notes: 回复说明
-                - reply_invalid: 是否无效回复
+                - current_reply_invalid: 是否无效回复
         """
         try:
-            self.memory.action_type = "no_action"
-            # 准备输入
-            brain_chain = self.memory.load_memory_variables({})
-            
-            # 转换输入格式以匹配 prompt 模板
-            agent_inputs = {
-                "question": inputs.get("current_question", ""),
-                "true_answer": inputs.get("true_answer", ""),
-                "brain_chain": inputs.get("current_brainchain") or brain_chain.get("brain_chain", "")
-            }
-            
+            if self.execution == "pipeline":
+                # 回复生成不写记忆（no_action），节点由结构分析写入
+                return self._parse_reply(await self.chain.ainvoke(self._prepare_inputs(inputs)))
+
             # 调用agent生成回复
-            result = await self.executor.ainvoke(agent_inputs)
+            result = await self.executor.ainvoke(self._prepare_inputs(inputs))
             
             # 尝试从不同可能的结构中获取输出内容
             content = (
                 result if isinstance(result, str)
                 else result.get("output", result.get("content", str(result)))
             )
-            
-            # 解析输出
-            reply = self.output_parser.parse(content)
-            
-            # 返回结果
-            return {
-                "current_host_reply": reply.host_reply,
-                "current_reply_type": reply.reply_type,
-                "current_reply_notes": reply.notes,
-                "reply_invalid": reply.reply_type == "error"
-            }
+            return self._parse_reply(content)
             
         except Exception as e:
             logger.error("[ReplyAgent] 处理失败: %s", str(e))
+            return self._error_result(e)
+
+    async def astream(self, inputs: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式运行回复生成
+        
+        模型输出 JSON 的同时增量提取 host_reply 字段，逐段推送给调用方；
+        完整输出到达后再解析出结构化结果
+        
+        Args:
+            inputs: 输入状态字典
+            
+        Yields:
+            Dict[str, Any]: 事件字典，包含以下两种：
+                - {"event": "token", "data": str}: host_reply 的新增片段
+                - {"event": "reply", "data": Dict}: 与 _arun 返回值相同的结构化结果
+        """
+        extractor = JsonFieldExtractor("host_reply")
+        chunks: List[str] = []
+        output: Optional[str] = None
+        try:
+            if self.execution == "pipeline":
+                async for text in self.chain.astream(self._prepare_inputs(inputs)):
+                    if not text:
+                        continue
+                    chunks.append(text)
+                    token = extractor.feed(text)
+                    if token:
+                        yield {"event": "token", "data": token}
+            else:
+                async for event in self.executor.astream_events(self._prepare_inputs(inputs), version="v2"):
+                    kind = event["event"]
+                    if kind == "on_chat_model_stream":
+                        text = event["data"]["chunk"].content
+                        if not isinstance(text, str) or not text:
+                            continue
+                        chunks.append(text)
+                        token = extractor.feed(text)
+                        if token:
+                            yield {"event": "token", "data": token}
+                    elif kind == "on_chain_end" and event["name"] == "AgentExecutor":
+                        result = event["data"].get("output")
+                        if isinstance(result, dict):
+                            output = result.get("output")
+
+            reply = self._parse_reply(output if output is not None else "".join(chunks))
+        except Exception as e:
+            logger.error("[ReplyAgent] 流式处理失败: %s", str(e))
+            reply = self._error_result(e)
+        yield {"event": "reply", "data": reply}
+
+    def _prepare_inputs(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        将工作流状态转换为 prompt 模板需要的输入
+        
+        Args:
+            inputs: 输入状态字典
             
-            # 返回错误状态
-            return {
-                "current_host_reply": "抱歉，我现在无法理解这个问题，请重新提问",
-                "current_reply_type": "error",
-                "current_reply_notes": f"解析回复时出错：{str(e)}",
-                "reply_invalid": True
-            } 
\ No newline at end of file
+        Returns:
+            Dict[str, Any]: agent 输入
+        """
+        # 按 token 预算截取思维链上下文
+        context_budget = CONTEXT_CONFIG["token_budgets"]["reply"]
+        brain_chain = self.memory.load_memory_variables({"context_budget": context_budget})
+        return {
+            "question": inputs.get("current_question", ""),
+            "true_answer": inputs.get("true_answer", ""),
+            "brain_chain": inputs.get("current_brainchain") or brain_chain.get("brain_chain", ""),
+            "context_budget": context_budget,
+            "action_type": "no_action"
+        }
+
+    def _parse_reply(self, content: str) -> Dict[str, Any]:
+        """
+        解析模型输出
+        
+        Args:
+            content: 模型输出的 JSON 文本
+            
+        Returns:
+            Dict[str, Any]: 结构化回复结果
+        """
+        reply = self.output_parser.parse(content)
+        return {
+            "current_host_reply": reply.host_reply,
+            "current_reply_type": reply.reply_type,
+            "current_reply_notes": reply.notes,
+            "current_reply_invalid": reply.reply_type == "error"
+        }
+
+    @staticmethod
+    def _error_result(error: Exception) -> Dict[str, Any]:
+        """生成失败时的错误状态"""
+        return {
+            "current_host_reply": "抱歉，我现在无法理解这个问题，请重新提问",
+            "current_reply_type": "error",
+            "current_reply_notes": f"解析回复时出错：{str(error)}",
+            "current_reply_invalid": True
+        }
@@ -1,16 +1,33 @@
 """结构判断 Agent"""
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Literal
 import logging
 from langchain.agents import AgentExecutor, create_openai_functions_agent
 from langchain_deepseek import ChatDeepSeek
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.tools import StructuredTool
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import Runnable
 from src.memory.brainchain import BrainChainMemory
-from src.prompts.agent_prompts import STRUCTURE_AGENT_PROMPT
+from src.prompts.agent_prompts import STRUCTURE_AGENT_PROMPT, STRUCTURE_AGENT_LOCAL_PROMPT
 from src.tools.structure_tools import GenerateUUIDTool, GetCurrentTimeTool
+from src.config import CONTEXT_CONFIG, AGENT_CONFIG
 
 logger = logging.getLogger(__name__)
 
+
+def build_structure_prompt(system_prompt: str) -> ChatPromptTemplate:
+    """结构判断 Agent 的 prompt"""
+    return ChatPromptTemplate.from_messages([
+        ("system", system_prompt),
+        MessagesPlaceholder(variable_name="agent_scratchpad")
+    ])
+
+
+def build_structure_pipeline(llm: ChatDeepSeek) -> Runnable:
+    """构建 local 簿记方式的结构判断流水线 prompt → model → 文本，不含会话状态，可在会话间共用"""
+    return build_structure_prompt(STRUCTURE_AGENT_LOCAL_PROMPT).partial(agent_scratchpad=[]) | llm | StrOutputParser()
+
+
 class StructureAgent:
     """
     负责结构判断，包括:
@@ -18,37 +35,55 @@ class StructureAgent:
     2. 判断是否需要创建新结构
     """
     
-    def __init__(self, llm: ChatDeepSeek, memory: BrainChainMemory):
+    def __init__(
+        self,
+        llm: ChatDeepSeek,
+        memory: BrainChainMemory,
+        bookkeeping: Optional[Literal["local", "llm_tools"]] = None,
+        execution: Optional[Literal["pipeline", "agent_executor"]] = None,
+        chain: Optional[Runnable] = None
+    ):
         """
         初始化结构判断 Agent
         
         Args:
             llm: LLM 实例
             memory: BrainChainMemory 实例
+            bookkeeping: 簿记方式，默认取 AGENT_CONFIG["structure_bookkeeping"]。
+                local 模式下不注册工具，ID 与时间戳由 memory 本地生成，每回合只调用一次模型
+            execution: local 簿记方式下的执行方式，默认取 AGENT_CONFIG["execution"]；llm_tools 需要工具循环，总是使用 AgentExecutor
+            chain: 预先构建的共享流水线（见 build_structure_pipeline），pipeline 模式下使用
         """
-        # 初始化工具
         self.memory = memory
-        self.tools = [
-            StructuredTool.from_function(
-                func=GenerateUUIDTool().run,
-                name="generate_uuid",
-                description="生成 chain_id 和 node_id"
-            ),
-            StructuredTool.from_function(
-                func=GetCurrentTimeTool().run,
-                name="get_current_time",
-                description="生成 timestamp"
-            )
-        ]
-        
-        # 创建 prompt
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", STRUCTURE_AGENT_PROMPT),
-            MessagesPlaceholder(variable_name="agent_scratchpad")
-        ])
+        self.bookkeeping = bookkeeping or AGENT_CONFIG["structure_bookkeeping"]
+        self.execution = execution or AGENT_CONFIG["execution"]
+        self.chain: Optional[Runnable] = None
+        if self.bookkeeping == "local" and self.execution == "pipeline":
+            # 无工具调用，直接 prompt → model → 文本，由 _arun 显式写入记忆
+            self.tools = []
+            self.chain = chain or build_structure_pipeline(llm)
+            return
+        if self.bookkeeping == "local":
+            self.tools = []
+            system_prompt = STRUCTURE_AGENT_LOCAL_PROMPT
+        else:
+            # 初始化工具
+            self.tools = [
+                StructuredTool.from_function(
+                    func=GenerateUUIDTool().run,
+                    name="generate_uuid",
+                    description="生成 chain_id 和 node_id"
+                ),
+                StructuredTool.from_function(
+                    func=GetCurrentTimeTool().run,
+                    name="get_current_time",
+                    description="生成 timestamp"
+                )
+            ]
+            system_prompt = STRUCTURE_AGENT_PROMPT
         
         # 创建 functions agent
-        agent = create_openai_functions_agent(llm, tools=self.tools, prompt=prompt)
+        agent = create_openai_functions_agent(llm, tools=self.tools, prompt=build_structure_prompt(system_prompt))
         
         # 包装进 AgentExecutor
         self.executor = AgentExecutor(
@@ -58,6 +93,10 @@ class StructureAgent:
             verbose=True
         )
         
+    async def run(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """运行结构判断（工作流节点调用入口）"""
+        return await self._arun(inputs)
+
     async def _arun(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
         """
         运行结构判断 Agent
@@ -76,21 +115,29 @@ class StructureAgent:
         # 转换输入格式以匹配 prompt 模板
         self.memory.action_type = "creat_add"
         logger.info(f"结构判断 Agent 输入: {inputs}")
+        context_budget = CONTEXT_CONFIG["token_budgets"]["structure"]
         agent_inputs = {
             "question": inputs.get("current_question", ""),
             "host_reply": inputs.get("current_host_reply", ""),
             "reply_type": inputs.get("current_reply_type", ""),
-            "notes": inputs.get("reply_notes", ""),
-            "current_brainchain": inputs.get("current_brainchain", ""),
-            "current_chain_id": inputs.get("current_chain_id", ""),
-            "current_node_id": inputs.get("current_node_id", "")
+            "notes": inputs.get("current_reply_notes", ""),
+            "current_brainchain": inputs.get("current_brainchain") or self.memory.build_context_window(context_budget),
+            # compact 格式下提示词里使用短别名，save_context 会把别名翻译回来
+            "current_chain_id": self.memory.prompt_id(inputs.get("current_chain_id", ""), "chain"),
+            "current_node_id": self.memory.prompt_id(inputs.get("current_node_id", ""), "node"),
+            "context_budget": context_budget,
+            "action_type": "creat_add"
         }
         
-        await self.executor.ainvoke(agent_inputs)
+        if self.chain is not None:
+            output = await self.chain.ainvoke(agent_inputs)
+            self.memory.save_context(agent_inputs, {"output": output})
+        else:
+            await self.executor.ainvoke(agent_inputs)
         # 从memroy中取出current_brainchain_id
-        current_brainchain_id = self.executor.memory.current_chain_id
-        current_node_id = self.executor.memory.current_focus_id
-        logger.warning(f"structure_agent 结束，当前脑图: {self.executor.memory.brainchains}")
+        current_brainchain_id = self.memory.current_chain_id
+        current_node_id = self.memory.current_focus_id
+        logger.warning(f"structure_agent 结束，当前脑图: {self.memory.brainchains}")
         # 构建返回结果
         response = {
             "chain_id": current_brainchain_id,
@@ -99,4 +146,4 @@ class StructureAgent:
         
         
             
-        return response 
\ No newline at end of file
+        return response
@@ -1,10 +1,12 @@
 """
 Summary Agent模块，用于定期总结玩家的推理进展
 """
-from typing import Dict, Any
+from typing import Dict, Any, List
 from langchain.agents import AgentExecutor
 from langchain.chat_models import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
+from langchain_core.messages import BaseMessage, get_buffer_string
+from src.config import WORKFLOW_CONFIG
 
 class SummaryAgent:
     def __init__(self, llm: ChatOpenAI = None):
@@ -52,4 +54,28 @@ class SummaryAgent:
             "confidence": 0.9,
             "hint_type": "summary",
             "reason": "定期总结已发现的关键线索"
-        } 
\ No newline at end of file
+        }
+
+    async def summarize_messages(self, previous_summary: str, messages: List[BaseMessage]) -> str:
+        """
+        把即将移出消息历史的旧消息并入已有摘要
+        
+        Args:
+            previous_summary: 已有的历史摘要，没有时为空字符串
+            messages: 要并入摘要的旧消息
+            
+        Returns:
+            str: 新的历史摘要
+        """
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", "你是一个对话历史总结专家。请把新的对话内容并入已有摘要，保留已给出的提示和关键线索，摘要不超过 {max_chars} 字。"),
+            ("human", "已有摘要：\n{summary}\n\n需要并入摘要的对话：\n{messages}")
+        ])
+        response = await self.llm.ainvoke(
+            prompt.invoke({
+                "max_chars": WORKFLOW_CONFIG["message_history"]["summary_max_chars"],
+                "summary": previous_summary or "（无）",
+                "messages": get_buffer_string(messages, human_prefix="玩家", ai_prefix="主持人")
+            })
+        )
+        return response.content
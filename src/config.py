@@ -12,6 +12,7 @@ GAME_CONFIG = {
     "confidence_threshold": 0.7,  # 置信度阈值
     "story_dir": Path(__file__).parent / "stories",  # 故事目录
     "log_dir": Path(__file__).parent / "logs",  # 日志目录
+    "state_history_keyframe_every": 16,  # state_history 每隔多少回合保存一次完整状态，其余回合只保存差分
 }
 
 # LLM 配置
@@ -21,6 +22,129 @@ LLM_CONFIG = {
     "max_tokens": 1000,
     "api_key": os.getenv("DEEPSEEK_API_KEY"),  
     "api_base": "https://api.deepseek.com/v1",  # DeepSeek API 基础URL
+    # 响应缓存: 按模型参数与渲染后的消息精确匹配，所有 Agent 共用。
+    # 命中时相同的提示词总是得到同一个采样结果，temperature > 0 时会改变游戏行为，需要显式开启
+    "cache": {
+        # auto（temperature 为 0 时为 memory，否则为 none）| none | memory（进程内 LRU）| sqlite（LRU + SQLite 持久化）
+        "backend": "auto",
+        "memory_size": 512,  # LRU 层容量
+        "sqlite_path": Path(__file__).parent / "cache" / "llm_cache.sqlite",
+    },
+    "call_timeout": 30,  # 工具内单次模型调用的超时秒数，超时后返回降级结果
+    "sync_workers": 4,  # 仍需同步调用的路径放入有界线程池，避免阻塞事件循环
+}
+
+# 思维链上下文配置
+CONTEXT_CONFIG = {
+    # 各 Agent 提示词中思维链上下文的 token 预算（本地估算）
+    "token_budgets": {
+        "reply": 1200,
+        "structure": 800,
+        "stuck": 600,
+    },
+    "recent_nodes": 8,  # 当前链原样保留的最近节点数
+    # 提示词中思维链的序列化格式: full 为完整格式，compact 使用 c1/n7 短别名并省略时间戳与装饰
+    "prompt_format": "compact",
+    # 思维链持久化: 变更追加写入 <directory>/<game_id>.jsonl，至少每 snapshot_every 条事件压缩为一次快照
+    # （间隔随快照规模增长，保存代价摊还 O(1)）；
+    # 启用后同一 game_id 的会话从磁盘恢复思维链；
+    # WORKFLOW_CONFIG["checkpointer"] 为 sqlite 时无论 enabled 如何都会启用，保证流程图与思维链一起恢复
+    "event_log": {
+        "enabled": False,
+        "directory": Path(__file__).parent / "cache" / "brainchain",
+        "snapshot_every": 200,
+    },
+}
+
+# Agent 配置
+AGENT_CONFIG = {
+    # 结构判断的簿记方式:
+    #   local     - LLM 只返回 structure_type 与目标链/父节点，ID 和时间戳由 BrainChainMemory 本地生成（单次调用）
+    #   llm_tools - LLM 通过 generate_uuid / get_current_time 工具调用生成（多轮调用）
+    "structure_bookkeeping": "local",
+    # 无工具 Agent（ReplyAgent / AnalysisAgent）的执行方式:
+    #   pipeline       - 预编译的 prompt | model | parser，显式读写 BrainChainMemory
+    #   agent_executor - 经由 AgentExecutor 的 agent 循环与 memory 钩子
+    "execution": "pipeline",
+    # 思维链分析: path_similarity 由本地 TF-IDF 覆盖度评分随节点追加增量更新，
+    # LLM 分析只在每 llm_every_n_turns 回合或本地分数变化超过 llm_delta 时运行
+    "analysis": {
+        "local_similarity": True,
+        "llm_every_n_turns": 3,
+        "llm_delta": 0.2,
+        # 节点回复类型对覆盖度的权重：被肯定的问题完全算作进展，被否定的只算部分
+        "reply_weights": {"yes": 1.0, "no": 0.4, "irrelevant": 0.1, "error": 0.0},
+    },
+    # 本地绕圈检测（MinHash/LSH 近重复索引），信号模糊时才调用 DetectionAgent 的 LLM
+    "loop_detection": {
+        "enabled": True,
+        "loop_threshold": 0.7,  # 与历史节点的 Jaccard 相似度不低于该值判定为绕圈
+        "clear_threshold": 0.4,  # 低于该值判定为未绕圈
+        "bands": 32,  # LSH 段数
+        "rows": 2,  # 每段签名行数
+        # 本地判定明确时是否跳过 LLM。默认 False：本地索引只决定 is_looping，偏离检测与提示仍由 LLM 给出；
+        # 设为 True 可省掉这些回合的 LLM 调用，但 is_deviated 固定为 False，未绕圈时没有提示
+        "skip_llm_when_definite": False,
+    },
+    # 卡住检测的本地门控: 按会话统计打分，分数落在两个阈值之间时才调用 DetectStuckTool 的 LLM
+    "stuck_detection": {
+        "gate_enabled": True,
+        "window": 6,  # 计算最近“是”回复比例的回合窗口
+        "min_turns": 4,  # 提问数不足时直接判定未卡住
+        # 打分 = Σ 权重 × 信号，信号均归一化到 0 ~ 1
+        "weights": {"no_progress": 0.4, "irrelevant_streak": 0.35, "stale_chain": 0.25},
+        "irrelevant_streak_cap": 3,  # 连续“无关”回复达到该值时信号为 1
+        "stale_chain_cap": 8,  # 距上次开新链的回合数达到该值时信号为 1
+        "clear_threshold": 0.35,  # 低于该值判定为未卡住
+        "stuck_threshold": 0.75,  # 不低于该值判定为卡住
+    },
+}
+
+# 工作流配置
+WORKFLOW_CONFIG = {
+    # 结构分析之后的检测拓扑:
+    #   parallel   - analysis / detection / detect_stuck 并发执行，由 join_detection 汇合
+    #   sequential - 依次执行
+    "detection_topology": "parallel",
+    # 回复优先: reply_generation 完成后立即返回主持人回复，其余节点在后台继续执行
+    "reply_first": False,
+    # 提问回合的模型调用方式:
+    #   multi_agent - reply / structure / analysis 各自调用模型
+    #   fused       - FusedTurnAgent 一次调用同时给出回复、结构判断与分析，校验失败时回退到 multi_agent
+    "turn_mode": "multi_agent",
+    # 开放式问题快速路径: 本地规则判定为开放式问题时直接返回 error 回复，跳过本回合其余节点
+    "open_question_fast_path": True,
+    "open_question_threshold": 0.8,  # 规则置信度阈值，benchmarks/bench_question_rules.py 给出各阈值的 precision / recall
+    # 共享流程图的检查点: 等待玩家输入的会话以 interrupt 挂起，按 thread_id（game_id）恢复。
+    # 取舍：同一 thread_id 上的运行必须串行，带检查点时 reply_first 的下一回合要等待上一回合的
+    # analysis / detection / stuck 全部结束，回复与簿记不再重叠（没有检查点时只等待结构分析写入思维链）
+    "checkpointer": {
+        # auto（reply_first 时为 none，否则为 memory）| none | memory（进程内，每个会话只保留最新检查点）
+        # | sqlite（同上，持久化到本地 WAL 数据库）；显式选择 memory / sqlite 时 reply_first 按上面的方式串行
+        "backend": "auto",
+        "sqlite_path": Path(__file__).parent / "cache" / "checkpoints.sqlite",
+    },
+    # GameState.messages 的有界历史（见 src/memory/message_history.py）:
+    #   last_n       - 只保留最近 max_messages 条
+    #   token_budget - 保留最近的消息，本地估算不超过 max_tokens
+    #   summarize    - 溢出的旧消息由 SummaryAgent 并入一条不超过 summary_max_chars 字的摘要
+    "message_history": {
+        "policy": "last_n",
+        "max_messages": 20,
+        "max_tokens": 2000,
+        "summary_max_chars": 400,
+    },
+}
+
+# 主持人回复缓存配置（跨会话，按 story_id 分区）
+REPLY_CACHE_CONFIG = {
+    "enabled": True,
+    # 归一化问题的字符 n-gram 余弦相似度阈值，只用于挑选候选；
+    # 命中还要求两个问题只在虚词/填充词上不同（见 reply_cache.only_filler_differences）
+    "similarity_threshold": 0.85,
+    "ngram_range": (1, 2),  # 字符 n-gram 的 n 取值范围
+    "max_entries_per_story": 256,  # 每个故事的 LRU 容量
+    "ttl_seconds": 7 * 24 * 3600,  # 条目有效期
 }
 
 # 提示配置
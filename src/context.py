@@ -5,6 +5,7 @@ from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 from src.state_schema import GameState
 from src.memory.brainchain import BrainChainMemory
+from src.memory.state_history import StateHistory
 
 class Story(BaseModel):
     """故事数据结构"""
@@ -45,7 +46,10 @@ class GameContext(BaseModel):
     final_analysis: Optional[str] = Field(None, description="结束时评语")
     
     # 存档相关
-    state_history: List[GameState] = Field(default_factory=list, description="状态记录（用于回放）")
+    state_history: StateHistory = Field(
+        default_factory=StateHistory,
+        description="状态记录（用于回放），按回合保存差分与定期关键帧，下标访问或遍历时重建 GameState"
+    )
     
     def update_from_state(self, state: GameState):
         """
@@ -61,11 +65,8 @@ class GameContext(BaseModel):
         if state.hint_type is not None:
             self.hint_count += 1
         
-        # 更新脑链
-        self.brain_chain.update_from_state(state.brain_chain)
-        
-        # 保存状态记录
-        self.state_history.append(state.copy())
+        # 思维链由各 Agent 直接写入 brain_chain，这里只保存状态记录（与上一回合的差分）
+        self.state_history.append(state)
     
     def calculate_score(self) -> int:
         """
@@ -117,7 +118,7 @@ class GameContext(BaseModel):
             filename: 文件名
         """
         with open(filename, 'w', encoding='utf-8') as f:
-            f.write(self.json(indent=2, ensure_ascii=False))
+            f.write(self.model_dump_json(indent=2))
     
     @classmethod
     def load_from_file(cls, filename: str) -> 'GameContext':
@@ -1,16 +1,26 @@
 """
 海龟汤游戏主类模块
 """
-from src.workflow import build_graph
+from src.workflow import build_graph, build_workflow_nodes, session_config
+from src.utils.checkpointer import LatestCheckpointSaver
+from langgraph.types import Command
 import asyncio
 from src.state_schema import GameState
 
 async def main():
-    graph = build_graph()
+    # 带检查点的流程图：等待玩家输入时会话挂起为一条检查点，按 thread_id 恢复
+    graph = build_graph(checkpointer=LatestCheckpointSaver())
+    config = session_config(build_workflow_nodes(), thread_id="game_001")
     # 提供 GameState 所需的必填字段
     initial_state = GameState(game_id="game_001", player_action="None")
-    result = await graph.ainvoke(initial_state.model_dump())  # 传递完整的初始状态
+    result = await graph.ainvoke(initial_state.model_dump(), config)  # 传递完整的初始状态
+    prompt = result["__interrupt__"][0].value["prompt"]
+    action = input(f"{prompt}: ")
+    question = input("问题: ") if action == "question" else None
+    result = await graph.ainvoke(
+        Command(resume={"player_action": action, "current_question": question}), config
+    )
     print(result)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -1,22 +1,46 @@
 """
 游戏流程控制模块（简化版）
 """
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional
+import asyncio
 import logging
+import time
 from langgraph.graph import StateGraph
+from langgraph.types import Command
 
 from src.state_schema import GameState
 from src.agents.reply_agent import ReplyAgent
 from src.agents.structure_agent import StructureAgent
 from src.agents.analysis_agent import AnalysisAgent
 from src.agents.detection_agent import DetectionAgent
+from src.agents.fused_agent import FusedTurnAgent
+from src.agents.summary_agent import SummaryAgent
+from src.memory.reply_cache import ReplyCache
 from src.tools.hint_generator import HintGenerator
-from src.tools.detection_tools import DetectStuckTool
+from src.tools.detection_tools import DetectStuckTool, StuckGate
 from src.context import GameContext
-from src.workflow import build_graph
+from src.workflow import build_graph, build_workflow_nodes, session_config
+from src.config import WORKFLOW_CONFIG
 
 logger = logging.getLogger(__name__)
 
+# 需要读取上一回合思维链写入结果的玩家动作
+MEMORY_DEPENDENT_ACTIONS = {"question", "hint_request"}
+
+
+class PendingTurn:
+    """回复已返回、但后续节点仍在后台执行的回合"""
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        # structure_analysis 完成（思维链已写入）时置位
+        self.memory_ready = asyncio.Event()
+        self.result: Optional[Dict[str, Any]] = None
+
+    @property
+    def done(self) -> bool:
+        return self.task is not None and self.task.done()
+
 class GameController:
     """游戏流程控制器（简化版）"""
     
@@ -28,7 +52,12 @@ class GameController:
         detection_agent: DetectionAgent,
         hint_tool: HintGenerator,
         stuck_detector: DetectStuckTool,
-        context: GameContext
+        context: GameContext,
+        fused_agent: Optional[FusedTurnAgent] = None,
+        reply_cache: Optional[ReplyCache] = None,
+        stuck_gate: Optional[StuckGate] = None,
+        graph: Optional[StateGraph] = None,
+        summary_agent: Optional[SummaryAgent] = None
     ):
         """
         初始化控制器
@@ -41,6 +70,12 @@ class GameController:
             hint_tool: 提示生成工具
             stuck_detector: 卡住检测器
             context: 游戏上下文
+            fused_agent: 融合回合 Agent，WORKFLOW_CONFIG["turn_mode"] 为 fused 时使用
+            reply_cache: 跨会话的主持人回复缓存，按故事复用相似问题的回复
+            stuck_gate: 卡住检测的本地门控，统计信号明确时跳过 stuck_detector 的 LLM 调用
+            graph: 进程内共用的已编译流程图，为 None 时为本控制器单独构建；
+                本会话的依赖在每次调用时通过 config 注入，图带检查点时以 context.game_id 作为 thread_id
+            summary_agent: 消息历史采用 summarize 策略时把溢出的旧消息并入摘要
         """
         self.reply_agent = reply_agent
         self.structure_agent = structure_agent
@@ -49,21 +84,42 @@ class GameController:
         self.hint_tool = hint_tool
         self.stuck_detector = stuck_detector
         self.context = context
+        self.fused_agent = fused_agent
+        self.reply_cache = reply_cache
+        self.stuck_gate = stuck_gate
+        self.summary_agent = summary_agent
         self.logger = logger
+        self.pending: Optional[PendingTurn] = None
         
-        # 构建流程图，直接传递依赖
-        self.graph = build_graph(
+        # 本会话的节点依赖，每次调用流程图时通过 config 注入
+        self.nodes = build_workflow_nodes(
             reply_agent=reply_agent,
             structure_agent=structure_agent,
             analysis_agent=analysis_agent,
             detection_agent=detection_agent,
             hint_tool=hint_tool,
             stuck_detector=stuck_detector,
-            context=context
+            context=context,
+            fused_agent=fused_agent,
+            reply_cache=reply_cache,
+            stuck_gate=stuck_gate,
+            summary_agent=summary_agent
         )
+        self.graph = graph if graph is not None else build_graph(nodes=self.nodes)
+        self.thread_id = context.game_id
+        self.checkpointed = self.graph.checkpointer is not None
+        self.graph_config = session_config(self.nodes, self.thread_id if self.checkpointed else None)
+        # 每回合初始状态的模板：只在这里构建并序列化一次 GameState，之后每回合浅拷贝后覆盖少数字段
+        self._turn_template = GameState(true_answer=context.answer).model_dump()
     
 
-    async def process_question(self, question: str, player_action: str = "question", current_answer: str = None) -> Dict[str, Any]:
+    async def process_question(
+        self,
+        question: str,
+        player_action: str = "question",
+        current_answer: str = None,
+        reply_first: Optional[bool] = None
+    ) -> Dict[str, Any]:
         """
         处理玩家问题
         
@@ -71,24 +127,217 @@ class GameController:
             question: 玩家问题
             player_action: 玩家动作类型，默认为"question"
             current_answer: 当提交答案时的答案内容
+            reply_first: 是否在主持人回复生成后立即返回，默认取 WORKFLOW_CONFIG["reply_first"]。
+                为 True 时结构分析、检测等节点作为后台任务继续执行，可通过 wait_pending() 获取完整结果
             
         Returns:
-            Dict[str, Any]: 处理结果状态
-        """
-        # 创建初始状态
-        initial_state = GameState(
-            player_action=player_action,
-            current_question=question,
-            current_answer=current_answer,
-            true_answer=self.context.answer
-        )
+            Dict[str, Any]: 处理结果状态（reply_first 时为回复生成后的状态）
+        """
+        if reply_first is None:
+            reply_first = WORKFLOW_CONFIG["reply_first"]
+
+        # 只有需要读取思维链的动作才等待上一回合的写入
+        if player_action in MEMORY_DEPENDENT_ACTIONS:
+            await self._wait_memory_ready()
+        await self._wait_checkpointed_run()
+
+        initial_state = self._initial_state(question, player_action, current_answer)
         
         # 运行工作流
         try:
+            if reply_first:
+                return await self._run_reply_first(initial_state)
             result = await self.graph.ainvoke(
-                initial_state.model_dump()
+                initial_state,
+                config=self.graph_config
             )
             return result
         except Exception as e:
             self.logger.error("处理问题时出错: %s", str(e))
-            raise 
\ No newline at end of file
+            raise
+
+    async def stream_question(
+        self,
+        question: str,
+        player_action: str = "question",
+        current_answer: str = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式处理玩家问题
+        
+        主持人回复在生成过程中逐段推送，之后依次推送各节点的结构化结果
+        
+        Args:
+            question: 玩家问题
+            player_action: 玩家动作类型，默认为"question"
+            current_answer: 当提交答案时的答案内容
+            
+        Yields:
+            Dict[str, Any]: 事件字典，包含以下三种：
+                - {"event": "token", "data": str}: host_reply 的新增片段
+                - {"event": "node", "node": str, "data": Dict}: 某个节点完成后的状态更新
+                - {"event": "result", "data": Dict}: 本回合的完整结果状态（最后一个事件）
+        """
+        if player_action in MEMORY_DEPENDENT_ACTIONS:
+            await self._wait_memory_ready()
+        await self._wait_checkpointed_run()
+
+        state = self._initial_state(question, player_action, current_answer)
+        current = dict(state)
+        try:
+            async for mode, chunk in self.graph.astream(state, config=self.graph_config, stream_mode=["custom", "updates"]):
+                if mode == "custom":
+                    token = chunk.get("host_reply_token") if isinstance(chunk, dict) else None
+                    if token:
+                        yield {"event": "token", "data": token}
+                    continue
+                for node, update in chunk.items():
+                    if update:
+                        current.update(update)
+                    yield {"event": "node", "node": node, "data": update or {}}
+        except Exception as e:
+            self.logger.error("流式处理问题时出错: %s", str(e))
+            raise
+        yield {"event": "result", "data": current}
+
+    async def wait_for_player(self) -> Dict[str, Any]:
+        """
+        挂起会话，等待玩家的下一个动作
+        
+        以空动作运行流程图，在 Get_player_action 处 interrupt 后返回；之后会话只保留为
+        检查点中的一条记录，不占用协程，由 submit_action 按 thread_id 恢复
+        
+        Returns:
+            Dict[str, Any]: interrupt 携带的提示
+            
+        Raises:
+            ValueError: 流程图没有检查点时无法恢复
+        """
+        self._require_checkpointer()
+        await self._wait_checkpointed_run()
+        state = self._initial_state(None, "None", None)
+        result = await self.graph.ainvoke(state, config=self.graph_config)
+        interrupts = result.get("__interrupt__") or []
+        return interrupts[0].value if interrupts else {}
+
+    async def submit_action(
+        self,
+        player_action: str,
+        question: Optional[str] = None,
+        current_answer: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        以玩家动作恢复 wait_for_player 挂起的会话，运行完整回合
+        
+        Args:
+            player_action: 玩家动作类型
+            question: 玩家问题
+            current_answer: 当提交答案时的答案内容
+            
+        Returns:
+            Dict[str, Any]: 本回合的结果状态
+            
+        Raises:
+            ValueError: 流程图没有检查点时无法恢复
+        """
+        self._require_checkpointer()
+        resume = {"player_action": player_action, "current_question": question, "current_answer": current_answer}
+        if player_action in MEMORY_DEPENDENT_ACTIONS:
+            await self._wait_memory_ready()
+        await self._wait_checkpointed_run()
+        return await self.graph.ainvoke(Command(resume=resume), config=self.graph_config)
+
+    def _require_checkpointer(self) -> None:
+        if not self.checkpointed:
+            raise ValueError("流程图没有配置检查点，无法挂起和恢复会话")
+
+    async def _wait_checkpointed_run(self) -> None:
+        """
+        带检查点时同一 thread_id 上的运行必须串行，等待后台回合全部结束
+        
+        回复优先模式因此不再与上一回合的分析与检测重叠，见 WORKFLOW_CONFIG["checkpointer"]
+        """
+        if self.checkpointed and self.pending is not None and not self.pending.done:
+            await asyncio.shield(self.pending.task)
+
+    def _initial_state(
+        self,
+        question: Optional[str],
+        player_action: str,
+        current_answer: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        创建一回合的初始状态字典
+        
+        所有字段都显式给出（带检查点时覆盖同一 thread_id 上一回合的结果），
+        模板中唯一的可变默认值 messages 每回合换成新列表
+        """
+        now = time.time()
+        return {
+            **self._turn_template,
+            "player_action": player_action,
+            "current_question": question,
+            "current_answer": current_answer,
+            "messages": [],
+            "timestamp": now,
+            "current_timestamp": now,
+        }
+
+    async def _run_reply_first(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        以回复优先模式运行一回合
+        
+        Args:
+            state: 初始状态字典
+            
+        Returns:
+            Dict[str, Any]: 回复生成后的状态
+        """
+        pending = PendingTurn()
+        reply_future = asyncio.get_running_loop().create_future()
+
+        async def drive() -> Dict[str, Any]:
+            current = dict(state)
+            try:
+                async for chunk in self.graph.astream(state, config=self.graph_config, stream_mode="updates"):
+                    for node, update in chunk.items():
+                        if update:
+                            current.update(update)
+                        # 融合回合通过校验时同时完成了回复与思维链写入
+                        fused = node == "fused_turn" and current.get("fused_turn_valid")
+                        if (node == "reply_generation" or fused) and not reply_future.done():
+                            reply_future.set_result(dict(current))
+                        if node == "structure_analysis" or fused:
+                            pending.memory_ready.set()
+            except Exception as e:
+                self.logger.error("后台回合执行出错: %s", str(e))
+                if not reply_future.done():
+                    reply_future.set_exception(e)
+            finally:
+                # 无论成功与否都不能让下一回合一直等待
+                pending.memory_ready.set()
+                if not reply_future.done():
+                    reply_future.set_result(dict(current))
+            pending.result = current
+            return current
+
+        pending.task = asyncio.create_task(drive())
+        self.pending = pending
+        return await reply_future
+
+    async def _wait_memory_ready(self) -> None:
+        """等待上一回合的思维链写入完成（不等待分析与检测）"""
+        if self.pending is not None and not self.pending.done:
+            await self.pending.memory_ready.wait()
+
+    async def wait_pending(self) -> Optional[Dict[str, Any]]:
+        """
+        等待后台回合全部执行完毕
+        
+        Returns:
+            Optional[Dict[str, Any]]: 该回合的完整结果状态，没有后台回合时为 None
+        """
+        if self.pending is None:
+            return None
+        await self.pending.task
+        return self.pending.result
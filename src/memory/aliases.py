@@ -0,0 +1,65 @@
+"""
+思维链ID短别名
+
+提示词中用 c1 / n7 这样的会话内短别名代替 36 位 UUID，
+LLM 输出中的别名再被翻译回真实ID
+"""
+from typing import Any, Dict, Literal
+
+AliasKind = Literal["chain", "node"]
+
+
+class IdAliases:
+    """会话内 UUID 与短别名的双向映射"""
+
+    PREFIXES: Dict[str, str] = {"chain": "c", "node": "n"}
+
+    __slots__ = ("_to_alias", "_to_id", "_counters")
+
+    def __init__(self):
+        self._to_alias: Dict[str, str] = {}
+        self._to_id: Dict[str, str] = {}
+        self._counters: Dict[str, int] = {kind: 0 for kind in self.PREFIXES}
+
+    def alias(self, full_id: str, kind: AliasKind) -> str:
+        """
+        获取ID的短别名，首次出现时分配
+
+        Args:
+            full_id: 原始ID
+            kind: ID类型，chain 或 node
+
+        Returns:
+            str: 短别名，例如 c1、n7
+        """
+        alias = self._to_alias.get(full_id)
+        if alias is None:
+            self._counters[kind] += 1
+            alias = f"{self.PREFIXES[kind]}{self._counters[kind]}"
+            self._to_alias[full_id] = alias
+            self._to_id[alias] = full_id
+        return alias
+
+    def resolve(self, value: Any) -> Any:
+        """
+        将别名翻译回原始ID，非别名原样返回
+
+        Args:
+            value: LLM 输出中的ID或别名
+
+        Returns:
+            Any: 原始ID
+        """
+        if not isinstance(value, str):
+            return value
+        return self._to_id.get(value.strip().lower(), value)
+
+    def clear(self) -> None:
+        """清空所有别名"""
+        self._to_alias.clear()
+        self._to_id.clear()
+        for kind in self._counters:
+            self._counters[kind] = 0
+
+    def __len__(self) -> int:
+        return len(self._to_alias)
@@ -0,0 +1,133 @@
+"""
+思维链与谜底的本地相似度评分
+
+每个故事的谜底只向量化一次（字符 n-gram + TF-IDF），之后对一条链的节点
+做一次矩阵运算即可得到覆盖度分数；新节点追加时只计算新增的行，
+用逐元素取最大值累积到链的覆盖向量上
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from functools import lru_cache
+import re
+import numpy as np
+from src.memory.node_store import NodeRecord
+from src.utils.question_rules import normalize_question
+from src.config import AGENT_CONFIG
+
+# 几乎每句话都会出现的单字，不计入词表
+STOP_CHARS = frozenset("的了是吗么呢他她它在有和也都这那个人就不没")
+
+# 谜底与故事按标点切成子句，作为计算 IDF 的文档集合
+_CLAUSE_SPLIT = re.compile(r"[，。！？；、,.!?;\s]+")
+
+
+def ngrams(text: str, ngram_range: Tuple[int, int] = (1, 2)) -> List[str]:
+    """生成归一化文本的字符 n-gram 列表（去掉停用单字）"""
+    normalized = normalize_question(text)
+    low, high = ngram_range
+    grams = []
+    for n in range(low, high + 1):
+        for i in range(len(normalized) - n + 1):
+            gram = normalized[i:i + n]
+            if n == 1 and gram in STOP_CHARS:
+                continue
+            grams.append(gram)
+    return grams
+
+
+class AnswerScorer:
+    """
+    单个故事谜底的向量化表示
+
+    节点得分为节点与谜底共有 n-gram 的 TF-IDF 权重占谜底总权重的比例，再乘以回复类型权重；
+    链得分为链上所有节点覆盖向量的逐元素最大值所覆盖的谜底权重比例
+    """
+
+    def __init__(
+        self,
+        answer: str,
+        story_text: str = "",
+        reply_weights: Optional[Dict[str, float]] = None,
+        ngram_range: Tuple[int, int] = (1, 2),
+    ):
+        """
+        预计算谜底向量
+
+        Args:
+            answer: 谜底
+            story_text: 故事正文，参与 IDF 统计以压低故事与谜底共有的常见字
+            reply_weights: 回复类型 -> 权重，例如被否定的问题只算部分进展
+            ngram_range: 字符 n-gram 的 n 取值范围
+        """
+        self.ngram_range = ngram_range
+        self.reply_weights = reply_weights or AGENT_CONFIG["analysis"]["reply_weights"]
+
+        answer_grams = ngrams(answer, ngram_range)
+        self.vocab: Dict[str, int] = {}
+        for gram in answer_grams:
+            self.vocab.setdefault(gram, len(self.vocab))
+
+        documents = [clause for clause in _CLAUSE_SPLIT.split(f"{answer}。{story_text}") if clause]
+        df = np.zeros(len(self.vocab))
+        for clause in documents:
+            for gram in set(ngrams(clause, ngram_range)):
+                pos = self.vocab.get(gram)
+                if pos is not None:
+                    df[pos] += 1
+        idf = np.log((1 + len(documents)) / (1 + df)) + 1.0
+
+        tf = np.zeros(len(self.vocab))
+        for gram in answer_grams:
+            tf[self.vocab[gram]] += 1
+        self.weights = tf * idf
+        self.total = float(self.weights.sum())
+
+    def _matrix(self, records: List[NodeRecord]) -> np.ndarray:
+        """节点 × 词表矩阵，节点包含某个 n-gram 时取该节点回复类型的权重"""
+        matrix = np.zeros((len(records), len(self.vocab)))
+        for row, record in enumerate(records):
+            columns = [self.vocab[gram] for gram in ngrams(record.content, self.ngram_range) if gram in self.vocab]
+            if columns:
+                matrix[row, columns] = self.reply_weights.get(record.reply_type, 0.0)
+        return matrix
+
+    def coverage(self, records: Iterable[NodeRecord]) -> np.ndarray:
+        """
+        计算一批节点的覆盖向量（逐元素最大值）
+
+        Args:
+            records: 节点记录
+
+        Returns:
+            np.ndarray: 长度为词表大小的覆盖向量，取值为节点回复类型权重
+        """
+        records = list(records)
+        if not records:
+            return np.zeros(len(self.vocab))
+        return self._matrix(records).max(axis=0)
+
+    def score(self, coverage: np.ndarray) -> float:
+        """覆盖向量对应的谜底权重比例，范围 0 ~ 1"""
+        if not self.total:
+            return 0.0
+        return round(float(coverage @ self.weights) / self.total, 4)
+
+    def score_nodes(self, records: Iterable[NodeRecord]) -> np.ndarray:
+        """
+        分别计算每个节点的得分
+
+        Args:
+            records: 节点记录
+
+        Returns:
+            np.ndarray: 每个节点一个分数
+        """
+        records = list(records)
+        if not records or not self.total:
+            return np.zeros(len(records))
+        return self._matrix(records) @ self.weights / self.total
+
+
+@lru_cache(maxsize=64)
+def get_answer_scorer(answer: str, story_text: str = "") -> AnswerScorer:
+    """同一故事的谜底只向量化一次，在所有会话间共用"""
+    return AnswerScorer(answer, story_text)
@@ -1,5 +1,5 @@
-from typing import List, Dict, Any, Optional, Literal
-from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Optional, Literal, Tuple, Iterator
+from pydantic import BaseModel, Field, PrivateAttr
 from langchain_core.memory import BaseMemory
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 import time
@@ -8,6 +8,14 @@ import logging
 import json
 import re
 from dataclasses import dataclass
+import numpy as np
+from src.memory.node_store import NodeStore, NodeRecord
+from src.memory.aliases import IdAliases
+from src.memory.answer_scorer import AnswerScorer
+from src.memory.session_stats import SessionStats
+from src.memory.event_log import BrainChainEventLog
+from src.utils.token_utils import estimate_tokens
+from src.config import CONTEXT_CONFIG
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +35,7 @@ class BrainNode(BaseModel):
 class BrainChain(BaseModel):
     """思维链"""
     chain_id: Optional[str] = Field(None, description="思维链唯一标识符")
-    nodes: Dict[str, BrainNode] = Field(default_factory=dict, description="节点存储")
+    nodes: NodeStore = Field(default_factory=NodeStore, description="节点存储（列式紧凑存储，取值时返回 BrainNode 视图）")
     root_node_id: Optional[str] = Field(None, description="根节点ID")
     current_focus_id: Optional[str] = Field(None, description="当前焦点节点ID")
     metadata: Dict[str, Any] = Field(
@@ -50,18 +58,96 @@ class BrainChain(BaseModel):
         Returns:
             BrainNode: 创建的节点实例
         """
-        # 创建 BrainNode 实例
+        # 创建 BrainNode 实例（对外接口，做完整校验）
         node = BrainNode(**node_data)
+        self.nodes.add(node)
+        self._set_focus(node.id)
+        return node
+
+    def append_node(
+        self,
+        node_id: str,
+        content: str,
+        timestamp: float,
+        parent_id: Optional[str] = None,
+        host_reply: str = "",
+        reply_type: str = "irrelevant",
+        notes: str = "",
+    ) -> str:
+        """
+        直接写入紧凑存储，不构建 BrainNode（内部热路径）
         
-        # 添加到节点集合
-        self.nodes[node.id] = node
-        self.current_focus_id = node.id
+        Returns:
+            str: 节点ID
+        """
+        self.nodes.append(node_id, content, timestamp, parent_id, host_reply, reply_type, notes)
+        self._set_focus(node_id)
+        return node_id
+
+    def _set_focus(self, node_id: str) -> None:
+        self.current_focus_id = node_id
+        if self.root_node_id is None:
+            self.root_node_id = node_id
+
+    def iter_nodes(self) -> Iterator[BrainNode]:
+        """按插入顺序遍历所有节点"""
+        return iter(self.nodes.values())
+
+    def get_children(self, node_id: str) -> List[BrainNode]:
+        """获取直接子节点"""
+        pos = self.nodes.position(node_id)
+        if pos < 0:
+            return []
+        return [self.nodes.view(child) for child in self.nodes.children(pos)]
+
+    def get_ancestor_path(self, node_id: Optional[str] = None) -> List[BrainNode]:
+        """
+        获取从根节点到指定节点的祖先路径，O(depth)
         
-        return node
+        Args:
+            node_id: 目标节点ID，如果为None则使用当前焦点节点
+            
+        Returns:
+            List[BrainNode]: 根 -> 目标节点 的路径，节点不存在时为空列表
+        """
+        return [self.nodes.view(pos) for pos in self._ancestor_positions(node_id)]
+
+    def get_subtree(self, node_id: str) -> List[BrainNode]:
+        """
+        获取以指定节点为根的子树（先序），O(subtree)
+        
+        Args:
+            node_id: 子树根节点ID
+            
+        Returns:
+            List[BrainNode]: 子树中的节点
+        """
+        pos = self.nodes.position(node_id)
+        if pos < 0:
+            return []
+        return [self.nodes.view(p) for _, p in self.nodes.walk([pos])]
+
+    def get_leaves(self) -> List[BrainNode]:
+        """获取所有叶子节点（按插入顺序）"""
+        return [self.nodes.view(pos) for pos in self.nodes.leaves()]
+
+    def iter_tree(self) -> Iterator[Tuple[int, NodeRecord]]:
+        """按树结构先序遍历所有节点，返回 (深度, 节点记录)"""
+        nodes = self.nodes
+        return ((depth, nodes.record(pos)) for depth, pos in nodes.walk())
+
+    def iter_focus_path(self) -> Iterator[NodeRecord]:
+        """遍历焦点路径上的节点记录（不构建 BrainNode）"""
+        nodes = self.nodes
+        return (nodes.record(pos) for pos in self._ancestor_positions(self.current_focus_id))
+
+    def _ancestor_positions(self, node_id: Optional[str]) -> List[int]:
+        pos = self.nodes.position(node_id or self.current_focus_id)
+        return self.nodes.ancestors(pos) if pos >= 0 else []
 
     def get_focus_path(self) -> List[BrainNode]:
-        """获取所有节点，按时间戳排序"""
-        return sorted(self.nodes.values(), key=lambda x: x.timestamp)
+        """获取当前焦点节点的祖先路径（根 -> 焦点）"""
+        return self.get_ancestor_path(self.current_focus_id)
 
 class BrainChainMemory(BaseMemory):
     """
@@ -73,6 +159,19 @@ class BrainChainMemory(BaseMemory):
     current_chain_id: Optional[str] = None
     current_focus_id: Optional[str] = None
     action_type: Literal["creat_add", "inference", "no_action"] = "no_action"
+    # 提示词中的序列化格式: full 为完整格式，compact 使用短别名并省略时间戳与装饰
+    prompt_format: Literal["full", "compact"] = "full"
+    # 渲染缓存: (格式, chain_id) -> (链实例, 渲染时节点数, 渲染片段)
+    _render_cache: Dict[Tuple[str, str], Tuple[BrainChain, int, str]] = PrivateAttr(default_factory=dict)
+    _summary_cache: Dict[str, str] = PrivateAttr(default_factory=dict)
+    _aliases: IdAliases = PrivateAttr(default_factory=IdAliases)
+    # 本地相似度评分: chain_id -> (链实例, 已评分节点数, 覆盖向量)
+    _answer_scorer: Optional[AnswerScorer] = PrivateAttr(default=None)
+    _similarity_state: Dict[str, Tuple[BrainChain, int, Any]] = PrivateAttr(default_factory=dict)
+    # 会话统计: 随节点追加流式更新，供卡住检测的本地规则使用
+    _session_stats: SessionStats = PrivateAttr(default_factory=SessionStats)
+    # 事件日志: 每次变更追加一条记录，为 None 时不持久化
+    _event_log: Optional[BrainChainEventLog] = PrivateAttr(default=None)
     
     def __init__(self, **kwargs):
         super().__init__()
@@ -81,42 +180,408 @@ class BrainChainMemory(BaseMemory):
         self.brainchains = kwargs.get("brainchains", {})
         self.current_chain_id = kwargs.get("current_chain_id", None)
         self.current_focus_id = kwargs.get("current_focus_id", None)
+        self.prompt_format = kwargs.get("prompt_format", CONTEXT_CONFIG["prompt_format"])
         
-    def summarize_brainchains(self) -> str:
+    def summarize_brainchains(self, prompt_format: Literal["full", "compact"] = "full") -> str:
         """
         生成所有思维链的结构化摘要
+
+        每条链的渲染片段会被缓存，只有发生变化（新增节点、元数据更新）的链才会重新渲染
+        
+        Args:
+            prompt_format: 序列化格式，full 为完整格式，compact 为短别名紧凑格式
         
         Returns:
             str: 格式化的思维链摘要
         """
-        lines = []
-        
+        cache = self._render_cache
+        fragments = []
+        changed = prompt_format not in self._summary_cache
         for chain_id, chain in self.brainchains.items():
-            meta = chain.metadata
-            lines.append(f"🔮 思维链 {chain_id}")
-            lines.append(f"  - 创建时间: {meta.get('created_at')}")
-            lines.append(f"  - 最近使用: {meta.get('last_used_at')}")
-            lines.append(f"  - 被访问次数: {meta.get('revisit_count')}")
-            lines.append(f"  - 相似性分数: {meta.get('path_similarity')}")
-            lines.append(f"  - 根节点 ID: {chain.root_node_id}")
-            
-            path = chain.get_focus_path()
-            lines.append(f"  - 焦点路径长度: {len(path)}")
-            lines.append("  - 节点路径:")
+            key = (prompt_format, chain_id)
+            cached = cache.get(key)
+            if cached is None or cached[0] is not chain or cached[1] != len(chain.nodes):
+                fragment = self._render_chain(chain_id, chain, prompt_format)
+                cache[key] = (chain, len(chain.nodes), fragment)
+                changed = True
+            else:
+                fragment = cached[2]
+            fragments.append(fragment)
+
+        # 清理已经不存在的链
+        stale = [key for key in cache if key[1] not in self.brainchains]
+        if stale:
+            for key in stale:
+                del cache[key]
+            changed = True
+
+        if changed:
+            self._summary_cache[prompt_format] = "\n".join(fragments)
+        return self._summary_cache[prompt_format]
+
+    def _render_chain(
+        self,
+        chain_id: str,
+        chain: BrainChain,
+        prompt_format: Literal["full", "compact"] = "full",
+    ) -> str:
+        """
+        渲染单条思维链的摘要片段
+        
+        Args:
+            chain_id: 思维链ID
+            chain: 思维链实例
+            prompt_format: 序列化格式
             
-            for depth, node in enumerate(path):
-                indent = "    " * (depth + 1)
-                lines.append(f"{indent}🔸 {node.content} ({node.id})")
-                lines.append(f"{indent}↳ 回复类型: {node.reply_type}")
+        Returns:
+            str: 摘要片段（full 格式以空行结尾）
+        """
+        lines = []
+        meta = chain.metadata
+        if prompt_format == "compact":
+            lines.append(
+                f"思维链 {self.prompt_id(chain_id, 'chain', prompt_format)} | 节点 {len(chain.nodes)}"
+                f" | 相似度 {self._similarity(meta)} | 回访 {meta.get('revisit_count')}"
+            )
+            self._render_nodes(lines, chain.iter_tree(), prompt_format)
+            return "\n".join(lines)
+
+        lines.append(f"🔮 思维链 {chain_id}")
+        lines.append(f"  - 创建时间: {meta.get('created_at')}")
+        lines.append(f"  - 最近使用: {meta.get('last_used_at')}")
+        lines.append(f"  - 被访问次数: {meta.get('revisit_count')}")
+        lines.append(f"  - 相似性分数: {self._similarity(meta)}")
+        lines.append(f"  - 根节点 ID: {chain.root_node_id}")
+        
+        path = chain._ancestor_positions(chain.current_focus_id)
+        lines.append(f"  - 焦点路径长度: {len(path)}")
+        lines.append("  - 节点路径:")
+        self._render_nodes(lines, chain.iter_tree())
+                
+        lines.append("")  # 每条链之间空行分隔
+        return "\n".join(lines)
+
+    def _render_nodes(
+        self,
+        lines: List[str],
+        entries,
+        prompt_format: Literal["full", "compact"] = "full",
+    ) -> None:
+        """按 (深度, 节点) 渲染节点行"""
+        if prompt_format == "compact":
+            for depth, node in entries:
+                line = " " * (depth + 1) + self.prompt_id(node.id, "node", prompt_format)
+                if node.parent_id:
+                    line += "<" + self.prompt_id(node.parent_id, "node", prompt_format)
+                line += f" 问:{node.content} 答:{node.reply_type}"
                 if node.host_reply:
-                    lines.append(f"{indent}↳ 回答内容: {node.host_reply}")
+                    line += f" {node.host_reply}"
                 if node.notes:
-                    lines.append(f"{indent}↳ 备注: {node.notes}")
-                    
-            lines.append("")  # 每条链之间空行分隔
+                    line += f" 注:{node.notes}"
+                lines.append(line)
+            return
+        for depth, node in entries:
+            indent = "    " * (depth + 1)
+            lines.append(f"{indent}🔸 {node.content} ({node.id})")
+            lines.append(f"{indent}↳ 回复类型: {node.reply_type}")
+            if node.host_reply:
+                lines.append(f"{indent}↳ 回答内容: {node.host_reply}")
+            if node.notes:
+                lines.append(f"{indent}↳ 备注: {node.notes}")
+
+    def summarize_focus_path(
+        self,
+        chain_id: Optional[str] = None,
+        prompt_format: Optional[Literal["full", "compact"]] = None,
+    ) -> str:
+        """
+        只渲染思维链中当前焦点所在的分支（根 -> 焦点）
+        
+        Args:
+            chain_id: 思维链ID，如果为None则使用当前活动思维链
+            prompt_format: 序列化格式，默认使用 self.prompt_format
             
+        Returns:
+            str: 焦点分支摘要，链不存在时为空字符串
+        """
+        chain = self.get_chain(chain_id)
+        if chain is None:
+            return ""
+        prompt_format = prompt_format or self.prompt_format
+        meta = chain.metadata
+        display_id = self.prompt_id(chain.chain_id or chain_id or self.current_chain_id, "chain", prompt_format)
+        if prompt_format == "compact":
+            lines = [
+                f"思维链 {display_id} | 相似度 {self._similarity(meta)}",
+                f" 分析: {meta.get('analysis_note')}",
+            ]
+        else:
+            lines = [
+                f"🔮 思维链 {display_id}",
+                f"  - 相似性分数: {self._similarity(meta)}",
+                f"  - 分析说明: {meta.get('analysis_note')}",
+                "  - 焦点分支:",
+            ]
+        self._render_nodes(lines, enumerate(chain.iter_focus_path()), prompt_format)
+        return "\n".join(lines)
+
+    def prompt_id(
+        self,
+        full_id: Optional[str],
+        kind: Literal["chain", "node"],
+        prompt_format: Optional[Literal["full", "compact"]] = None,
+    ) -> Optional[str]:
+        """
+        获取ID在提示词中的写法：compact 格式下为会话内短别名（c1、n7…）
+        
+        Args:
+            full_id: 原始ID
+            kind: ID类型，chain 或 node
+            prompt_format: 序列化格式，默认使用 self.prompt_format
+            
+        Returns:
+            Optional[str]: 提示词中使用的ID
+        """
+        if not full_id or (prompt_format or self.prompt_format) != "compact":
+            return full_id
+        return self._aliases.alias(full_id, kind)
+
+    def resolve_id(self, value: Any) -> Any:
+        """将 LLM 输出中的短别名翻译回原始ID，非别名原样返回"""
+        return self._aliases.resolve(value)
+
+    def build_context_window(
+        self,
+        token_budget: int,
+        chain_id: Optional[str] = None,
+        recent_nodes: Optional[int] = None,
+        prompt_format: Optional[Literal["full", "compact"]] = None,
+    ) -> str:
+        """
+        在 token 预算内构建思维链上下文
+        
+        当前链的最近若干节点原样保留，更早的节点与其他链（按最近活跃排序）退化为一行摘要，
+        超出预算的部分直接省略
+        
+        Args:
+            token_budget: token 预算（使用本地估算器计算）
+            chain_id: 当前思维链ID，如果为None则使用当前活动思维链
+            recent_nodes: 当前链原样保留的最近节点数，默认取 CONTEXT_CONFIG["recent_nodes"]
+            prompt_format: 序列化格式，默认使用 self.prompt_format
+            
+        Returns:
+            str: 思维链上下文
+        """
+        current_id = chain_id or self.current_chain_id
+        if recent_nodes is None:
+            recent_nodes = CONTEXT_CONFIG["recent_nodes"]
+        prompt_format = prompt_format or self.prompt_format
+        lines: List[str] = []
+        used = 0
+
+        def fits(*new_lines: str) -> bool:
+            nonlocal used
+            cost = sum(estimate_tokens(line) + 1 for line in new_lines)
+            if used + cost > token_budget:
+                return False
+            used += cost
+            return True
+
+        current = self.brainchains.get(current_id)
+        if current is not None:
+            header = (
+                f"{'当前思维链' if prompt_format == 'compact' else '🔮 当前思维链'}"
+                f" {self.prompt_id(current_id, 'chain', prompt_format)} | 节点 {len(current.nodes)}"
+                f" | 相似性分数: {self._similarity(current.metadata)}"
+            )
+            if fits(header):
+                lines.append(header)
+            # 从最新节点往前原样渲染，直到用完预算或达到条数
+            store = current.nodes
+            recent: List[List[str]] = []
+            first_kept = len(store)
+            for pos in range(len(store) - 1, max(len(store) - recent_nodes, 0) - 1, -1):
+                block: List[str] = []
+                self._render_nodes(block, [(0, store.record(pos))], prompt_format)
+                if not fits(*block):
+                    break
+                recent.append(block)
+                first_kept = pos
+            if first_kept > 0:
+                older = self._digest_records(store.record(p) for p in range(first_kept))
+                digest = f"  - 更早的 {first_kept} 个节点: {older}"
+                if fits(digest):
+                    lines.append(digest)
+            for block in reversed(recent):
+                lines.extend(block)
+
+        # 其他链按最近活跃时间倒序，每条一行
+        others = sorted(
+            (item for item in self.brainchains.items() if item[0] != current_id),
+            key=lambda item: self._last_active(item[1]),
+            reverse=True,
+        )
+        for shown, (other_id, chain) in enumerate(others):
+            line = self._digest_chain(other_id, chain, prompt_format)
+            if not fits(line):
+                rest = f"  ... 另有 {len(others) - shown} 条思维链未展示"
+                if fits(rest):
+                    lines.append(rest)
+                break
+            lines.append(line)
+
         return "\n".join(lines)
+
+    @staticmethod
+    def _last_active(chain: BrainChain) -> float:
+        """思维链最近活跃时间：最后一个节点的时间戳"""
+        store = chain.nodes
+        if len(store):
+            return store.record(len(store) - 1).timestamp
+        return chain.metadata.get("created_at") or 0.0
+
+    @staticmethod
+    def _digest_records(records) -> str:
+        """统计一组节点的回复类型分布"""
+        counts: Dict[str, int] = {}
+        for record in records:
+            counts[record.reply_type] = counts.get(record.reply_type, 0) + 1
+        return "，".join(f"{reply_type}×{count}" for reply_type, count in counts.items())
+
+    def _digest_chain(
+        self,
+        chain_id: str,
+        chain: BrainChain,
+        prompt_format: Literal["full", "compact"] = "full",
+    ) -> str:
+        """将一条思维链压缩为一行摘要"""
+        store = chain.nodes
+        last = store.record(len(store) - 1).content if len(store) else ""
+        return (
+            f"{'思维链' if prompt_format == 'compact' else '🔹 思维链'}"
+            f" {self.prompt_id(chain_id, 'chain', prompt_format)} | 节点 {len(store)} ({self._digest_records(store.records())})"
+            f" | 相似性分数: {self._similarity(chain.metadata)} | 最近问题: {last}"
+        )
+
+    def invalidate_render_cache(self, chain_id: Optional[str] = None) -> None:
+        """
+        使思维链的渲染缓存失效
+        
+        直接修改 BrainChain（例如绕过本类写 metadata）后需要调用此方法
+        
+        Args:
+            chain_id: 思维链ID，如果为None则清空全部缓存
+        """
+        if chain_id is None:
+            self._render_cache.clear()
+        else:
+            for key in [key for key in self._render_cache if key[1] == chain_id]:
+                del self._render_cache[key]
+        self._summary_cache.clear()
+
+    def update_chain_metadata(self, chain_id: str, **fields: Any) -> None:
+        """
+        更新思维链元数据并使其渲染缓存失效
+        
+        Args:
+            chain_id: 思维链ID
+            **fields: 要更新的元数据字段
+        """
+        chain = self.brainchains.get(chain_id)
+        if chain is None:
+            raise ValueError(f"思维链 {chain_id} 不存在")
+        self._update_chain_metadata(chain_id, fields)
+        self._record("update_metadata", chain_id=chain_id, fields=fields)
+
+    def _update_chain_metadata(self, chain_id: str, fields: Dict[str, Any]) -> None:
+        self.brainchains[chain_id].metadata.update(fields)
+        self.invalidate_render_cache(chain_id)
     
+    def set_answer_scorer(self, scorer: Optional[AnswerScorer]) -> None:
+        """
+        设置谜底评分器，之后每次追加节点都会本地更新链的 local_similarity
+        
+        本地分数与 LLM 写入的 path_similarity 量纲不同，分开存放；启用本地评分后
+        对外报告与提示词中展示的都是本地分数（见 reported_similarity）
+        
+        Args:
+            scorer: 当前故事的 AnswerScorer，为 None 时关闭本地评分
+        """
+        self._answer_scorer = scorer
+        self._similarity_state.clear()
+        for chain_id, chain in self.brainchains.items():
+            if scorer is not None:
+                self._update_local_similarity(chain_id)
+            elif chain.metadata.pop("local_similarity", None) is not None:
+                self.invalidate_render_cache(chain_id)
+
+    def _update_local_similarity(self, chain_id: str) -> None:
+        """只对新追加的节点评分，累积到链的覆盖向量上"""
+        scorer = self._answer_scorer
+        chain = self.brainchains.get(chain_id)
+        if scorer is None or chain is None:
+            return
+        state = self._similarity_state.get(chain_id)
+        store = chain.nodes
+        if state is not None and state[0] is chain:
+            start, coverage = state[1], state[2]
+        else:
+            start, coverage = 0, None
+        if start == len(store) and coverage is not None:
+            return
+        new_coverage = scorer.coverage(store.record(pos) for pos in range(start, len(store)))
+        coverage = new_coverage if coverage is None else np.maximum(coverage, new_coverage)
+        self._similarity_state[chain_id] = (chain, len(store), coverage)
+        score = scorer.score(coverage)
+        if chain.metadata.get("local_similarity") != score:
+            chain.metadata["local_similarity"] = score
+            # 渲染的摘要中展示该分数
+            self.invalidate_render_cache(chain_id)
+
+    @staticmethod
+    def _similarity(meta: Dict[str, Any]) -> Any:
+        """提示词中展示的相似度：启用本地评分时为 local_similarity，否则为 LLM 写入的 path_similarity"""
+        return meta.get("local_similarity", meta.get("path_similarity"))
+
+    def local_similarity(self, chain_id: Optional[str] = None) -> Optional[float]:
+        """
+        获取链的本地相似度分数
+        
+        Args:
+            chain_id: 思维链ID，默认当前链
+            
+        Returns:
+            Optional[float]: 未设置评分器或链不存在时为 None
+        """
+        target_id = chain_id or self.current_chain_id
+        if self._answer_scorer is None or target_id not in self.brainchains:
+            return None
+        self._update_local_similarity(target_id)
+        return self.brainchains[target_id].metadata.get("local_similarity")
+
+    def reported_similarity(self, chain_id: Optional[str] = None) -> float:
+        """
+        获取对外报告的 path_similarity
+        
+        启用本地评分时始终是本地分数，不与 LLM 的分数混用；否则为 LLM 写入元数据的分数
+        
+        Args:
+            chain_id: 思维链ID，默认当前链
+            
+        Returns:
+            float: 相似度分数，链不存在时为 0.0
+        """
+        local = self.local_similarity(chain_id)
+        if local is not None:
+            return local
+        chain = self.get_chain(chain_id or self.current_chain_id)
+        return chain.metadata.get("path_similarity", 0.0) if chain is not None else 0.0
+
+    @property
+    def session_stats(self) -> SessionStats:
+        """本会话的流式提问统计"""
+        return self._session_stats
+
     def create_chain(self) -> str:
         """
         创建新的思维链
@@ -125,9 +590,27 @@ class BrainChainMemory(BaseMemory):
             str: 新思维链ID
         """
         chain_id = str(uuid.uuid4())
-        self.brainchains[chain_id] = BrainChain(chain_id=chain_id)
-        self.current_chain_id = chain_id
+        created_at = time.time()
+        self._create_chain(chain_id, created_at)
+        self._record("create_chain", chain_id=chain_id, created_at=created_at)
         return chain_id
+
+    def _create_chain(self, chain_id: str, created_at: float) -> None:
+        chain = BrainChain(chain_id=chain_id)
+        chain.metadata["created_at"] = chain.metadata["last_used_at"] = created_at
+        self.brainchains[chain_id] = chain
+        self.invalidate_render_cache(chain_id)
+        self.current_chain_id = chain_id
+
+    def switch_chain(self, chain_id: str) -> None:
+        """
+        切换当前思维链（回访旧链）
+        
+        Args:
+            chain_id: 思维链ID
+        """
+        self.current_chain_id = chain_id
+        self._record("switch_chain", chain_id=chain_id)
     
     def get_chain(self, chain_id: Optional[str] = None) -> Optional[BrainChain]:
         """
@@ -170,24 +653,118 @@ class BrainChainMemory(BaseMemory):
         if chain_id not in self.brainchains:
             raise ValueError(f"思维链 {chain_id} 不存在")
             
+        node = NodeRecord(str(uuid.uuid4()), content, time.time(), parent_id, host_reply, reply_type, notes)
+        self._append_node(chain_id, node)
+        self._record("add_node", chain_id=chain_id, node=list(node))
+        logger.warning(f"添加节点 {node.id} 到思维链 {chain_id}")
+        return node.id
+
+    def _append_node(self, chain_id: str, node: NodeRecord) -> None:
         chain = self.brainchains[chain_id]
-        node_id = str(uuid.uuid4())
-        timestamp = time.time()
-        
-        node_data = {
-            "id": node_id,
-            "content": content,
-            "timestamp": timestamp,
-            "parent_id": parent_id,
-            "host_reply": host_reply,
-            "reply_type": reply_type,
-            "notes": notes
+        new_chain = len(chain.nodes) == 0
+        chain.append_node(*node)
+        self._update_local_similarity(chain_id)
+        self._session_stats.observe(node.reply_type, new_chain)
+        self.invalidate_render_cache(chain_id)
+        self.current_focus_id = node.id
+
+    def attach_event_log(self, event_log: BrainChainEventLog) -> None:
+        """
+        开始把变更写入事件日志，先以当前内容写一次快照作为起点
+        
+        Args:
+            event_log: 本会话的事件日志
+        """
+        self._event_log = event_log
+        event_log.snapshot(self.to_snapshot())
+
+    def restore_from(self, event_log: BrainChainEventLog) -> None:
+        """
+        从事件日志恢复思维链：加载最近的快照，重放其后的事件，之后的变更继续写入该日志
+        
+        Args:
+            event_log: 本会话的事件日志
+        """
+        state, events = event_log.load()
+        if state is not None:
+            self.load_snapshot(state)
+        for event in events:
+            self.apply_event(event)
+        self._event_log = event_log
+
+    def _record(self, op: str, **fields: Any) -> None:
+        """追加一条事件，达到压缩间隔时写快照"""
+        event_log = self._event_log
+        if event_log is None:
+            return
+        event_log.append(op, **fields)
+        if event_log.needs_snapshot:
+            event_log.snapshot(self.to_snapshot())
+
+    def apply_event(self, event: Dict[str, Any]) -> None:
+        """
+        重放一条事件（不再写回日志）
+        
+        Args:
+            event: 事件日志中的一条记录
+        """
+        op = event["op"]
+        if op == "create_chain":
+            self._create_chain(event["chain_id"], event["created_at"])
+        elif op == "add_node":
+            self._append_node(event["chain_id"], NodeRecord(*event["node"]))
+        elif op == "switch_chain":
+            self.current_chain_id = event["chain_id"]
+        elif op == "update_metadata":
+            self._update_chain_metadata(event["chain_id"], event["fields"])
+        elif op == "clear":
+            self._clear()
+        else:
+            raise ValueError(f"未知的思维链事件: {op}")
+
+    def to_snapshot(self) -> Dict[str, Any]:
+        """
+        导出可 JSON 序列化的完整快照
+        
+        Returns:
+            Dict[str, Any]: 各思维链的节点、焦点与元数据，以及当前链、当前焦点和会话统计
+        """
+        return {
+            "current_chain_id": self.current_chain_id,
+            "current_focus_id": self.current_focus_id,
+            "brainchains": {
+                key: {
+                    "chain_id": chain.chain_id,
+                    "root_node_id": chain.root_node_id,
+                    "current_focus_id": chain.current_focus_id,
+                    "metadata": chain.metadata,
+                    "nodes": [list(record) for record in chain.nodes.records()],
+                }
+                for key, chain in self.brainchains.items()
+            },
+            "session_stats": self._session_stats.to_dict(),
         }
+
+    def load_snapshot(self, state: Dict[str, Any]) -> None:
+        """
+        用 to_snapshot 的结果替换当前内容
         
-        node = chain.add_node(node_data)
-        self.current_focus_id = node_id
-        logger.warning(f"添加节点 {node_id} 到思维链 {chain_id}")
-        return node_id
+        Args:
+            state: 记忆快照
+        """
+        self.brainchains = {}
+        for key, data in state["brainchains"].items():
+            chain = BrainChain(chain_id=data["chain_id"], metadata=data["metadata"])
+            for node in data["nodes"]:
+                chain.append_node(*node)
+            chain.root_node_id = data["root_node_id"]
+            chain.current_focus_id = data["current_focus_id"]
+            self.brainchains[key] = chain
+        self.current_chain_id = state["current_chain_id"]
+        self.current_focus_id = state["current_focus_id"]
+        self._session_stats = SessionStats.from_dict(state["session_stats"])
+        self._similarity_state.clear()
+        self.invalidate_render_cache()
     
     @property
     def memory_variables(self) -> List[str]:
@@ -199,13 +776,18 @@ class BrainChainMemory(BaseMemory):
         加载所有思维链的完整内容
         
         Args:
-            inputs: 输入参数字典
+            inputs: 输入参数字典，包含 context_budget 时按 token 预算构建上下文
             
         Returns:
             Dict[str, str]: 包含所有思维链内容的字典
         """
+        token_budget = inputs.get("context_budget") if inputs else None
+        if token_budget:
+            return {
+                self.memory_key: self.build_context_window(token_budget)
+            }
         return {
-            self.memory_key: self.summarize_brainchains()
+            self.memory_key: self.summarize_brainchains(self.prompt_format)
         }
 
     def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
@@ -213,11 +795,13 @@ class BrainChainMemory(BaseMemory):
         实现 BaseMemory 接口，保存上下文
         
         Args:
-            inputs: 输入参数字典，包含玩家问题
+            inputs: 输入参数字典，包含玩家问题；可携带 action_type，
+                优先于 self.action_type（多个 Agent 并发运行时避免互相覆盖）
             outputs: 输出参数字典，包含主持人回答
         """
-        logger.warning(f"save_context 开始，action_type: {self.action_type}")
-        if self.action_type == "creat_add":
+        action_type = inputs.get("action_type") or self.action_type
+        logger.warning(f"save_context 开始，action_type: {action_type}")
+        if action_type == "creat_add":
             if isinstance(outputs, dict) and "output" in outputs and isinstance(outputs["output"], str):
                 output_str = outputs["output"]
                 logger.warning(f"⚠️ LLM 输出为字符串，尝试解析 JSON：{output_str[:100]}...")
@@ -238,8 +822,9 @@ class BrainChainMemory(BaseMemory):
             host_reply = inputs.get("host_reply", "")
             reply_type = inputs.get("reply_type", "irrelevant")
             notes = inputs.get("notes", "")
-            parent_id = outputs.get("parent_id", "")
-            chain_id = outputs.get("chain_id", "")
+            # 提示词使用短别名时，将 LLM 返回的别名翻译回真实ID
+            parent_id = self.resolve_id(outputs.get("parent_id", ""))
+            chain_id = self.resolve_id(outputs.get("chain_id", ""))
             if not question or not host_reply:
                 logger.warning("问题或回答为空，跳过保存")
                 return
@@ -256,19 +841,28 @@ class BrainChainMemory(BaseMemory):
                     notes=notes
                 )
             elif structure_type == "old":
+                if chain_id not in self.brainchains:
+                    logger.warning(f"旧思维链 {chain_id} 不存在，跳过保存")
+                    return
+                # 回访旧链：切换当前链，未给出父节点时接在该链的焦点节点后
+                self.switch_chain(chain_id)
                 self.add_node(
                     content=question,
                     chain_id=chain_id,
-                    parent_id=parent_id,
+                    parent_id=parent_id or self.brainchains[chain_id].current_focus_id,
                     host_reply=host_reply,
                     reply_type=reply_type,
                     notes=notes
                 )
             elif structure_type == "current":
+                current_chain = self.get_chain(self.current_chain_id)
+                if current_chain is None:
+                    logger.warning("当前思维链不存在，跳过保存")
+                    return
                 self.add_node(
                     content=question,
                     chain_id=self.current_chain_id,
-                    parent_id=parent_id,
+                    parent_id=parent_id or current_chain.current_focus_id,
                     host_reply=host_reply,
                     reply_type=reply_type,
                     notes=notes
@@ -280,7 +874,7 @@ class BrainChainMemory(BaseMemory):
             logger.warning(f"save_context 结束，当前思维链: {self.brainchains}\n"
                         f"当前焦点: {self.current_focus_id}\n"
                         f"当前思维链ID: {self.current_chain_id}")
-        if self.action_type == "inference":
+        if action_type == "inference":
             if isinstance(outputs, dict) and "output" in outputs and isinstance(outputs["output"], str):
                 output_str = outputs["output"]
                 logger.warning(f"⚠️ LLM 输出为字符串，尝试解析 JSON：{output_str[:100]}...")
@@ -297,18 +891,27 @@ class BrainChainMemory(BaseMemory):
                 logger.error("❌ 无法从输出中提取 JSON 对象，跳过保存")
                 return
 
-            chain = self.get_chain(self.current_chain_id)
-            if chain:
-                chain.metadata["analysis_note"] = outputs.get("analysis_note", "")
-                chain.metadata["path_similarity"] = outputs.get("path_similarity", 0.0)
-        if self.action_type == "no_action":
+            if self.get_chain(self.current_chain_id):
+                self.update_chain_metadata(
+                    self.current_chain_id,
+                    analysis_note=outputs.get("analysis_note", ""),
+                    path_similarity=outputs.get("path_similarity", 0.0)
+                )
+        if action_type == "no_action":
             pass
 
     def clear(self) -> None:
         """
         实现 BaseMemory 接口，清除所有记忆
         """
+        self._clear()
+        self._record("clear")
+
+    def _clear(self) -> None:
         self.brainchains.clear()
+        self.invalidate_render_cache()
+        self._aliases.clear()
+        self._session_stats.reset()
         self.current_chain_id = None
         logger.info("清除所有思维链")
 
@@ -0,0 +1,144 @@
+"""
+思维链的追加式事件日志
+
+BrainChainMemory 的每次变更（建链、加节点、切换当前链、更新元数据、清空）
+追加写入一行 JSON，单次保存的代价与会话长度无关；累积足够多的事件后写一次完整快照
+并截断日志，恢复时读取最近的快照再重放其后的事件。
+
+快照间隔至少为 snapshot_every 条事件，且不小于上次快照覆盖的事件数，
+快照本身的代价摊到每条事件上仍是 O(1)，恢复时重放的事件数不超过快照规模
+
+文件布局（以 game_001.jsonl 为例）:
+    game_001.jsonl           快照之后的事件，每行 {"seq": 序号, "op": 操作, ...字段}
+    game_001.snapshot.json   {"seq": 快照包含的最后一个事件序号, "state": 记忆快照}
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+import json
+import logging
+import os
+from src.config import CONTEXT_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class BrainChainEventLog:
+    """单个会话的事件日志与快照文件"""
+
+    def __init__(self, path: Path, snapshot_every: int = CONTEXT_CONFIG["event_log"]["snapshot_every"]):
+        """
+        初始化事件日志
+
+        Args:
+            path: 事件日志文件路径，父目录不存在时自动创建；快照保存在同名的 .snapshot.json 文件中
+            snapshot_every: 两次快照之间的最少事件数
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.snapshot_path = self.path.with_suffix(".snapshot.json")
+        self.snapshot_every = snapshot_every
+        self.seq = 0
+        # 上次快照覆盖的事件数，以及此后追加的事件数
+        self.snapshot_seq = 0
+        self.pending = 0
+        self._file = None
+
+    def exists(self) -> bool:
+        """磁盘上是否已有该会话的快照或事件"""
+        return self.snapshot_path.exists() or self.path.exists()
+
+    def load(self) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        读取最近的快照及其后的事件
+
+        快照写入后、日志截断前崩溃时，日志中残留的旧事件按序号跳过；
+        最后一行写到一半时忽略该行
+
+        Returns:
+            Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]: (记忆快照, 待重放事件)
+        """
+        state, snapshot_seq = None, 0
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            state, snapshot_seq = snapshot["state"], snapshot["seq"]
+
+        events = []
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning("事件日志 %s 末尾有不完整的记录，忽略", self.path)
+                        break
+                    if event["seq"] > snapshot_seq:
+                        events.append(event)
+
+        self.seq = events[-1]["seq"] if events else snapshot_seq
+        self.snapshot_seq = snapshot_seq
+        self.pending = len(events)
+        return state, events
+
+    def append(self, op: str, **fields: Any) -> None:
+        """
+        追加一条事件
+
+        Args:
+            op: 操作名
+            **fields: 重放该操作所需的字段
+        """
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self.seq += 1
+        self._file.write(json.dumps({"seq": self.seq, "op": op, **fields}, ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+        self.pending += 1
+
+    @property
+    def needs_snapshot(self) -> bool:
+        """距上次快照的事件数是否已达到压缩间隔"""
+        return self.pending >= max(self.snapshot_every, self.snapshot_seq)
+
+    def snapshot(self, state: Dict[str, Any]) -> None:
+        """
+        写入完整快照并截断事件日志
+
+        快照先写临时文件再原子替换，任何时刻崩溃都能恢复到一致的状态
+
+        Args:
+            state: BrainChainMemory.to_snapshot() 的结果，包含截至当前序号的全部变更
+        """
+        tmp_path = self.snapshot_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"seq": self.seq, "state": state}, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, self.snapshot_path)
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.path, "w", encoding="utf-8")
+        self.snapshot_seq = self.seq
+        self.pending = 0
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def build_event_log(game_id: str, config: Dict[str, Any]) -> Optional[BrainChainEventLog]:
+    """
+    按 CONTEXT_CONFIG["event_log"] 创建会话的事件日志
+
+    Args:
+        game_id: 游戏ID，作为日志文件名
+        config: 事件日志配置
+
+    Returns:
+        Optional[BrainChainEventLog]: 未启用时返回 None
+    """
+    if not config.get("enabled"):
+        return None
+    return BrainChainEventLog(
+        Path(config["directory"]) / f"{game_id}.jsonl",
+        snapshot_every=config.get("snapshot_every", 200),
+    )
@@ -0,0 +1,190 @@
+"""
+思维链节点的近重复索引
+
+玩家绕圈子时往往会重复或换个说法再问同一个问题。对每个会话的节点内容
+做字符 shingle + MinHash 签名，用 LSH 分桶找出候选，再计算精确 Jaccard
+相似度，每回合只需增量索引新节点，查询耗时在亚毫秒级
+"""
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+import random
+import zlib
+from src.memory.brainchain import BrainChain, BrainChainMemory
+from src.utils.question_rules import normalize_question
+from src.config import AGENT_CONFIG
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def shingles(text: str, size: int = 2) -> FrozenSet[str]:
+    """
+    生成归一化文本的字符 shingle 集合
+
+    Args:
+        text: 原始文本
+        size: shingle 长度，文本不足该长度时整体作为一个 shingle
+
+    Returns:
+        FrozenSet[str]: shingle 集合
+    """
+    normalized = normalize_question(text)
+    if len(normalized) <= size:
+        return frozenset([normalized]) if normalized else frozenset()
+    return frozenset(normalized[i:i + size] for i in range(len(normalized) - size + 1))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """两个集合的 Jaccard 相似度"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHashLSH:
+    """
+    MinHash 签名 + LSH 分桶索引
+
+    签名长度为 bands * rows；两个集合在某一段（band）上签名完全一致即成为候选，
+    Jaccard 为 s 时成为候选的概率是 1 - (1 - s^rows)^bands
+    """
+
+    def __init__(self, bands: int = 32, rows: int = 2, seed: int = 7):
+        """
+        初始化索引
+
+        Args:
+            bands: LSH 段数
+            rows: 每段的签名行数
+            seed: 哈希参数的随机种子，保证不同进程签名一致
+        """
+        self.bands = bands
+        self.rows = rows
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(bands * rows)
+        ]
+        self._buckets: List[Dict[Tuple[int, ...], List[str]]] = [{} for _ in range(bands)]
+        self._sets: Dict[str, FrozenSet[str]] = {}
+
+    def signature(self, items: FrozenSet[str]) -> List[int]:
+        """计算集合的 MinHash 签名"""
+        hashes = [zlib.crc32(item.encode("utf-8")) for item in items]
+        return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._perms]
+
+    def _bands(self, signature: List[int]):
+        rows = self.rows
+        for band in range(self.bands):
+            yield band, tuple(signature[band * rows:(band + 1) * rows])
+
+    def add(self, key: str, items: FrozenSet[str]) -> None:
+        """加入一个集合，空集合不索引"""
+        if not items or key in self._sets:
+            return
+        self._sets[key] = items
+        for band, bucket_key in self._bands(self.signature(items)):
+            self._buckets[band].setdefault(bucket_key, []).append(key)
+
+    def query(self, items: FrozenSet[str], exclude: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """
+        查找相似集合
+
+        Args:
+            items: 查询集合
+            exclude: 需要排除的键
+
+        Returns:
+            List[Tuple[str, float]]: (键, 精确 Jaccard 相似度)，按相似度降序
+        """
+        if not items:
+            return []
+        candidates: Set[str] = set()
+        for band, bucket_key in self._bands(self.signature(items)):
+            candidates.update(self._buckets[band].get(bucket_key, ()))
+        if exclude:
+            candidates -= exclude
+        scored = [(key, jaccard(items, self._sets[key])) for key in candidates]
+        scored.sort(key=lambda pair: pair[1], reverse=True)
+        return scored
+
+    def __len__(self) -> int:
+        return len(self._sets)
+
+
+class LoopVerdict(NamedTuple):
+    """本地绕圈判断结果"""
+    is_looping: Optional[bool]  # None 表示信号模糊，需要交给 LLM 判断
+    similarity: float
+    match_node_id: Optional[str]
+    match_content: Optional[str]
+
+
+class LoopDetector:
+    """
+    基于 MinHashLSH 的绕圈检测器
+
+    与 BrainChainMemory 绑定，查询前把各链新追加的节点增量加入索引
+    """
+
+    def __init__(
+        self,
+        memory: BrainChainMemory,
+        loop_threshold: float = AGENT_CONFIG["loop_detection"]["loop_threshold"],
+        clear_threshold: float = AGENT_CONFIG["loop_detection"]["clear_threshold"],
+        bands: int = AGENT_CONFIG["loop_detection"]["bands"],
+        rows: int = AGENT_CONFIG["loop_detection"]["rows"],
+    ):
+        """
+        初始化检测器
+
+        Args:
+            memory: 思维链记忆
+            loop_threshold: 相似度不低于该值时判定为绕圈
+            clear_threshold: 相似度低于该值时判定为未绕圈，介于两者之间为模糊信号
+            bands / rows: LSH 参数
+        """
+        self.memory = memory
+        self.loop_threshold = loop_threshold
+        self.clear_threshold = clear_threshold
+        self.index = MinHashLSH(bands=bands, rows=rows)
+        self._contents: Dict[str, str] = {}
+        # chain_id -> (链实例, 已索引节点数)；节点存储只追加，按位置增量同步
+        self._synced: Dict[str, Tuple[BrainChain, int]] = {}
+
+    def sync(self) -> None:
+        """把 memory 中新增的节点加入索引"""
+        for chain_id, chain in self.memory.brainchains.items():
+            synced = self._synced.get(chain_id)
+            start = synced[1] if synced is not None and synced[0] is chain else 0
+            store = chain.nodes
+            for pos in range(start, len(store)):
+                record = store.record(pos)
+                self._contents[record.id] = record.content
+                self.index.add(record.id, shingles(record.content))
+            self._synced[chain_id] = (chain, len(store))
+
+    def check(self, question: str, exclude_node_id: Optional[str] = None) -> LoopVerdict:
+        """
+        判断问题是否与之前的节点重复
+
+        Args:
+            question: 当前问题
+            exclude_node_id: 当前问题自身对应的节点（结构分析已写入时需要排除）
+
+        Returns:
+            LoopVerdict: 判断结果与最相似的历史节点
+        """
+        self.sync()
+        matches = self.index.query(
+            shingles(question or ""),
+            exclude={exclude_node_id} if exclude_node_id else None
+        )
+        if not matches:
+            return LoopVerdict(False, 0.0, None, None)
+        node_id, similarity = matches[0]
+        if similarity >= self.loop_threshold:
+            is_looping = True
+        elif similarity < self.clear_threshold:
+            is_looping = False
+        else:
+            is_looping = None
+        return LoopVerdict(is_looping, similarity, node_id, self._contents.get(node_id))
@@ -0,0 +1,145 @@
+"""
+GameState.messages 的有界消息历史
+
+add_messages 会无限追加提示与回复，带检查点时每一步都要重新持久化越来越长的列表。
+这里的 reducer 先按 add_messages 合并（支持按 id 替换与 RemoveMessage），再按策略截断:
+    last_n       - 只保留最近 max_messages 条消息
+    token_budget - 从最新消息向前保留，本地估算的 token 总数不超过 max_tokens（至少保留最新一条）
+    summarize    - 追加消息的节点先用 SummaryAgent 把溢出的旧消息并入一条摘要消息再删除（见 fold_overflow），
+                   reducer 按 last_n 兜底截断，未配置 SummaryAgent 时等同 last_n
+
+摘要消息的 id 固定为 HISTORY_SUMMARY_ID，不计入条数与 token 预算，始终排在最前
+"""
+from typing import Any, Callable, List, Optional, Tuple
+from langchain_core.messages import AnyMessage, RemoveMessage, SystemMessage
+from langgraph.graph.message import Messages, add_messages
+from src.utils.token_utils import estimate_tokens
+from src.config import WORKFLOW_CONFIG
+
+HISTORY_SUMMARY_ID = "history_summary"
+
+
+def split_summary(messages: List[AnyMessage]) -> Tuple[Optional[AnyMessage], List[AnyMessage]]:
+    """
+    拆出摘要消息
+
+    Returns:
+        Tuple[Optional[AnyMessage], List[AnyMessage]]: (摘要消息, 其余消息)
+    """
+    summary, rest = None, []
+    for message in messages:
+        if message.id == HISTORY_SUMMARY_ID:
+            summary = message
+        else:
+            rest.append(message)
+    return summary, rest
+
+
+def message_tokens(message: AnyMessage) -> int:
+    """估算单条消息内容的 token 数"""
+    content = message.content
+    return estimate_tokens(content if isinstance(content, str) else str(content))
+
+
+def trim_messages_to_policy(
+    messages: List[AnyMessage],
+    policy: str,
+    max_messages: int,
+    max_tokens: int
+) -> List[AnyMessage]:
+    """
+    按策略截断消息历史
+
+    Args:
+        messages: 合并后的消息列表
+        policy: last_n / token_budget / summarize
+        max_messages: last_n 与 summarize 保留的消息条数
+        max_tokens: token_budget 的 token 预算
+
+    Returns:
+        List[AnyMessage]: 截断后的消息，摘要消息（若有）在最前；无需截断时原样返回
+    """
+    summary, rest = split_summary(messages)
+    if policy == "token_budget":
+        kept, total = 0, 0
+        for message in reversed(rest):
+            total += message_tokens(message)
+            if kept and total > max_tokens:
+                break
+            kept += 1
+    elif policy in ("last_n", "summarize"):
+        kept = min(len(rest), max_messages)
+    else:
+        raise ValueError(f"未知的消息历史策略: {policy}")
+
+    if kept == len(rest) and (summary is None or messages[0] is summary):
+        return messages
+    trimmed = rest[len(rest) - kept:]
+    return [summary, *trimmed] if summary is not None else trimmed
+
+
+def bounded_add_messages(
+    policy: Optional[str] = None,
+    max_messages: Optional[int] = None,
+    max_tokens: Optional[int] = None
+) -> Callable[[Messages, Messages], List[AnyMessage]]:
+    """
+    创建有界的消息 reducer
+
+    未指定的参数在每次合并时读取 WORKFLOW_CONFIG["message_history"]
+
+    Args:
+        policy: 截断策略
+        max_messages: 保留的消息条数
+        max_tokens: 保留消息的 token 预算
+
+    Returns:
+        GameState.messages 使用的 reducer
+    """
+    def reducer(left: Messages, right: Messages) -> List[AnyMessage]:
+        config = WORKFLOW_CONFIG["message_history"]
+        return trim_messages_to_policy(
+            add_messages(left, right),
+            policy or config["policy"],
+            max_messages or config["max_messages"],
+            max_tokens or config["max_tokens"],
+        )
+
+    return reducer
+
+
+async def fold_overflow(
+    history: List[AnyMessage],
+    new_messages: List[AnyMessage],
+    summary_agent: Any,
+    config: Optional[dict] = None
+) -> List[AnyMessage]:
+    """
+    summarize 策略下，在追加新消息前把将被截掉的旧消息并入摘要
+
+    Args:
+        history: 当前状态中的消息
+        new_messages: 节点要追加的消息
+        summary_agent: SummaryAgent 实例，为 None 时不做摘要
+        config: 消息历史配置，默认取 WORKFLOW_CONFIG["message_history"]
+
+    Returns:
+        List[AnyMessage]: 节点返回的 messages 更新：溢出消息的 RemoveMessage、新的摘要消息与 new_messages；
+            其它策略或没有溢出时原样返回 new_messages
+    """
+    config = config or WORKFLOW_CONFIG["message_history"]
+    if config["policy"] != "summarize" or summary_agent is None:
+        return new_messages
+    summary, rest = split_summary(history)
+    overflow = len(rest) + len(new_messages) - config["max_messages"]
+    if overflow <= 0:
+        return new_messages
+
+    dropped = rest[:overflow]
+    text = await summary_agent.summarize_messages(summary.content if summary is not None else "", dropped)
+    text = text[:config["summary_max_chars"]]
+    return [
+        *(RemoveMessage(id=message.id) for message in dropped),
+        SystemMessage(content=text, id=HISTORY_SUMMARY_ID),
+        *new_messages,
+    ]
@@ -0,0 +1,247 @@
+"""
+思维链节点的紧凑存储
+
+节点按列存放在数组中（字符串列 + float 时间戳 + int 父子指针），
+只有在对外接口（``chain.nodes[node_id]`` 等）才构建 pydantic ``BrainNode`` 视图
+"""
+import sys
+from array import array
+from typing import Any, Dict, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+from pydantic_core import core_schema
+
+
+class NodeRecord(NamedTuple):
+    """内部使用的轻量节点记录，字段与 BrainNode 一致"""
+    id: str
+    content: str
+    timestamp: float
+    parent_id: Optional[str]
+    host_reply: str
+    reply_type: str
+    notes: str
+
+
+class NodeStore(Mapping):
+    """
+    列式节点存储，按插入顺序保存一条思维链的所有节点
+
+    实现 ``Mapping[str, BrainNode]`` 接口，取值时返回只读的 BrainNode 视图，
+    修改视图不会写回存储
+    """
+
+    __slots__ = (
+        "_ids", "_index", "_contents", "_timestamps", "_host_replies",
+        "_reply_types", "_notes", "_parents", "_dangling_parents",
+        "_first_child", "_last_child", "_next_sibling", "_roots", "_leaves",
+    )
+
+    def __init__(self):
+        self._ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._contents: List[str] = []
+        self._timestamps = array("d")
+        self._host_replies: List[str] = []
+        self._reply_types: List[str] = []
+        self._notes: List[str] = []
+        # 父节点位置，-1 表示根；父节点不在本链中时原始ID记录在 _dangling_parents
+        self._parents = array("l")
+        self._dangling_parents: Dict[int, str] = {}
+        # 子节点以 first_child / next_sibling 链表保存，追加为 O(1)
+        self._first_child = array("l")
+        self._last_child = array("l")
+        self._next_sibling = array("l")
+        self._roots: List[int] = []
+        self._leaves: Dict[int, None] = {}
+
+    # ---- 写入 ----
+
+    def append(
+        self,
+        node_id: str,
+        content: str,
+        timestamp: float,
+        parent_id: Optional[str] = None,
+        host_reply: str = "",
+        reply_type: str = "irrelevant",
+        notes: str = "",
+    ) -> int:
+        """
+        追加一个节点（不做 pydantic 校验）
+
+        Args:
+            node_id: 节点ID
+            content: 节点内容
+            timestamp: 创建时间戳
+            parent_id: 父节点ID，缺失或不在本链中时作为根
+            host_reply: 主持人回复
+            reply_type: 回复类型
+            notes: 备注
+
+        Returns:
+            int: 节点在存储中的位置
+        """
+        if node_id in self._index:
+            raise ValueError(f"节点 {node_id} 已存在")
+        pos = len(self._ids)
+        self._ids.append(node_id)
+        self._index[node_id] = pos
+        self._contents.append(content)
+        self._timestamps.append(timestamp)
+        self._host_replies.append(host_reply)
+        # 只驻留取值很少的回复类型；驻留的字符串不会被释放，自由文本的回复不能驻留
+        self._reply_types.append(sys.intern(reply_type))
+        self._notes.append(notes)
+        self._first_child.append(-1)
+        self._last_child.append(-1)
+        self._next_sibling.append(-1)
+
+        parent = self._index.get(parent_id, -1) if parent_id else -1
+        self._parents.append(parent)
+        if parent < 0:
+            if parent_id:
+                self._dangling_parents[pos] = parent_id
+            self._roots.append(pos)
+        else:
+            last = self._last_child[parent]
+            if last < 0:
+                self._first_child[parent] = pos
+            else:
+                self._next_sibling[last] = pos
+            self._last_child[parent] = pos
+            self._leaves.pop(parent, None)
+        self._leaves[pos] = None
+        return pos
+
+    def add(self, node: Any) -> int:
+        """追加一个 BrainNode（或具有相同字段的对象）"""
+        return self.append(
+            node.id, node.content, node.timestamp, node.parent_id,
+            node.host_reply, node.reply_type, node.notes,
+        )
+
+    # ---- 读取 ----
+
+    def record(self, pos: int) -> NodeRecord:
+        """按位置读取节点记录"""
+        parent = self._parents[pos]
+        return NodeRecord(
+            self._ids[pos],
+            self._contents[pos],
+            self._timestamps[pos],
+            self._ids[parent] if parent >= 0 else self._dangling_parents.get(pos),
+            self._host_replies[pos],
+            self._reply_types[pos],
+            self._notes[pos],
+        )
+
+    def position(self, node_id: Optional[str]) -> int:
+        """获取节点位置，不存在时返回 -1"""
+        return self._index.get(node_id, -1)
+
+    def records(self) -> Iterator[NodeRecord]:
+        """按插入顺序遍历节点记录"""
+        return (self.record(pos) for pos in range(len(self._ids)))
+
+    def children(self, pos: int) -> Iterator[int]:
+        """遍历直接子节点位置"""
+        child = self._first_child[pos]
+        while child >= 0:
+            yield child
+            child = self._next_sibling[child]
+
+    def ancestors(self, pos: int) -> List[int]:
+        """获取 根 -> pos 的位置路径，O(depth)"""
+        path = []
+        while pos >= 0:
+            path.append(pos)
+            pos = self._parents[pos]
+        path.reverse()
+        return path
+
+    def walk(self, start: Optional[List[int]] = None) -> Iterator[Tuple[int, int]]:
+        """
+        先序深度优先遍历，返回 (深度, 位置)
+
+        Args:
+            start: 起始位置列表，默认为所有根
+        """
+        first_child = self._first_child
+        next_sibling = self._next_sibling
+        stack = [(0, pos) for pos in reversed(self._roots if start is None else start)]
+        while stack:
+            depth, pos = stack.pop()
+            yield depth, pos
+            # 兄弟节点逆序入栈以保持插入顺序
+            child = first_child[pos]
+            siblings = []
+            while child >= 0:
+                siblings.append(child)
+                child = next_sibling[child]
+            for child in reversed(siblings):
+                stack.append((depth + 1, child))
+
+    def leaves(self) -> List[int]:
+        """所有叶子节点位置（按插入顺序）"""
+        return list(self._leaves)
+
+    def view(self, pos: int):
+        """构建 BrainNode 视图（跳过校验）"""
+        from src.memory.brainchain import BrainNode
+        return BrainNode.model_construct(**self.record(pos)._asdict())
+
+    # ---- Mapping 接口 ----
+
+    def __getitem__(self, node_id: str):
+        pos = self._index.get(node_id)
+        if pos is None:
+            raise KeyError(node_id)
+        return self.view(pos)
+
+    def __contains__(self, node_id: object) -> bool:
+        return node_id in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __repr__(self) -> str:
+        return f"NodeStore(size={len(self._ids)})"
+
+    # ---- 序列化 ----
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        """导出为 {node_id: 节点字段} 字典"""
+        return {record.id: record._asdict() for record in self.records()}
+
+    @classmethod
+    def from_nodes(cls, nodes: Mapping[str, Any]) -> "NodeStore":
+        """
+        从 {node_id: BrainNode 或 dict} 构建存储
+
+        字典形式的节点会经过一次 BrainNode 校验（加载存档属于对外接口）
+        """
+        from src.memory.brainchain import BrainNode
+        store = cls()
+        for node in nodes.values():
+            if not isinstance(node, BrainNode):
+                node = BrainNode.model_validate(node)
+            store.add(node)
+        return store
+
+    @classmethod
+    def _validate(cls, value: Any) -> "NodeStore":
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, Mapping):
+            return cls.from_nodes(value)
+        raise TypeError(f"无法将 {type(value).__name__} 转换为 NodeStore")
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source_type: Any, handler: Any) -> core_schema.CoreSchema:
+        return core_schema.no_info_plain_validator_function(
+            cls._validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(lambda store: store.to_dict()),
+        )
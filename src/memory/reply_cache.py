@@ -0,0 +1,279 @@
+"""
+跨会话的主持人回复缓存
+
+同一个故事的不同玩家经常问出几乎相同的封闭式问题（“他是司机吗？”/“他是司机么”/
+“那个男人是公交车司机吗”），答案只取决于谜底。按 story_id 分区缓存回复，问题先做归一化，
+再用本地字符 n-gram 向量的余弦相似度匹配，命中时不再调用 ReplyAgent。
+
+余弦相似度只用于挑选候选：“他妻子死了吗”/“他儿子死了吗”、“十点”/“九点”这样的最小差异对
+相似度也很高，答案却可能相反，因此两个问题逐字比对后的差异必须全是虚词或填充词才算命中
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+import difflib
+import math
+import threading
+import time
+from src.utils.question_rules import normalize_question
+from src.config import REPLY_CACHE_CONFIG
+
+# 否定词：两个问题的否定词不一致时，即使字面相似也不能复用回复
+NEGATIONS = frozenset("不没无非未别否")
+
+# 虚词与填充词：两个问题只在这些字上不同时视为同一个问题（“请问”“这个/那个”“的”“了”等）
+FILLER_CHARS = frozenset("的地得了着过吗么呢嘛吧啊呀哦呃嗯哈请问这那个就也都")
+
+# 只缓存有确定答案的回复，error 多半是模型或解析失败
+CACHEABLE_REPLY_TYPES = {"yes", "no", "irrelevant"}
+
+
+def char_ngrams(text: str, ngram_range: Tuple[int, int] = (1, 2)) -> Counter:
+    """
+    生成字符 n-gram 词频向量
+
+    Args:
+        text: 归一化后的文本
+        ngram_range: n 的取值范围（闭区间）
+
+    Returns:
+        Counter: n-gram -> 出现次数
+    """
+    low, high = ngram_range
+    grams = Counter()
+    for n in range(low, high + 1):
+        for i in range(len(text) - n + 1):
+            grams[text[i:i + n]] += 1
+    return grams
+
+
+def cosine(a: Counter, a_norm: float, b: Counter, b_norm: float) -> float:
+    """两个稀疏向量的余弦相似度"""
+    if not a_norm or not b_norm:
+        return 0.0
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(count * b[gram] for gram, count in a.items() if gram in b) / (a_norm * b_norm)
+
+
+def only_filler_differences(a: str, b: str) -> bool:
+    """
+    判断两个归一化问题之间的差异是否全是虚词或填充词
+
+    Args:
+        a: 归一化后的问题
+        b: 归一化后的问题
+
+    Returns:
+        bool: 逐字比对后增删改的字都在 FILLER_CHARS 中时为 True
+    """
+    matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal" and not FILLER_CHARS.issuperset(a[i1:i2] + b[j1:j2]):
+            return False
+    return True
+
+
+@dataclass
+class CachedReply:
+    """一条缓存的回复"""
+    question: str
+    vector: Counter
+    norm: float
+    negations: frozenset
+    reply: Dict[str, Any]
+    created_at: float
+    hits: int = 0
+
+
+@dataclass
+class StoryStats:
+    """单个故事的命中统计"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+@dataclass
+class _StoryPartition:
+    entries: "OrderedDict[str, CachedReply]" = field(default_factory=OrderedDict)
+    stats: StoryStats = field(default_factory=StoryStats)
+
+
+class ReplyCache:
+    """
+    按 story_id 分区的语义回复缓存
+
+    每个分区是一个带 TTL 的 LRU：命中的条目移到队尾，超过容量时淘汰最久未用的条目，
+    过期条目在访问时清理
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = REPLY_CACHE_CONFIG["similarity_threshold"],
+        max_entries_per_story: int = REPLY_CACHE_CONFIG["max_entries_per_story"],
+        ttl_seconds: float = REPLY_CACHE_CONFIG["ttl_seconds"],
+        ngram_range: Tuple[int, int] = REPLY_CACHE_CONFIG["ngram_range"],
+        clock=time.time,
+    ):
+        """
+        初始化回复缓存
+
+        Args:
+            similarity_threshold: 命中所需的最低余弦相似度
+            max_entries_per_story: 每个故事最多缓存的问题数
+            ttl_seconds: 条目有效期（秒）
+            ngram_range: 字符 n-gram 的 n 取值范围
+            clock: 时间函数，便于测试
+        """
+        self.similarity_threshold = similarity_threshold
+        self.max_entries_per_story = max_entries_per_story
+        self.ttl_seconds = ttl_seconds
+        self.ngram_range = ngram_range
+        self._clock = clock
+        self._stories: Dict[str, _StoryPartition] = {}
+        self._lock = threading.Lock()
+
+    def _vectorize(self, question: str) -> Tuple[str, Counter, float, frozenset]:
+        normalized = normalize_question(question)
+        vector = char_ngrams(normalized, self.ngram_range)
+        norm = math.sqrt(sum(count * count for count in vector.values()))
+        return normalized, vector, norm, NEGATIONS.intersection(normalized)
+
+    def _expire(self, partition: _StoryPartition, now: float) -> None:
+        expired = [key for key, entry in partition.entries.items() if now - entry.created_at > self.ttl_seconds]
+        for key in expired:
+            del partition.entries[key]
+            partition.stats.evictions += 1
+
+    def lookup(self, story_id: str, question: str) -> Optional[Dict[str, Any]]:
+        """
+        查找相似问题的缓存回复
+
+        Args:
+            story_id: 故事ID
+            question: 玩家问题
+
+        Returns:
+            Optional[Dict[str, Any]]: 命中时返回回复字段（与 ReplyAgent.run 相同），否则为 None
+        """
+        normalized, vector, norm, negations = self._vectorize(question)
+        if not normalized:
+            return None
+        with self._lock:
+            partition = self._stories.setdefault(story_id, _StoryPartition())
+            self._expire(partition, self._clock())
+
+            best_key = normalized if normalized in partition.entries else None
+            if best_key is None:
+                best_score = self.similarity_threshold
+                for key, entry in partition.entries.items():
+                    if entry.negations != negations:
+                        continue
+                    score = cosine(vector, norm, entry.vector, entry.norm)
+                    if score >= best_score and only_filler_differences(normalized, key):
+                        best_key, best_score = key, score
+
+            if best_key is None:
+                partition.stats.misses += 1
+                return None
+            entry = partition.entries[best_key]
+            partition.entries.move_to_end(best_key)
+            entry.hits += 1
+            partition.stats.hits += 1
+            return dict(entry.reply)
+
+    def store(self, story_id: str, question: str, reply: Dict[str, Any]) -> bool:
+        """
+        写入一条回复
+
+        Args:
+            story_id: 故事ID
+            question: 玩家问题
+            reply: ReplyAgent.run 的返回值
+
+        Returns:
+            bool: 是否写入（无效回复不缓存）
+        """
+        if reply.get("current_reply_invalid") or reply.get("current_reply_type") not in CACHEABLE_REPLY_TYPES:
+            return False
+        normalized, vector, norm, negations = self._vectorize(question)
+        if not normalized:
+            return False
+        with self._lock:
+            partition = self._stories.setdefault(story_id, _StoryPartition())
+            partition.entries[normalized] = CachedReply(
+                question=question,
+                vector=vector,
+                norm=norm,
+                negations=negations,
+                reply=dict(reply),
+                created_at=self._clock(),
+            )
+            partition.entries.move_to_end(normalized)
+            while len(partition.entries) > self.max_entries_per_story:
+                partition.entries.popitem(last=False)
+                partition.stats.evictions += 1
+        return True
+
+    def clear(self, story_id: Optional[str] = None) -> None:
+        """清空某个故事或全部故事的缓存"""
+        with self._lock:
+            if story_id is None:
+                self._stories.clear()
+            else:
+                self._stories.pop(story_id, None)
+
+    def report(self) -> List[Dict[str, Any]]:
+        """
+        各故事的命中率报告
+
+        Returns:
+            List[Dict[str, Any]]: 每个故事一行，包含 story_id / entries / hits / misses / evictions / hit_rate / top_questions
+        """
+        rows = []
+        with self._lock:
+            for story_id, partition in self._stories.items():
+                stats = partition.stats
+                total = stats.hits + stats.misses
+                top = sorted(partition.entries.values(), key=lambda e: e.hits, reverse=True)[:3]
+                rows.append({
+                    "story_id": story_id,
+                    "entries": len(partition.entries),
+                    "hits": stats.hits,
+                    "misses": stats.misses,
+                    "evictions": stats.evictions,
+                    "hit_rate": stats.hits / total if total else 0.0,
+                    "top_questions": [(e.question, e.hits) for e in top if e.hits],
+                })
+        return rows
+
+    def format_report(self) -> str:
+        """把 report() 格式化为便于阅读的文本表格"""
+        lines = [f"{'story_id':<16} {'条目':>6} {'命中':>6} {'未命中':>6} {'淘汰':>6} {'命中率':>8}"]
+        for row in self.report():
+            lines.append(
+                f"{row['story_id']:<16} {row['entries']:>6} {row['hits']:>6} {row['misses']:>6} "
+                f"{row['evictions']:>6} {row['hit_rate']:>8.1%}"
+            )
+            for question, hits in row["top_questions"]:
+                lines.append(f"    {hits:>4} × {question}")
+        return "\n".join(lines)
+
+
+_shared_cache: Optional[ReplyCache] = None
+
+
+def get_shared_reply_cache() -> Optional[ReplyCache]:
+    """
+    获取进程内所有会话共用的回复缓存
+
+    Returns:
+        Optional[ReplyCache]: REPLY_CACHE_CONFIG["enabled"] 为 False 时返回 None
+    """
+    global _shared_cache
+    if not REPLY_CACHE_CONFIG["enabled"]:
+        return None
+    if _shared_cache is None:
+        _shared_cache = ReplyCache()
+    return _shared_cache
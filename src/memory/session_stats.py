@@ -0,0 +1,81 @@
+"""
+会话级的流式统计
+
+BrainChainMemory 每追加一个节点就更新一次计数，供卡住检测等启发式规则
+在 O(1) 时间内读取，不必重新遍历思维链
+"""
+from typing import Any, Deque, Dict
+from collections import deque
+from src.config import AGENT_CONFIG
+
+
+class SessionStats:
+    """按回合累积的提问统计"""
+
+    def __init__(self, window: int = AGENT_CONFIG["stuck_detection"]["window"]):
+        """
+        初始化统计
+
+        Args:
+            window: 计算最近回复比例的滑动窗口大小
+        """
+        self.window = window
+        self.total_nodes = 0
+        self.chain_count = 0
+        self.consecutive_irrelevant = 0
+        self.turns_since_new_chain = 0
+        self.recent_reply_types: Deque[str] = deque(maxlen=window)
+        self.reply_type_counts: Dict[str, int] = {}
+
+    def observe(self, reply_type: str, new_chain: bool) -> None:
+        """
+        记录一个新节点
+
+        Args:
+            reply_type: 节点的回复类型
+            new_chain: 该节点是否开启了一条新链
+        """
+        self.total_nodes += 1
+        self.recent_reply_types.append(reply_type)
+        self.reply_type_counts[reply_type] = self.reply_type_counts.get(reply_type, 0) + 1
+        self.consecutive_irrelevant = self.consecutive_irrelevant + 1 if reply_type == "irrelevant" else 0
+        if new_chain:
+            self.chain_count += 1
+            self.turns_since_new_chain = 0
+        else:
+            self.turns_since_new_chain += 1
+
+    @property
+    def recent_yes_ratio(self) -> float:
+        """滑动窗口内得到“是”回复的比例"""
+        if not self.recent_reply_types:
+            return 0.0
+        return sum(1 for t in self.recent_reply_types if t == "yes") / len(self.recent_reply_types)
+
+    def reset(self) -> None:
+        """清空统计"""
+        self.__init__(self.window)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """导出为可 JSON 序列化的字典（思维链快照使用）"""
+        return {
+            "window": self.window,
+            "total_nodes": self.total_nodes,
+            "chain_count": self.chain_count,
+            "consecutive_irrelevant": self.consecutive_irrelevant,
+            "turns_since_new_chain": self.turns_since_new_chain,
+            "recent_reply_types": list(self.recent_reply_types),
+            "reply_type_counts": dict(self.reply_type_counts),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SessionStats":
+        """由 to_dict 的结果恢复统计"""
+        stats = cls(data["window"])
+        stats.total_nodes = data["total_nodes"]
+        stats.chain_count = data["chain_count"]
+        stats.consecutive_irrelevant = data["consecutive_irrelevant"]
+        stats.turns_since_new_chain = data["turns_since_new_chain"]
+        stats.recent_reply_types.extend(data["recent_reply_types"])
+        stats.reply_type_counts = dict(data["reply_type_counts"])
+        return stats
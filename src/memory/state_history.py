@@ -0,0 +1,189 @@
+"""
+GameState 历史的差分存储
+
+每回合只保存与上一回合状态不同的字段；列表字段（messages 等）在上一回合的列表是
+当前列表前缀时只保存新增的元素。每 keyframe_every 回合保存一次完整状态作为关键帧，
+随机读取第 i 回合时从最近的关键帧向后应用差分
+"""
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import copy
+from langchain_core.messages import BaseMessage, messages_from_dict, messages_to_dict
+from pydantic_core import core_schema
+from src.state_schema import GameState
+from src.config import GAME_CONFIG
+
+
+def dump_state(state: GameState, messages: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    把状态转成可 JSON 序列化的字典，消息保留具体类型
+
+    Args:
+        state: 游戏状态
+        messages: 已序列化的消息，提供时不再重复序列化 state.messages
+    """
+    data = state.model_dump(mode="json", exclude={"messages"})
+    data["messages"] = messages if messages is not None else messages_to_dict(state.messages)
+    return data
+
+
+def load_state(data: Dict[str, Any]) -> GameState:
+    """dump_state 的逆操作，返回的状态与历史记录不共享可变对象"""
+    fields = copy.deepcopy({key: value for key, value in data.items() if key != "messages"})
+    fields["messages"] = messages_from_dict(data["messages"])
+    return GameState.model_validate(fields)
+
+
+def diff_states(prev: Dict[str, Any], curr: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    计算两个回合状态之间的差分
+
+    Args:
+        prev: 上一回合的 dump_state 结果
+        curr: 当前回合的 dump_state 结果
+
+    Returns:
+        Dict[str, Dict[str, Any]]: set 为整体替换的字段，extend 为在原列表末尾追加的元素，没有变化的部分省略
+    """
+    changes: Dict[str, Any] = {}
+    extends: Dict[str, List[Any]] = {}
+    for key, value in curr.items():
+        old = prev.get(key)
+        if old == value:
+            continue
+        if isinstance(old, list) and isinstance(value, list) and len(value) > len(old) and value[:len(old)] == old:
+            extends[key] = value[len(old):]
+        else:
+            changes[key] = value
+    diff = {}
+    if changes:
+        diff["set"] = changes
+    if extends:
+        diff["extend"] = extends
+    return diff
+
+
+def apply_diff(data: Dict[str, Any], diff: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """在状态字典上应用差分，返回新字典（不修改原字典）"""
+    data = {**data, **diff.get("set", {})}
+    for key, items in diff.get("extend", {}).items():
+        data[key] = data[key] + items
+    return data
+
+
+class StateHistory(Sequence):
+    """
+    按回合保存的 GameState 历史（关键帧 + 差分）
+
+    实现 ``Sequence[GameState]`` 接口：下标访问重建对应回合的状态，遍历时流式地逐回合应用差分
+    """
+
+    def __init__(self, keyframe_every: int = GAME_CONFIG["state_history_keyframe_every"]):
+        """
+        初始化历史记录
+
+        Args:
+            keyframe_every: 每隔多少回合保存一次完整状态，随机读取最多应用 keyframe_every - 1 个差分
+        """
+        self.keyframe_every = keyframe_every
+        # 每回合一项: {"keyframe": 完整状态} 或 {"diff": 差分}
+        self._entries: List[Dict[str, Any]] = []
+        # 最后一个回合的完整状态，用于计算下一回合的差分
+        self._last: Optional[Dict[str, Any]] = None
+        # 最后一个回合的消息对象：add_messages 在原列表后追加，前缀不变时只序列化新增消息
+        self._last_messages: List[BaseMessage] = []
+
+    def append(self, state: GameState) -> None:
+        """
+        记录一个回合的状态
+
+        Args:
+            state: 当前回合结束时的状态
+        """
+        data = dump_state(state, self._dump_messages(state.messages))
+        if len(self._entries) % self.keyframe_every == 0:
+            self._entries.append({"keyframe": data})
+        else:
+            self._entries.append({"diff": diff_states(self._last, data)})
+        self._last = data
+        self._last_messages = list(state.messages)
+
+    def _dump_messages(self, messages: List[BaseMessage]) -> List[Dict[str, Any]]:
+        """序列化消息；与上一回合共有的前缀复用已序列化的字典，关键帧与差分之间共享这些对象"""
+        prev = self._last_messages
+        # 从存档恢复后没有消息对象可比，整体重新序列化
+        reusable = self._last is not None and len(prev) == len(self._last["messages"])
+        if reusable and len(messages) >= len(prev) and all(a is b for a, b in zip(prev, messages)):
+            return self._last["messages"] + messages_to_dict(messages[len(prev):])
+        return messages_to_dict(messages)
+
+    def _data_at(self, index: int) -> Dict[str, Any]:
+        """从最近的关键帧重建第 index 回合的状态字典"""
+        start = index - index % self.keyframe_every
+        data = self._entries[start]["keyframe"]
+        for entry in self._entries[start + 1:index + 1]:
+            data = apply_diff(data, entry["diff"])
+        return data
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("state_history 下标越界")
+        return load_state(self._data_at(index))
+
+    def __iter__(self) -> Iterator[GameState]:
+        """按回合顺序流式重建状态，每回合只应用一个差分"""
+        data = None
+        for entry in self._entries:
+            data = entry["keyframe"] if "keyframe" in entry else apply_diff(data, entry["diff"])
+            yield load_state(data)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f"StateHistory(turns={len(self._entries)}, keyframe_every={self.keyframe_every})"
+
+    # ---- 序列化 ----
+
+    def to_dict(self) -> Dict[str, Any]:
+        """导出为 {"keyframe_every": 间隔, "entries": [...]}"""
+        return {"keyframe_every": self.keyframe_every, "entries": self._entries}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StateHistory":
+        """由 to_dict 的结果恢复"""
+        history = cls(data["keyframe_every"])
+        history._entries = list(data["entries"])
+        if history._entries:
+            history._last = history._data_at(len(history._entries) - 1)
+        return history
+
+    @classmethod
+    def from_states(cls, states: Sequence[Any]) -> "StateHistory":
+        """由完整状态列表构建（兼容旧存档中的 List[GameState]）"""
+        history = cls()
+        for state in states:
+            if not isinstance(state, GameState):
+                state = GameState.model_validate(state)
+            history.append(state)
+        return history
+
+    @classmethod
+    def _validate(cls, value: Any) -> "StateHistory":
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, dict):
+            return cls.from_dict(value)
+        if isinstance(value, (list, tuple)):
+            return cls.from_states(value)
+        raise TypeError(f"无法将 {type(value).__name__} 转换为 StateHistory")
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source_type: Any, handler: Any) -> core_schema.CoreSchema:
+        return core_schema.no_info_plain_validator_function(
+            cls._validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(lambda history: history.to_dict()),
+        )
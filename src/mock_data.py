@@ -15,6 +15,23 @@ class MockReplyAgent:
             "current_reply_invalid": False
         }
 
+class MockFusedTurnAgent:
+    def __init__(self):
+        pass
+    
+    async def run(self, state: GameState):
+        return {
+            "valid": True,
+            "current_host_reply": "你好，我是海龟汤游戏助手，请问有什么可以帮你的吗？ 🐢",
+            "current_reply_type": "irrelevant",
+            "current_reply_notes": "这是一个测试回复",
+            "current_reply_invalid": False,
+            "chain_id": "test_chain_001",
+            "node_id": "test_node_001",
+            "analysis_note": "这是测试分析注释 📝",
+            "path_similarity": 0.8
+        }
+
 class MockStructureAgent:
     def __init__(self):
         pass
@@ -66,3 +83,6 @@ class MockStuckDetector:
         return {
             "is_stuck": False  # workflow期待这个字段
         }
+
+    async def arun(self, tool_input: dict):
+        return await self.run(tool_input)
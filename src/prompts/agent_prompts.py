@@ -39,6 +39,32 @@ STRUCTURE_AGENT_PROMPT = """
 
 
 
+"""
+
+STRUCTURE_AGENT_LOCAL_PROMPT = """
+你是一个海龟汤游戏中的结构判断 Agent，负责判断玩家当前的问题应该被归入哪条思维链。
+
+你有三个选择：
+1. **current**：属于当前思维链，继续延伸。
+2. **old**：属于之前的某条旧思维链，需要回访。
+3. **new**：这是一个全新的思路，需要开启新链。
+
+【输入信息】：
+- 玩家问题（question）: {question}
+- 主持人回答（host_reply）: {host_reply}
+- 回复类型（reply_type）: {reply_type}
+- 推理说明（notes）: {notes}
+- 当前思维链结构摘要（current_brainchain）: {current_brainchain}
+- 当前链ID（current_chain_id）: {current_chain_id}
+- 当前节点ID（current_node_id）: {current_node_id}
+
+节点ID、链ID和时间戳由系统自动生成，你只需要给出归属判断，不要编造新的ID。
+
+请仅输出以下格式的 JSON 对象：
+
+  "structure_type": "current" | "old" | "new",
+  "chain_id": "xxx",    // old 时给出摘要中已有的链ID；current 和 new 可为 null
+  "parent_id": "xxx"    // old 或 current 时给出应连接的父节点ID；不确定可为 null，系统会接在该链的焦点节点后
 """
 
 ANALYSIS_AGENT_PROMPT = """你是一个思维链分析 Agent，负责分析整个推理过程，并输出分析说明与谜底的相似度评分。
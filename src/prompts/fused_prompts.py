@@ -0,0 +1,55 @@
+"""
+融合模式（回复 + 结构判断 + 推理分析）的提示模板和输出模型
+"""
+from typing import Literal, Optional
+from pydantic import BaseModel, Field
+from langchain_core.prompts import ChatPromptTemplate
+
+FUSED_AGENT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """你是一个逻辑推理类游戏（海龟汤）的主持人，需要在一次回答中同时完成三件事。
+
+1. 回复玩家：
+   - 如果玩家的问题不是封闭式问题（无法用“是 / 否 / 无关”回答），reply_type = "error"，并提示玩家重新提问；
+   - 否则结合谜底与思维链，回答“是 / 否 / 无关”三选一。
+
+2. 结构判断：判断这个问题应该归入哪条思维链
+   - current：属于当前思维链，继续延伸；
+   - old：属于之前的某条旧思维链，需要回访；
+   - new：全新的思路，需要开启新链。
+   节点ID、链ID和时间戳由系统自动生成，不要编造新的ID。
+
+3. 推理分析：把本轮问答加入所属思维链后，总结推理方向与可能遗漏点，并给出该链与谜底的相似度。
+
+请仅输出以下格式的 JSON 对象：
+
+  "host_reply": "string",                        // 自然语言回复（中文）
+  "reply_type": "yes" | "no" | "irrelevant" | "error",
+  "notes": "string",                             // 为什么给出这个回复
+  "structure_type": "current" | "old" | "new",
+  "chain_id": "xxx",      // old 时给出摘要中已有的链ID；current 和 new 可为 null
+  "parent_id": "xxx",     // old 或 current 时给出应连接的父节点ID；不确定可为 null
+  "analysis_note": "string",
+  "path_similarity": float  // 0 ~ 1 之间"""),
+    ("human", """玩家的问题是：
+{question}
+
+谜底是：
+{true_answer}
+
+思维链摘要如下：
+{current_brainchain}
+
+当前链ID：{current_chain_id}
+当前节点ID：{current_node_id}"""),
+])
+
+class FusedTurnOutput(BaseModel):
+    """融合模式输出模型"""
+    host_reply: str = Field(..., min_length=1, description="主持人自然语言回复")
+    reply_type: Literal["yes", "no", "irrelevant", "error"] = Field(..., description="回复类型")
+    notes: str = Field("", description="为什么给这个回复")
+    structure_type: Literal["current", "old", "new"] = Field(..., description="结构类型")
+    chain_id: Optional[str] = Field(None, description="old 时所属的链ID")
+    parent_id: Optional[str] = Field(None, description="应连接的父节点ID")
+    analysis_note: str = Field("", description="推理链分析说明")
+    path_similarity: float = Field(..., ge=0.0, le=1.0, description="与谜底的相似度")
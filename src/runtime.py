@@ -1,20 +1,121 @@
 """
 游戏运行时环境，负责初始化和管理所有 Agent 和工具
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+import logging
+import threading
+import weakref
 from langchain_deepseek import ChatDeepSeek
 from langchain_core.memory import BaseMemory
 
-from src.agents.reply_agent import ReplyAgent
-from src.agents.structure_agent import StructureAgent 
-from src.agents.analysis_agent import AnalysisAgent
+from src.agents.reply_agent import ReplyAgent, build_reply_pipeline
+from src.agents.structure_agent import StructureAgent, build_structure_pipeline
+from src.agents.analysis_agent import AnalysisAgent, build_analysis_pipeline
 from src.agents.detection_agent import DetectionAgent
+from src.agents.fused_agent import FusedTurnAgent, build_fused_pipeline
+from src.agents.summary_agent import SummaryAgent
 from src.tools.hint_generator import HintGenerator
-from src.tools.detection_tools import DetectStuckTool
+from src.tools.detection_tools import DetectStuckTool, StuckGate
 from src.context import GameContext
 from src.game_controller import GameController
+from src.workflow import build_graph
 from src.memory.brainchain import BrainChainMemory
 from src.memory.brainchain import BrainChain
+from src.memory.event_log import build_event_log
+from src.utils.llm_cache import build_llm_cache
+from src.utils.checkpointer import SqliteCheckpointSaver, build_checkpointer
+from src.memory.reply_cache import get_shared_reply_cache
+from src.memory.answer_scorer import get_answer_scorer
+from src.config import LLM_CONFIG, AGENT_CONFIG, CONTEXT_CONFIG, WORKFLOW_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class RuntimeFactory:
+    """
+    进程级运行时工厂
+
+    模型缓存、各 Agent 的无状态流水线、提示生成器和编译好的流程图只构建一次，
+    由所有会话共用；每个会话只创建自己的记忆与轻量 Agent 包装，
+    并在调用流程图时通过 config 注入
+    """
+
+    def __init__(self, llm: ChatDeepSeek):
+        """
+        构建共享组件
+        
+        Args:
+            llm: 调用方的模型实例，工厂使用它的副本，不修改、也不持有原实例
+        """
+        # 所有 Agent 共用工厂的模型副本，缓存挂在副本上即可覆盖全部调用
+        self.llm_cache = build_llm_cache(
+            LLM_CONFIG["cache"], getattr(llm, "temperature", LLM_CONFIG["temperature"])
+        )
+        self.llm = llm.model_copy(update={"cache": self.llm_cache} if self.llm_cache is not None else None)
+        llm = self.llm
+
+        self.reply_chain = build_reply_pipeline(llm)
+        self.structure_chain = build_structure_pipeline(llm)
+        self.analysis_chain = build_analysis_pipeline(llm)
+        self.fused_chain = build_fused_pipeline(llm)
+        self.hint_tool = HintGenerator(llm=llm)
+        # 不绑定 memory 的卡住检测工具，会话创建时复制一份并绑定各自的 memory
+        self.stuck_detector = DetectStuckTool(llm=llm)
+        # 消息历史 summarize 策略使用，不持有会话状态
+        self.summary_agent = SummaryAgent(llm=llm)
+        # 所有会话共用一个检查点存储，等待玩家输入的会话只是其中一条记录
+        self.checkpointer = build_checkpointer(WORKFLOW_CONFIG["checkpointer"], WORKFLOW_CONFIG["reply_first"])
+        self.graph = build_graph(checkpointer=self.checkpointer)
+        # 检查点持久化时思维链也必须持久化，否则重启后流程图恢复了、思维链却是空的
+        self.event_log_config = CONTEXT_CONFIG["event_log"]
+        if isinstance(self.checkpointer, SqliteCheckpointSaver) and not self.event_log_config["enabled"]:
+            logger.info("检查点持久化到 %s，同时启用思维链事件日志", self.checkpointer.path)
+            self.event_log_config = {**self.event_log_config, "enabled": True}
+
+    def create_session(self, context: GameContext, memory_config: Optional[dict] = None) -> "GameRuntime":
+        """
+        创建一个游戏会话
+        
+        Args:
+            context: 游戏上下文
+            memory_config: 可选的记忆配置
+            
+        Returns:
+            GameRuntime: 会话运行时
+        """
+        return GameRuntime(self.llm, context, memory_config, factory=self)
+
+
+# id(模型实例) -> (模型实例的弱引用, 工厂)；模型被回收时移除对应条目（模型不可哈希，不能用 WeakKeyDictionary）
+_factories: Dict[int, Tuple["weakref.ref", RuntimeFactory]] = {}
+# 弱引用回调可能在持锁期间由垃圾回收触发，使用可重入锁
+_factories_lock = threading.RLock()
+
+
+def get_runtime_factory(llm: ChatDeepSeek) -> RuntimeFactory:
+    """获取模型实例对应的进程级运行时工厂，首次调用时构建；模型实例被回收后工厂随之释放"""
+    key = id(llm)
+    with _factories_lock:
+        entry = _factories.get(key)
+        if entry is not None and entry[0]() is llm:
+            return entry[1]
+        factory = RuntimeFactory(llm)
+
+        def _discard(ref: "weakref.ref") -> None:
+            with _factories_lock:
+                if key in _factories and _factories[key][0] is ref:
+                    del _factories[key]
+
+        _factories[key] = (weakref.ref(llm, _discard), factory)
+        return factory
+
+
+def clear_runtime_factories() -> None:
+    """清空进程级运行时工厂（释放其中的流程图、检查点与模型副本）"""
+    with _factories_lock:
+        _factories.clear()
+
+
 class GameRuntime:
     """游戏运行时环境"""
     
@@ -22,7 +123,8 @@ class GameRuntime:
         self,
         llm: ChatDeepSeek,
         context: GameContext,
-        memory_config: Optional[dict] = None
+        memory_config: Optional[dict] = None,
+        factory: Optional[RuntimeFactory] = None
     ):
         """
         初始化游戏运行时环境
@@ -31,22 +133,41 @@ class GameRuntime:
             llm: LLM模型
             context: 游戏上下文
             memory_config: 可选的记忆配置
+            factory: 进程级运行时工厂，默认取 get_runtime_factory(llm)
         """
+        # 共享组件由进程级工厂构建一次，Agent 使用工厂的模型副本（带响应缓存）
+        self.factory = factory or get_runtime_factory(llm)
+        llm = self.factory.llm
+
         # 初始化记忆系统
         self.memory_config = memory_config or {}
 
         self.brain_chain = context.brain_chain
-        self.brain_chain.brainchains = {"main": BrainChain()}
-        self.brain_chain.current_chain_id = "main"
+        self.event_log = build_event_log(context.game_id, self.factory.event_log_config)
+        if self.event_log is not None and self.event_log.exists():
+            # 同一局游戏重启后从快照 + 事件日志恢复思维链
+            self.brain_chain.restore_from(self.event_log)
+        else:
+            self.brain_chain.brainchains = {"main": BrainChain()}
+            self.brain_chain.current_chain_id = "main"
+            if self.event_log is not None:
+                self.brain_chain.attach_event_log(self.event_log)
+        if AGENT_CONFIG["analysis"]["local_similarity"]:
+            # 谜底向量按故事缓存，同一故事的会话共用
+            self.brain_chain.set_answer_scorer(get_answer_scorer(context.answer, context.story_text))
+        self.llm_cache = self.factory.llm_cache
+
         # 初始化工具
-        self.hint_tool = HintGenerator(llm=llm)
-        self.stuck_detector = DetectStuckTool(llm=llm)
+        self.hint_tool = self.factory.hint_tool
+        self.stuck_detector = self.factory.stuck_detector.model_copy(update={"memory": self.brain_chain})
+        self.stuck_gate = StuckGate(self.brain_chain) if AGENT_CONFIG["stuck_detection"]["gate_enabled"] else None
         
-        # 初始化 Agents
-        self.reply_agent = ReplyAgent(llm=llm, memory=self.brain_chain)
-        self.structure_agent = StructureAgent(llm=llm, memory=self.brain_chain)
-        self.analysis_agent = AnalysisAgent(llm=llm, memory=self.brain_chain)
+        # 初始化 Agents（pipeline 模式下只包装共享流水线与本会话的 memory）
+        self.reply_agent = ReplyAgent(llm=llm, memory=self.brain_chain, chain=self.factory.reply_chain)
+        self.structure_agent = StructureAgent(llm=llm, memory=self.brain_chain, chain=self.factory.structure_chain)
+        self.analysis_agent = AnalysisAgent(llm=llm, memory=self.brain_chain, chain=self.factory.analysis_chain)
         self.detection_agent = DetectionAgent(llm=llm, memory=self.brain_chain, context=context)
+        self.fused_agent = FusedTurnAgent(llm=llm, memory=self.brain_chain, chain=self.factory.fused_chain)
         
         # 初始化控制器
         self.controller = GameController(
@@ -56,10 +177,15 @@ class GameRuntime:
             detection_agent=self.detection_agent,
             hint_tool=self.hint_tool,
             stuck_detector=self.stuck_detector,
-            context=context
+            context=context,
+            fused_agent=self.fused_agent,
+            reply_cache=get_shared_reply_cache(),
+            stuck_gate=self.stuck_gate,
+            graph=self.factory.graph,
+            summary_agent=self.factory.summary_agent
         )
         
-        # 流程图已经在controller中构建完成
+        # 流程图由工厂编译一次，所有会话共用
         self.graph = self.controller.graph
     
     def get_controller(self) -> GameController:
@@ -69,4 +195,26 @@ class GameRuntime:
         Returns:
             GameController: 游戏控制器实例
         """
-        return self.controller 
\ No newline at end of file
+        return self.controller
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        """
+        汇总模型调用统计
+        
+        响应缓存挂在 RuntimeFactory 共用的模型上，其命中统计是进程级的（同一工厂下所有会话的合计），
+        不能当作本会话的数据
+        
+        Returns:
+            Dict[str, Any]:
+                - session: 本会话的统计，stuck_gate 为卡住检测门控省下的 LLM 调用
+                - process: 进程级统计，llm_cache 为所有会话共用的响应缓存命中情况
+        """
+        return {
+            "session": {
+                "stuck_gate": self.stuck_gate.stats if self.stuck_gate is not None else None,
+            },
+            "process": {
+                "llm_cache": self.llm_cache.stats if self.llm_cache is not None else None,
+            },
+        }
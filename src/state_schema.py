@@ -3,7 +3,7 @@ from pydantic import BaseModel, Field
 import time
 from src.memory.brainchain import BrainChainMemory
 from langchain_core.messages import BaseMessage
-from langgraph.graph.message import add_messages
+from src.memory.message_history import bounded_add_messages
 from typing_extensions import Annotated
 
 class GameState(BaseModel):
@@ -12,8 +12,11 @@ class GameState(BaseModel):
     """
     # LangGraph Studio 兼容字段
     player_action: Literal["question", "hint_request", "answer_request", "submit_answer","None"] = Field(
-    game_id: str = Field(None, description="游戏ID")
-    messages: Annotated[list[BaseMessage], add_messages] = []
+        "None", description="玩家动作类型"
+    )
+    game_id: Optional[str] = Field(None, description="游戏ID")
+    # 有界的消息历史，策略见 WORKFLOW_CONFIG["message_history"]
+    messages: Annotated[list[BaseMessage], bounded_add_messages()] = []
     # 当前动作
     user_input: Optional[str] = Field(None, description="用户输入")
     current_question: Optional[str] = Field(None, description="当前问题")
@@ -36,6 +39,7 @@ class GameState(BaseModel):
     )
     current_reply_notes: Optional[str] = Field(None, description="回复解释")
     current_reply_invalid: bool = Field(False, description="回复是否无效")
+    fused_turn_valid: Optional[bool] = Field(None, description="融合模式输出是否通过校验")
     current_timestamp: float = Field(default_factory=time.time, description="状态创建时间戳")
     
     # 当前轮次结果
@@ -59,15 +63,15 @@ class GameState(BaseModel):
         """
         创建状态的副本并更新指定字段
         
+        浅拷贝且不重新校验整份状态，未更新的字段与原状态共享同一对象
+        
         Args:
             **updates: 要更新的字段
             
         Returns:
             GameState: 更新后的新状态
         """
-        data = self.dict()
-        data.update(updates)
-        return GameState(**data)
+        return self.model_copy(update=updates)
 
 class GameContext(BaseModel):
     """
@@ -1,15 +1,20 @@
 """
 检测玩家是否在逻辑游戏中卡住的工具模块
 """
+import asyncio
 import logging
 import json
-from typing import Dict, Any, Optional, Type
+from typing import Dict, Any, NamedTuple, Optional, Type
 from pydantic import BaseModel, Field
 from langchain_core.tools import BaseTool
 from langchain_core.language_models import BaseChatModel
 from langchain_core.output_parsers import BaseOutputParser
 from src.state_schema import GameState
 from src.utils.prompt_utils import STUCK_DETECTION_PROMPT
+from src.memory.brainchain import BrainChainMemory
+from src.memory.session_stats import SessionStats
+from src.utils.async_utils import ainvoke_model
+from src.config import AGENT_CONFIG, CONTEXT_CONFIG, LLM_CONFIG
 
 class DetectionResult(BaseModel):
     """检测结果"""
@@ -17,6 +22,11 @@ class DetectionResult(BaseModel):
     confidence: float = Field(description="置信度")
     reasoning: str = Field(description="推理过程")
 
+class StuckToolInput(BaseModel):
+    """卡住检测工具输入"""
+    current_question: str = Field(..., description="当前问题")
+    current_brainchain: Any = Field("", description="当前思维链摘要，为空时从 memory 构建")
+
 class DetectionResultParser(BaseOutputParser[DetectionResult]):
     """检测结果解析器"""
     
@@ -62,19 +72,38 @@ class DetectStuckTool(BaseTool):
     """检测玩家是否卡住的工具"""
     name: str = "detect_stuck"
     description: str = "检测玩家是否在游戏中卡住"
+    args_schema: Type[BaseModel] = StuckToolInput
     llm: BaseChatModel
     parser: BaseOutputParser[DetectionResult] = Field(default_factory=DetectionResultParser)
     logger: logging.Logger = Field(default_factory=lambda: logging.getLogger(__name__))
+    memory: Optional[BrainChainMemory] = None
+    token_budget: int = Field(default_factory=lambda: CONTEXT_CONFIG["token_budgets"]["stuck"])
+    timeout: Optional[float] = Field(default_factory=lambda: LLM_CONFIG["call_timeout"])
+
+    def _resolve_brainchain(self, current_brainchain: Any) -> Any:
+        """未显式传入思维链时，从 memory 按 token 预算构建上下文"""
+        if current_brainchain or self.memory is None:
+            return current_brainchain
+        return self.memory.build_context_window(self.token_budget)
+
+    @staticmethod
+    def _fallback(reason: str) -> Dict[str, Any]:
+        """检测失败或超时时的降级结果：视为未卡住"""
+        return {
+            "is_stuck": False,
+            "confidence": 0.0,
+            "reasoning": reason
+        }
     
     def _run(
         self,
-        tool_input: Dict[str, Any]
+        **tool_input: Any
     ) -> Dict[str, Any]:
         """
         同步检测玩家是否卡住
         
         Args:
-            tool_input: 包含以下字段的字典：
+            tool_input: 包含以下字段：
                 - current_question: 当前问题
                 - current_brainchain: 当前思维链摘要
             
@@ -88,15 +117,15 @@ class DetectStuckTool(BaseTool):
             
             # 构建提示
             prompt = STUCK_DETECTION_PROMPT.format_prompt(
-                current_brainchain=tool_input.get("current_brainchain", []),
+                current_brainchain=self._resolve_brainchain(tool_input.get("current_brainchain", [])),
                 current_question=tool_input["current_question"]
             )
             
             # 调用 LLM
-            response = self.llm.predict(prompt.to_string())
+            response = self.llm.invoke(prompt.to_string())
             
             # 解析结果
-            result = self.parser.parse(response)
+            result = self.parser.parse(response.content)
             
             return {
                 "is_stuck": result.is_stuck,
@@ -106,18 +135,15 @@ class DetectStuckTool(BaseTool):
             
         except Exception as e:
             self.logger.error(f"检测卡住状态时出错: {str(e)}")
-            return {
-                "is_stuck": False,
-                "confidence": 0.0,
-                "reasoning": f"检测过程出错: {str(e)}"
-            }
+            return self._fallback(f"检测过程出错: {str(e)}")
     
     async def _arun(
         self,
         **kwargs,
     ) -> Dict[str, Any]:
         """
-        异步检测玩家是否卡住
+        异步检测玩家是否卡住，模型调用超过 self.timeout 秒时取消并返回降级结果；
+        调用方取消时 CancelledError 原样向上传播
         
         Args:
             tool_input: 包含以下字段的字典：
@@ -130,7 +156,7 @@ class DetectStuckTool(BaseTool):
      
         try:
             current_question = kwargs.get("current_question", "")
-            current_brainchain = kwargs.get("current_brainchain", [])
+            current_brainchain = self._resolve_brainchain(kwargs.get("current_brainchain", []))
             self.logger.info(f"[DetectStuckTool] 参数 current_brainchain 类型: {type(current_brainchain)}，内容: {repr(current_brainchain)}")
             self.logger.info(f"[DetectStuckTool] 参数 current_question 类型: {type(current_question)}，内容: {repr(current_question)}")
 
@@ -142,7 +168,7 @@ class DetectStuckTool(BaseTool):
             
             # 调用 LLM
             self.logger.info(f"[DetectStuckTool] 发送提示: {prompt}")
-            response = await self.llm.ainvoke(prompt.to_string())
+            response = await ainvoke_model(self.llm, prompt.to_string(), self.timeout)
             self.logger.info(f"[DetectStuckTool] LLM 原始输出: {repr(response)}")
             
             # 预处理响应
@@ -159,11 +185,99 @@ class DetectStuckTool(BaseTool):
                 "reasoning": result.reasoning
             }
             
+        except asyncio.TimeoutError:
+            self.logger.warning(f"[DetectStuckTool] 检测超时（{self.timeout} 秒）")
+            return self._fallback(f"检测超时（{self.timeout} 秒）")
         except Exception as e:
             self.logger.error(f"[DetectStuckTool] 检测失败: {str(e)}", exc_info=True)
-            return {
-                "is_stuck": False,
-                "confidence": 0.0,
-                "reasoning": f"检测过程出错: {str(e)}"
-            }
+            return self._fallback(f"检测过程出错: {str(e)}")
+
+
+
+class StuckVerdict(NamedTuple):
+    """本地卡住判断结果"""
+    is_stuck: Optional[bool]  # None 表示处于灰区，需要交给 DetectStuckTool 的 LLM 判断
+    score: float
+    reasoning: str
+
+
+class StuckGate:
+    """
+    DetectStuckTool 前的本地门控
+
+    根据 BrainChainMemory 流式维护的会话统计（最近“是”回复比例、连续“无关”回复数、
+    距上次开新链的回合数）打分，分数明确时直接给出结论，只有灰区才调用 LLM
+    """
+
+    def __init__(self, memory: BrainChainMemory, config: Optional[Dict[str, Any]] = None):
+        """
+        初始化门控
+
+        Args:
+            memory: 思维链记忆，提供 session_stats
+            config: 门控配置，默认取 AGENT_CONFIG["stuck_detection"]
+        """
+        config = config or AGENT_CONFIG["stuck_detection"]
+        self.memory = memory
+        self.min_turns = config["min_turns"]
+        self.weights = config["weights"]
+        self.irrelevant_streak_cap = config["irrelevant_streak_cap"]
+        self.stale_chain_cap = config["stale_chain_cap"]
+        self.clear_threshold = config["clear_threshold"]
+        self.stuck_threshold = config["stuck_threshold"]
+        self.short_circuit_stuck = 0
+        self.short_circuit_not_stuck = 0
+        self.llm_calls = 0
+
+    def score(self, stats: SessionStats) -> float:
+        """
+        计算卡住分数
+
+        Args:
+            stats: 会话统计
+
+        Returns:
+            float: 0 ~ 1，越高越可能卡住
+        """
+        signals = {
+            "no_progress": 1.0 - stats.recent_yes_ratio,
+            "irrelevant_streak": min(stats.consecutive_irrelevant / self.irrelevant_streak_cap, 1.0),
+            "stale_chain": min(stats.turns_since_new_chain / self.stale_chain_cap, 1.0),
+        }
+        return round(sum(self.weights[name] * value for name, value in signals.items()), 4)
+
+    def check(self) -> StuckVerdict:
+        """
+        本地判断玩家是否卡住，并累计调用统计
+
+        Returns:
+            StuckVerdict: is_stuck 为 None 时需要调用 LLM
+        """
+        stats = self.memory.session_stats
+        if stats.total_nodes < self.min_turns:
+            self.short_circuit_not_stuck += 1
+            return StuckVerdict(False, 0.0, f"提问数 {stats.total_nodes} 不足 {self.min_turns}")
+
+        score = self.score(stats)
+        reasoning = (
+            f"最近“是”比例 {stats.recent_yes_ratio:.2f}，连续“无关” {stats.consecutive_irrelevant} 次，"
+            f"距上次开新链 {stats.turns_since_new_chain} 回合，分数 {score:.2f}"
+        )
+        if score < self.clear_threshold:
+            self.short_circuit_not_stuck += 1
+            return StuckVerdict(False, score, reasoning)
+        if score >= self.stuck_threshold:
+            self.short_circuit_stuck += 1
+            return StuckVerdict(True, score, reasoning)
+        self.llm_calls += 1
+        return StuckVerdict(None, score, reasoning)
 
+    @property
+    def stats(self) -> Dict[str, int]:
+        """门控统计，llm_calls_saved 为本地直接给出结论、省下的 LLM 调用次数"""
+        return {
+            "llm_calls": self.llm_calls,
+            "short_circuit_stuck": self.short_circuit_stuck,
+            "short_circuit_not_stuck": self.short_circuit_not_stuck,
+            "llm_calls_saved": self.short_circuit_stuck + self.short_circuit_not_stuck,
+        }
@@ -1,7 +1,9 @@
 """提示生成工具"""
+import asyncio
 import json
 import logging
-from typing import Dict, Any, Literal
+from typing import Dict, Any, Literal, Optional
+from functools import lru_cache
 from pathlib import Path
 from langchain.tools import StructuredTool
 from langchain_deepseek import ChatDeepSeek
@@ -9,9 +11,24 @@ from langchain.prompts import ChatPromptTemplate
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
 from src.state_schema import GameState, GameContext
+from src.utils.async_utils import ainvoke_model
+from src.config import LLM_CONFIG
 
 logger = logging.getLogger(__name__)
 
+TEMPLATE_PATH = Path(__file__).parent.parent / "prompts" / "hint_templates.json"
+
+
+@lru_cache(maxsize=8)
+def load_hint_templates(path: Path = TEMPLATE_PATH) -> Dict[str, Dict[str, Any]]:
+    """读取提示模板，同一路径在进程内只读取一次（调用方不应修改返回的字典）"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"[HintGenerator] 加载模板失败: {e}")
+        return {}
+
 class HintToolInput(BaseModel):
     hint_type: Literal["default", "direction", "deviation", "strategy"]
     question: str
@@ -27,25 +44,21 @@ class HintOutput(BaseModel):
 class HintGenerator:
     """提示生成器核心类"""
     
-    def __init__(self, llm: ChatDeepSeek):
+    def __init__(self, llm: ChatDeepSeek, timeout: Optional[float] = LLM_CONFIG["call_timeout"]):
         """初始化提示生成器
         
         Args:
             llm: 语言模型实例
+            timeout: agenerate 中单次模型调用的超时秒数
         """
         self.llm = llm
+        self.timeout = timeout
         self.templates = self._load_templates()
         self.output_parser = PydanticOutputParser(pydantic_object=HintOutput)
     
     def _load_templates(self) -> Dict[str, Dict[str, Any]]:
         """加载提示模板"""
-        template_path = Path(__file__).parent.parent / "prompts" / "hint_templates.json"
-        try:
-            with open(template_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"[HintGenerator] 加载模板失败: {e}")
-            return {}
+        return load_hint_templates()
     
     def _get_prompt(self, hint_type: str, **kwargs) -> ChatPromptTemplate:
         """获取指定类型的提示模板"""
@@ -59,42 +72,72 @@ class HintGenerator:
             ("human", template["template"].format(**kwargs))
         ])
     
-    def generate(self, hint_type: str, context: GameContext) -> Dict[str, Any]:
-        """生成提示
+    def _build_messages(self, hint_type: str, context: GameContext, current_question: str = "") -> list:
+        """按提示类型填充模板，返回待发送的消息列表"""
+        template_args = {
+            "story": context.story_text,
+            "current_question": current_question,
+            "brain_chain": context.brain_chain
+        }
+        return self._get_prompt(hint_type, **template_args).format_messages()
+
+    def _parse(self, content: str) -> Dict[str, Any]:
+        """解析模型输出"""
+        output = self.output_parser.parse(content)
+        return {
+            "hint_text": output.hint_text,
+            "confidence": output.confidence,
+            "hint_type": output.hint_type,
+        }
+
+    def generate(self, hint_type: str, context: GameContext, current_question: str = "") -> Dict[str, Any]:
+        """同步生成提示，仅供没有事件循环的调用方使用；异步代码中请使用 agenerate
         
         Args:
             hint_type: 提示类型
             context: 游戏上下文
+            current_question: 玩家当前问题
         
         Returns:
             Dict[str, Any]: 提示结果
         """
         try:
-            # 转换输入
-            brain_context = context.brain_chain
-            
-            # 准备模板参数
-            template_args = {
-                "story": context.story_text,
-                "current_question": context.current_question,
-                "brain_chain": brain_context
-            }
-            
-            # 获取并填充提示模板
-            prompt = self._get_prompt(hint_type, **template_args)
-            
-            # 调用 LLM 生成提示
-            response = self.llm(prompt.format_messages())
-            
-            # 解析输出
-            output = self.output_parser.parse(response.content)
-            
-            return {
-                "hint_text": output.hint_text,
-                "confidence": output.confidence,
-                "hint_type": output.hint_type,
-            }
-            
+            response = self.llm.invoke(self._build_messages(hint_type, context, current_question))
+            return self._parse(response.content)
+        except Exception as e:
+            logger.warning(
+                f"[HintGenerator] 生成提示失败: {str(e)}\n"
+                f"提示类型: {hint_type}\n"
+            )
+            raise e
+
+    async def agenerate(
+        self,
+        hint_type: str,
+        context: GameContext,
+        current_question: str = "",
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """异步生成提示，不阻塞事件循环
+        
+        Args:
+            hint_type: 提示类型
+            context: 游戏上下文
+            current_question: 玩家当前问题
+            timeout: 模型调用超时秒数，默认取 self.timeout；超时抛出 asyncio.TimeoutError，
+                调用方取消时模型请求随之取消
+        
+        Returns:
+            Dict[str, Any]: 提示结果
+        """
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            messages = self._build_messages(hint_type, context, current_question)
+            response = await ainvoke_model(self.llm, messages, timeout)
+            return self._parse(response.content)
+        except asyncio.TimeoutError:
+            logger.warning(f"[HintGenerator] 生成提示超时（{timeout} 秒），提示类型: {hint_type}")
+            raise
         except Exception as e:
             logger.warning(
                 f"[HintGenerator] 生成提示失败: {str(e)}\n"
@@ -107,17 +150,15 @@ def create_hint_tool(llm: ChatDeepSeek, context: GameContext) -> StructuredTool:
     generator = HintGenerator(llm)
     
     def hint_tool_fn(hint_type: str, question: str, story: str) -> Dict[str, Any]:
-        return generator.generate(
-            hint_type=hint_type,
-            context=GameContext(
-                story_text=story,
-                brain_chain=context.brain_chain  
-            ),
-            current_question=question
-        )
+        return generator.generate(hint_type=hint_type, context=context, current_question=question)
+
+    async def hint_tool_coroutine(hint_type: str, question: str, story: str) -> Dict[str, Any]:
+        # AgentExecutor.ainvoke 走这里，不会把同步调用丢进默认线程池
+        return await generator.agenerate(hint_type=hint_type, context=context, current_question=question)
     
     return StructuredTool.from_function(
         func=hint_tool_fn,
+        coroutine=hint_tool_coroutine,
         name="generate_hint",
         args_schema=HintToolInput,
         description="根据当前问题生成提示。支持 hint_type=['default','direction','deviation','strategy']"
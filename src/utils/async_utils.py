@@ -0,0 +1,89 @@
+"""
+异步调用工具
+
+所有会话共用同一个事件循环，任何同步的模型调用都会让其余会话停顿一整个往返。
+这里提供带超时的 await 包装，以及把剩余同步调用放进有界线程池执行的辅助函数
+"""
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import threading
+from langchain_core.language_models import BaseChatModel
+from src.config import LLM_CONFIG
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_sync_executor() -> ThreadPoolExecutor:
+    """进程内共用的有界线程池，大小取 LLM_CONFIG["sync_workers"]"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=LLM_CONFIG["sync_workers"],
+                thread_name_prefix="sync-llm"
+            )
+        return _executor
+
+
+async def with_timeout(awaitable: Awaitable[T], timeout: Optional[float]) -> T:
+    """
+    等待协程完成，超时后取消并抛出 asyncio.TimeoutError
+
+    Args:
+        awaitable: 待等待的协程
+        timeout: 超时秒数，为 None 时不限时
+
+    Returns:
+        T: 协程结果
+    """
+    if timeout is None:
+        return await awaitable
+    return await asyncio.wait_for(awaitable, timeout)
+
+
+async def run_sync(func: Callable[..., T], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> T:
+    """
+    在有界线程池中执行同步函数
+
+    超时或调用方被取消时立即返回，线程中的调用会继续执行到结束，但不再占用事件循环
+
+    Args:
+        func: 同步函数
+        args / kwargs: 函数参数
+        timeout: 超时秒数，为 None 时不限时
+
+    Returns:
+        T: 函数返回值
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(get_sync_executor(), functools.partial(func, *args, **kwargs))
+    return await with_timeout(future, timeout)
+
+
+def has_native_async(llm: Any) -> bool:
+    """模型是否实现了原生异步生成（没有实现时 ainvoke 会落到默认线程池）"""
+    if not isinstance(llm, BaseChatModel):
+        return hasattr(llm, "ainvoke")
+    return type(llm)._agenerate is not BaseChatModel._agenerate
+
+
+async def ainvoke_model(llm: Any, model_input: Any, timeout: Optional[float] = None) -> Any:
+    """
+    异步调用模型：优先使用原生 ainvoke，只有同步实现的模型放入有界线程池
+
+    Args:
+        llm: 模型实例
+        model_input: 提示字符串或消息列表
+        timeout: 超时秒数，为 None 时不限时
+
+    Returns:
+        Any: 模型输出
+    """
+    if has_native_async(llm):
+        return await with_timeout(llm.ainvoke(model_input), timeout)
+    return await run_sync(llm.invoke, model_input, timeout=timeout)
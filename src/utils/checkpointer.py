@@ -0,0 +1,414 @@
+"""
+流程图检查点
+
+等待玩家输入的会话在 Get_player_action 处以 interrupt 挂起，此时会话只是检查点中的
+一条记录，不占用协程；玩家动作到达后按 thread_id 恢复。本地检查点只保留每个会话
+最新的一份，内存随会话数线性增长、不随回合数增长。
+
+SqliteCheckpointSaver 把同样的“每个会话只保留最新检查点”写入本地 SQLite（WAL），
+进程重启或换一个进程后仍能按 game_id 恢复会话
+"""
+from typing import Any, Dict, Iterator, Optional, Sequence, Set, Tuple
+from pathlib import Path
+import logging
+import sqlite3
+import threading
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+
+logger = logging.getLogger(__name__)
+
+
+class LatestCheckpointSaver(InMemorySaver):
+    """
+    只保留每个会话最新检查点的进程内检查点存储
+
+    写入新检查点后删除同一会话的旧检查点、旧检查点的待写入记录，
+    以及不再被最新检查点引用的通道版本
+    """
+
+    def __init__(self):
+        super().__init__()
+        # (thread_id, checkpoint_ns) -> 该会话已写入的通道版本键
+        self._blob_keys: Dict[Tuple[str, str], Set[Tuple[str, str, str, Any]]] = {}
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """写入检查点并清理同一会话的历史检查点"""
+        result = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        for checkpoint_id in [cid for cid in checkpoints if cid != checkpoint["id"]]:
+            del checkpoints[checkpoint_id]
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+
+        live = {(thread_id, checkpoint_ns, k, v) for k, v in checkpoint["channel_versions"].items()}
+        keys = self._blob_keys.setdefault((thread_id, checkpoint_ns), set())
+        keys.update((thread_id, checkpoint_ns, k, v) for k, v in new_versions.items())
+        for key in keys - live:
+            self.blobs.pop(key, None)
+        keys &= live
+        return result
+
+    def delete_thread(self, thread_id: str) -> None:
+        """删除会话的全部检查点"""
+        for checkpoint_ns, checkpoints in self.storage.pop(thread_id, {}).items():
+            for checkpoint_id in checkpoints:
+                self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            for key in self._blob_keys.pop((thread_id, checkpoint_ns), ()):
+                self.blobs.pop(key, None)
+
+    @property
+    def thread_count(self) -> int:
+        """保存了检查点的会话数"""
+        return sum(1 for checkpoints in self.storage.values() if any(checkpoints.values()))
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver):
+    """
+    SQLite（WAL）检查点存储，跨进程重启恢复会话
+
+    - checkpoints 表以 (thread_id, checkpoint_ns) 为主键，每个会话只有最新一行，
+      恢复会话是一次主键查询，与保存的会话总数无关
+    - blobs 表按通道版本存放通道值，每一步只写入 new_versions 中变化的通道，
+      并删除这些通道被替换掉的旧版本
+    - writes 表存放最新检查点的待写入记录（interrupt / resume 依赖它们），
+      新检查点写入时删除旧检查点的记录
+
+    单次读写在亚毫秒量级，异步接口直接在事件循环中执行同步实现，与 InMemorySaver 一致
+    """
+
+    get_next_version = InMemorySaver.get_next_version
+
+    def __init__(self, path: Path):
+        """
+        打开检查点数据库
+
+        Args:
+            path: 数据库文件路径，父目录不存在时自动创建；多个进程可以共用同一个文件
+        """
+        super().__init__()
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                parent_checkpoint_id TEXT,
+                type TEXT,
+                checkpoint BLOB,
+                metadata_type TEXT,
+                metadata BLOB,
+                PRIMARY KEY (thread_id, checkpoint_ns)
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                version NOT NULL,
+                type TEXT,
+                blob BLOB,
+                PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+            );
+            CREATE TABLE IF NOT EXISTS writes (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                channel TEXT,
+                type TEXT,
+                value BLOB,
+                task_path TEXT,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+            );
+            """
+        )
+        self._lock = threading.Lock()
+
+    def _load_tuple(self, row: Tuple) -> CheckpointTuple:
+        """由 checkpoints 表的一行组装检查点，读取引用的通道值和待写入记录"""
+        thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type_, checkpoint_b, metadata_type, metadata_b = row
+        checkpoint: Checkpoint = self.serde.loads_typed((type_, checkpoint_b))
+        blobs = self._conn.execute(
+            "SELECT channel, version, type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ?",
+            (thread_id, checkpoint_ns)
+        ).fetchall()
+        versions = checkpoint["channel_versions"]
+        channel_values = {
+            channel: self.serde.loads_typed((blob_type, blob))
+            for channel, version, blob_type, blob in blobs
+            if versions.get(channel) == version and blob_type != "empty"
+        }
+        writes = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id)
+        ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={**checkpoint, "channel_values": channel_values},
+            metadata=self.serde.loads_typed((metadata_type, metadata_b)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """
+        读取会话的最新检查点
+
+        Args:
+            config: 会话配置；指定 checkpoint_id 时它必须是该会话的最新检查点
+
+        Returns:
+            Optional[CheckpointTuple]: 会话没有检查点时返回 None
+
+        Raises:
+            ValueError: 指定的 checkpoint_id 不是最新检查点（历史检查点不保留，无法回溯）
+        """
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?", (thread_id, checkpoint_ns)
+            ).fetchone()
+            if row is None:
+                return None
+            checkpoint_id = get_checkpoint_id(config)
+            if checkpoint_id and checkpoint_id != row[2]:
+                raise ValueError(
+                    f"会话 {thread_id} 的检查点 {checkpoint_id} 不存在或已被替换，"
+                    f"SqliteCheckpointSaver 只保留最新检查点 {row[2]}"
+                )
+            return self._load_tuple(row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """列出检查点，每个会话（命名空间）至多一个"""
+        query, params = "SELECT * FROM checkpoints", []
+        clauses = []
+        if config is not None:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for row in rows:
+            if limit is not None and limit <= 0:
+                break
+            with self._lock:
+                item = self._load_tuple(row)
+            if filter and not all(item.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield item
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """写入检查点，只保存变化的通道值，并替换同一会话的旧检查点"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        c = checkpoint.copy()
+        values: Dict[str, Any] = c.pop("channel_values")
+        blob_rows = [
+            (thread_id, checkpoint_ns, channel, version,
+             *(self.serde.dumps_typed(values[channel]) if channel in values else ("empty", b"")))
+            for channel, version in new_versions.items()
+        ]
+        checkpoint_row = (
+            thread_id,
+            checkpoint_ns,
+            checkpoint["id"],
+            config["configurable"].get("checkpoint_id"),
+            *self.serde.dumps_typed(c),
+            *self.serde.dumps_typed(get_checkpoint_metadata(config, metadata)),
+        )
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", blob_rows)
+                self._conn.executemany(
+                    "DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version != ?",
+                    [(thread_id, checkpoint_ns, channel, version) for channel, version in new_versions.items()]
+                )
+                self._conn.execute("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)", checkpoint_row)
+                self._conn.execute(
+                    "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id != ?",
+                    (thread_id, checkpoint_ns, checkpoint["id"])
+                )
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """保存节点对当前检查点的待写入记录"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # 特殊通道（interrupt / resume 等）的写入以最后一次为准，普通写入已存在时不覆盖
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        rows = [
+            (thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx),
+             channel, *self.serde.dumps_typed(value), task_path)
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """删除会话的全部检查点"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                for table in ("checkpoints", "blobs", "writes"):
+                    self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ):
+        for item in self.list(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
+
+    @property
+    def thread_count(self) -> int:
+        """保存了检查点的会话数"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(DISTINCT thread_id) FROM checkpoints").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def build_checkpointer(config: Optional[Dict[str, Any]], reply_first: bool = False) -> Optional[BaseCheckpointSaver]:
+    """
+    按配置创建检查点存储
+    
+    同一 thread_id 上的运行必须串行，带检查点时回复优先模式的下一回合要等上一回合的后台节点
+    全部结束，失去回复与簿记的重叠。因此 auto 在回复优先模式下不创建检查点
+    
+    Args:
+        config: WORKFLOW_CONFIG["checkpointer"] 格式的配置，backend 为 auto / none / memory / sqlite
+        reply_first: 是否启用回复优先模式，auto 时据此选择 none（启用）或 memory（未启用）
+        
+    Returns:
+        Optional[BaseCheckpointSaver]: backend 为 none（或 auto 且 reply_first）时返回 None
+    """
+    config = config or {}
+    backend = config.get("backend", "none")
+    if backend == "auto":
+        backend = "none" if reply_first else "memory"
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return LatestCheckpointSaver()
+    if backend == "sqlite":
+        return SqliteCheckpointSaver(config["sqlite_path"])
+    raise ValueError(f"未知的检查点后端: {backend}")
@@ -0,0 +1,175 @@
+"""
+流式 JSON 字段提取工具
+
+LLM 以 token 流的形式输出 JSON 时，在完整对象到达之前就逐步取出某个
+顶层字符串字段的值（例如 host_reply），用于把回复实时推送给玩家
+"""
+from typing import List, Optional
+
+# JSON 简单转义字符
+_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class JsonFieldExtractor:
+    """
+    增量提取 JSON 顶层对象中某个字符串字段的值
+
+    只跟踪对象的嵌套层级与字符串边界，不构建完整的解析树；
+    每次 feed() 返回本次新解码出的字段字符，字段结束后不再输出
+    """
+
+    # 扫描状态
+    _SCAN = 0       # 在字符串之外
+    _KEY = 1        # 在顶层键字符串中
+    _STRING = 2     # 在其他字符串中
+    _AFTER_KEY = 3  # 目标键之后，等待冒号与值
+    _VALUE = 4      # 在目标字段的值字符串中
+    _DONE = 5
+
+    def __init__(self, field: str):
+        """
+        初始化提取器
+
+        Args:
+            field: 要提取的顶层字段名
+        """
+        self.field = field
+        self._state = self._SCAN
+        self._depth = 0
+        self._key: List[str] = []
+        self._last_key: Optional[str] = None
+        # 未完成的转义序列（包括 \\uXXXX 及代理对）
+        self._escape: Optional[str] = None
+        self._high: Optional[int] = None
+        self._value: List[str] = []
+
+    @property
+    def done(self) -> bool:
+        """目标字段是否已完整读取"""
+        return self._state == self._DONE
+
+    @property
+    def value(self) -> str:
+        """目前已解码的字段值"""
+        return "".join(self._value)
+
+    def feed(self, chunk: str) -> str:
+        """
+        输入一段新到达的文本
+
+        Args:
+            chunk: 模型输出的文本片段
+
+        Returns:
+            str: 本次新解码出的字段内容，没有新内容时为空字符串
+        """
+        out: List[str] = []
+        for ch in chunk:
+            state = self._state
+            if state == self._DONE:
+                break
+            if state == self._VALUE:
+                self._feed_value(ch, out)
+            elif state in (self._KEY, self._STRING):
+                self._feed_string(ch)
+            elif state == self._AFTER_KEY:
+                if ch == '"':
+                    self._state = self._VALUE
+                elif ch not in ": \t\r\n":
+                    # 目标字段不是字符串，放弃提取
+                    self._state = self._DONE
+            else:
+                self._feed_structure(ch)
+        if out:
+            self._value.extend(out)
+        return "".join(out)
+
+    def _feed_structure(self, ch: str) -> None:
+        """字符串外部：维护嵌套层级，识别顶层键"""
+        if ch == "{" or ch == "[":
+            self._depth += 1
+        elif ch == "}" or ch == "]":
+            self._depth -= 1
+        elif ch == '"':
+            # 顶层对象中冒号之前的字符串是键
+            if self._depth == 1 and self._last_key is None:
+                self._state = self._KEY
+                self._key = []
+            else:
+                self._state = self._STRING
+        elif ch == ":":
+            if self._depth == 1 and self._last_key == self.field:
+                self._state = self._AFTER_KEY
+                self._escape = None
+                return
+        elif ch == ",":
+            if self._depth == 1:
+                self._last_key = None
+
+    def _feed_string(self, ch: str) -> None:
+        """非目标字符串：只需找到字符串结束位置"""
+        if self._escape is not None:
+            self._escape = None
+            if self._state == self._KEY:
+                self._key.append(_ESCAPES.get(ch, ch))
+            return
+        if ch == "\\":
+            self._escape = ""
+        elif ch == '"':
+            if self._state == self._KEY:
+                self._last_key = "".join(self._key)
+            self._state = self._SCAN
+        elif self._state == self._KEY:
+            self._key.append(ch)
+
+    def _feed_value(self, ch: str, out: List[str]) -> None:
+        """目标字段的值字符串：解码转义后输出"""
+        escape = self._escape
+        if escape is None:
+            if ch == "\\":
+                self._escape = ""
+                return
+            self._flush_surrogate(out)
+            if ch == '"':
+                self._state = self._DONE
+            else:
+                out.append(ch)
+            return
+
+        escape += ch
+        if escape[0] != "u":
+            self._escape = None
+            self._flush_surrogate(out)
+            out.append(_ESCAPES.get(ch, ch))
+            return
+        if len(escape) < 5:
+            self._escape = escape
+            return
+
+        self._escape = None
+        code = int(escape[1:], 16)
+        if 0xDC00 <= code < 0xE000 and self._high is not None:
+            out.append(chr(0x10000 + ((self._high - 0xD800) << 10) + (code - 0xDC00)))
+            self._high = None
+            return
+        self._flush_surrogate(out)
+        if 0xD800 <= code < 0xDC00:
+            # 高代理项，等待紧随其后的低代理项
+            self._high = code
+        else:
+            out.append(chr(code))
+
+    def _flush_surrogate(self, out: List[str]) -> None:
+        """输出孤立的高代理项"""
+        if self._high is not None:
+            out.append("\ufffd")
+            self._high = None
@@ -0,0 +1,211 @@
+"""
+LLM 响应缓存模块
+
+按 (模型与参数, 渲染后的消息) 精确匹配缓存模型输出。所有 Agent 和工具共用同一个
+chat model 实例，因此把缓存挂在模型的 cache 字段上即可覆盖全部调用；
+回放会话和回归测试中逐字相同的提示词不再重复请求模型
+"""
+from typing import Any, Dict, Optional
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.load import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """由模型参数和渲染后的消息生成缓存键"""
+    return hashlib.sha256(f"{llm_string}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+class LRUTier:
+    """进程内 LRU 缓存层"""
+
+    def __init__(self, max_size: int = 512):
+        """
+        初始化 LRU 缓存层
+
+        Args:
+            max_size: 最多保留的条目数
+        """
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, RETURN_VAL_TYPE]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[RETURN_VAL_TYPE]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: RETURN_VAL_TYPE) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteTier:
+    """SQLite 持久化缓存层，跨进程、跨会话复用"""
+
+    def __init__(self, path: Path):
+        """
+        初始化 SQLite 缓存层
+
+        Args:
+            path: 数据库文件路径，父目录不存在时自动创建
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, llm_string TEXT, value TEXT)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[RETURN_VAL_TYPE]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        try:
+            return [loads(item) for item in json.loads(row[0])]
+        except Exception as e:
+            logger.warning("LLM 缓存条目无法反序列化，忽略: %s", str(e))
+            return None
+
+    def set(self, key: str, llm_string: str, value: RETURN_VAL_TYPE) -> None:
+        payload = json.dumps([dumps(generation) for generation in value])
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, llm_string, value) VALUES (?, ?, ?)",
+                (key, llm_string, payload)
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class TieredLLMCache(BaseCache):
+    """
+    两级精确匹配缓存：先查进程内 LRU，再查 SQLite，命中 SQLite 时回填 LRU
+
+    可以直接赋给 chat model 的 cache 字段，也可以通过 set_llm_cache 全局启用
+    """
+
+    def __init__(self, memory_size: int = 512, sqlite_path: Optional[Path] = None):
+        """
+        初始化缓存
+
+        Args:
+            memory_size: LRU 层容量，为 0 时不使用 LRU 层
+            sqlite_path: SQLite 文件路径，为 None 时不使用持久化层
+        """
+        self.memory = LRUTier(memory_size) if memory_size > 0 else None
+        self.sqlite = SQLiteTier(sqlite_path) if sqlite_path else None
+        self.memory_hits = 0
+        self.sqlite_hits = 0
+        self.misses = 0
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """按提示词与模型参数查找缓存"""
+        key = cache_key(prompt, llm_string)
+        if self.memory is not None:
+            value = self.memory.get(key)
+            if value is not None:
+                self.memory_hits += 1
+                return value
+        if self.sqlite is not None:
+            value = self.sqlite.get(key)
+            if value is not None:
+                self.sqlite_hits += 1
+                if self.memory is not None:
+                    self.memory.set(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """写入一次模型调用的结果"""
+        key = cache_key(prompt, llm_string)
+        if self.memory is not None:
+            self.memory.set(key, return_val)
+        if self.sqlite is not None:
+            self.sqlite.set(key, llm_string, return_val)
+
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        # 本地查询足够快，不必切换到线程池
+        return self.lookup(prompt, llm_string)
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self.update(prompt, llm_string, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        """清空所有缓存层并重置计数"""
+        if self.memory is not None:
+            self.memory.clear()
+        if self.sqlite is not None:
+            self.sqlite.clear()
+        self.memory_hits = self.sqlite_hits = self.misses = 0
+
+    async def aclear(self, **kwargs: Any) -> None:
+        self.clear(**kwargs)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """命中/未命中计数"""
+        hits = self.memory_hits + self.sqlite_hits
+        total = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "sqlite_hits": self.sqlite_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+        }
+
+
+def build_llm_cache(config: Dict[str, Any], temperature: Optional[float] = None) -> Optional[TieredLLMCache]:
+    """
+    按 LLM_CONFIG["cache"] 创建缓存
+
+    Args:
+        config: 缓存配置，backend 为 auto / none / memory / sqlite
+        temperature: 模型的采样温度，backend 为 auto 时只有温度为 0 才启用缓存
+
+    Returns:
+        Optional[TieredLLMCache]: 缓存实例，backend 为 none（或 auto 且温度不为 0）时返回 None
+    """
+    backend = config.get("backend", "none")
+    if backend == "auto":
+        backend = "memory" if temperature == 0 else "none"
+    if backend == "none":
+        return None
+    if backend not in ("memory", "sqlite"):
+        raise ValueError(f"未知的 LLM 缓存后端: {backend}")
+    return TieredLLMCache(
+        memory_size=config.get("memory_size", 512),
+        sqlite_path=config.get("sqlite_path") if backend == "sqlite" else None,
+    )
@@ -0,0 +1,99 @@
+"""
+开放式问题的本地规则分类
+
+海龟汤只接受能用“是 / 否 / 无关”回答的封闭式问题。明显的开放式问题
+（“为什么…”、“怎么死的”、“请你分析…”）不需要调用模型就能判定，
+由工作流直接返回 error 回复并跳过本回合的结构分析与检测。
+
+normalize_question 供回复缓存、绕圈检测与答案评分共用
+"""
+from typing import List, NamedTuple, Tuple
+import re
+import unicodedata
+
+# 句末语气词，不影响问题含义
+QUESTION_PARTICLES = "吗么呢嘛吧啊呀"
+
+# (规则名, 模式, 判定为开放式问题的置信度)
+OPEN_PATTERNS: List[Tuple[str, "re.Pattern[str]", float]] = [
+    # 祈使句：要么带“请 / 麻烦 / 帮我”，要么动词位于句首；“他在分析数据？”“这说明他是司机？”是封闭式问题
+    ("request", re.compile(r"(请你?|麻烦你?|帮我)(分析|解释|说明|讲讲|说说|描述|总结|推理)|^(分析|解释|说明|讲讲|说说|描述|总结|推理一下)"), 0.95),
+    ("opinion", re.compile(r"你(怎么|如何)?(看|觉得|认为|猜)"), 0.95),
+    ("ask_answer", re.compile(r"(告诉我|直接说|给我)(答案|真相|谜底)?|答案是什么|真相是什么"), 0.95),
+    ("why_how", re.compile(r"为什么|为何|怎么|怎样|如何"), 0.9),
+    # “哪”必须带后缀（排除“哪怕”）；嵌在“知道 / 是不是 / 有没有”从句里的疑问词不算，见 EMBEDDING_PATTERN
+    ("wh_word", re.compile(r"什么|哪[里儿个些种天一位]|谁|多少|多久|多大|多长|多远|几[个点岁次天年]"), 0.85),
+    # 选择疑问“A 还是 B”：还是前面要有动词引出的选项 A（或“…了”），后面要有选项 B 且不以吗/呢结尾；
+    # “他还是个孩子吗”“他还是活着？”中的“还是”是“仍然”的意思，属于封闭式问题
+    ("choice", re.compile(r"(?:[是有在要会想去用被坐].|了)[^吗呢]*还是[^吗呢？?]+[？?]?$"), 0.8),
+]
+
+# 这些规则命中的疑问词出现在嵌入从句中时不算（“他知道谁是凶手？”问的是“知道”与否）
+EMBEDDABLE_RULES = {"wh_word"}
+EMBEDDING_PATTERN = re.compile(r"知道|是不是|有没有")
+
+# 封闭式问题的特征：出现时开放式判定的置信度大幅降低
+CLOSED_PATTERNS: List[Tuple[str, "re.Pattern[str]"]] = [
+    # 排除“什么 / 怎么 / 这么”等词尾的“么”
+    ("particle", re.compile(r"(吗|嘛|(?<![什怎这那多])么)[?？!！。.\s]*$")),
+    ("a_not_a", re.compile(r"是不是|有没有|是否|会不会|能不能|对不对|可不可以|(.)不\1")),
+]
+
+# 同时出现封闭式特征时的置信度系数，例如“座位上有什么东西吗？”
+CLOSED_DISCOUNT = 0.3
+
+
+def normalize_question(question: str) -> str:
+    """
+    归一化问题文本：全角/半角折叠、统一小写、去掉标点符号、空白与句末语气词
+
+    Args:
+        question: 玩家原始问题
+
+    Returns:
+        str: 归一化后的问题
+    """
+    text = unicodedata.normalize("NFKC", question).lower()
+    text = "".join(
+        ch for ch in text
+        if unicodedata.category(ch)[0] not in ("P", "S", "Z", "C")
+    )
+    return text.rstrip(QUESTION_PARTICLES)
+
+
+class QuestionVerdict(NamedTuple):
+    """分类结果"""
+    is_open: bool
+    confidence: float
+    rule: str
+
+
+def _matches(name: str, pattern: "re.Pattern[str]", text: str) -> bool:
+    """规则是否命中；EMBEDDABLE_RULES 中的规则跳过位于嵌入从句（前面出现 EMBEDDING_PATTERN）的匹配"""
+    if name not in EMBEDDABLE_RULES:
+        return pattern.search(text) is not None
+    return any(not EMBEDDING_PATTERN.search(text, 0, match.start()) for match in pattern.finditer(text))
+
+
+def classify_question(question: str, threshold: float = 0.8) -> QuestionVerdict:
+    """
+    判断问题是否为明显的开放式问题
+
+    Args:
+        question: 玩家问题
+        threshold: 判定为开放式问题所需的最低置信度，调高更保守（漏判交给 ReplyAgent）
+
+    Returns:
+        QuestionVerdict: is_open / confidence / 命中的规则名
+    """
+    text = (question or "").strip()
+    if not text:
+        return QuestionVerdict(False, 0.0, "")
+
+    rule, confidence = "", 0.0
+    for name, pattern, score in OPEN_PATTERNS:
+        if score > confidence and _matches(name, pattern, text):
+            rule, confidence = name, score
+    if confidence and any(pattern.search(text) for _, pattern in CLOSED_PATTERNS):
+        confidence *= CLOSED_DISCOUNT
+    return QuestionVerdict(confidence >= threshold, confidence, rule)
@@ -1,40 +1,113 @@
 """
 状态管理工具模块
+
+节点把 GameState 交给 Agent 时不再 dict(state) 复制整份状态，而是包一层只读投影：
+投影只暴露该 Agent 读取的字段，按需从原状态取值，不分配新的字典
 """
-from typing import Callable, Coroutine, Dict, Any, TypeVar, Union
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional, Tuple, TypeVar, Union
 from functools import wraps
 from src.state_schema import GameState
 
 T = TypeVar('T', bound=Callable)
 
+
+class StateView(Mapping):
+    """
+    GameState 的只读投影
+
+    子类以类型注解声明可读字段；实现 ``Mapping`` 接口，Agent 原有的 ``inputs.get(...)``
+    读取方式不变，未声明的字段视为不存在
+    """
+
+    __slots__ = ("_state",)
+    FIELDS: Tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.FIELDS = tuple(cls.__dict__.get("__annotations__", {}))
+
+    def __init__(self, state: Union[GameState, Mapping[str, Any]]):
+        """
+        Args:
+            state: 节点收到的 GameState（或测试中使用的状态字典），不复制
+        """
+        object.__setattr__(self, "_state", state)
+
+    def __getattr__(self, name: str) -> Any:
+        if name in type(self).FIELDS:
+            state = object.__getattribute__(self, "_state")
+            return state[name] if isinstance(state, Mapping) else getattr(state, name)
+        raise AttributeError(f"{type(self).__name__} 没有字段 {name}")
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} 是只读投影")
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in type(self).FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(type(self).FIELDS)
+
+    def __len__(self) -> int:
+        return len(type(self).FIELDS)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{key}={getattr(self, key)!r}" for key in type(self).FIELDS)
+        return f"{type(self).__name__}({fields})"
+
+
+class ReplyView(StateView):
+    """ReplyAgent / FusedTurnAgent 读取的字段"""
+    __slots__ = ()
+    current_question: Optional[str]
+    true_answer: Optional[str]
+
+
+class StructureView(StateView):
+    """StructureAgent 读取的字段"""
+    __slots__ = ()
+    current_question: Optional[str]
+    current_host_reply: Optional[str]
+    current_reply_type: Optional[str]
+    current_reply_notes: Optional[str]
+    current_chain_id: Optional[str]
+    current_node_id: Optional[str]
+
+
+class AnalysisView(StateView):
+    """AnalysisAgent 只读取思维链记忆，不读取状态字段"""
+    __slots__ = ()
+
+
+class DetectionView(StateView):
+    """DetectionAgent 读取的字段"""
+    __slots__ = ()
+    current_question: Optional[str]
+    current_node_id: Optional[str]
+
+
 def with_state_update(func: T) -> T:
     """
-    装饰器：自动将函数返回值合并进状态
-    
+    装饰器：把节点函数的返回值作为部分更新交给 LangGraph
+
+    LangGraph 按字段合并节点返回的部分更新，这里不再 model_dump 整份状态再合并回去
+
     Args:
         func: 异步函数，接收状态参数，返回需要更新的字段字典
-        
+
     Returns:
-        装饰后的函数，返回更新后的状态
-        
+        装饰后的函数，返回需要更新的字段字典（为 None 时返回空字典）
+
     示例:
         @with_state_update
-        async def my_node(inputs: Dict[str, Any]) -> Dict[str, Any]:
-            return {"new_field": "value"}  # 会被自动合并到状态
+        async def my_node(inputs: GameState) -> Dict[str, Any]:
+            return {"new_field": "value"}  # 由 LangGraph 合并到状态
     """
     @wraps(func)
     async def wrapper(inputs: Union[Dict[str, Any], GameState], **kwargs) -> Dict[str, Any]:
-        # 如果输入是 GameState，转换为字典
-        if isinstance(inputs, GameState):
-            state_dict = inputs.model_dump()
-        else:
-            state_dict = inputs
-            
-        # 调用原始函数获取更新字段
-        result = await func(state_dict, **kwargs)
-        
-        # 更新状态
-        state_dict.update(result)
-        return state_dict
-        
-    return wrapper 
\ No newline at end of file
+        result = await func(inputs, **kwargs)
+        return result or {}
+
+    return wrapper
@@ -0,0 +1,34 @@
+"""
+本地 token 估算工具（离线可用，不依赖具体模型的分词器）
+"""
+import math
+import re
+
+# 中日韩字符在 DeepSeek / GPT 类分词器中大约 0.6~1 个 token，这里偏保守取 1
+CJK_TOKENS_PER_CHAR = 1.0
+# 英文、数字等 ASCII 字符大约 4 个字符一个 token
+ASCII_CHARS_PER_TOKEN = 4
+
+_CJK_PATTERN = re.compile(r"[　-〿぀-ヿ㐀-䶿一-鿿豈-﫿＀-￯]")
+_ASCII_PATTERN = re.compile(r"[\x21-\x7e]")
+_SPACE_PATTERN = re.compile(r"\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文本的 token 数
+    
+    Args:
+        text: 待估算文本
+        
+    Returns:
+        int: 估算的 token 数（向上取整）
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    ascii_chars = len(_ASCII_PATTERN.findall(text))
+    spaces = len(_SPACE_PATTERN.findall(text))
+    # 其余字符（emoji、特殊符号等）按每个 1 token 计算
+    other = len(text) - cjk - ascii_chars - spaces
+    return math.ceil(cjk * CJK_TOKENS_PER_CHAR + ascii_chars / ASCII_CHARS_PER_TOKEN + other)
@@ -1,14 +1,28 @@
 """
 独立的工作流定义模块 - 支持LangGraph Studio
 """
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Literal
 import logging
 from langgraph.graph import StateGraph, END, START
+from langgraph.config import get_stream_writer
+from langgraph.types import interrupt
+from langchain_core.runnables import RunnableConfig
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 from src.state_schema import GameState
+from src.utils.state_utils import AnalysisView, DetectionView, ReplyView, StructureView
+from src.config import WORKFLOW_CONFIG
+from src.utils.question_rules import classify_question
+from src.memory.message_history import fold_overflow
 
 logger = logging.getLogger(__name__)
 
+# config["configurable"] 中存放会话节点依赖的键
+WORKFLOW_NODES_KEY = "workflow_nodes"
+
+# 等待玩家输入时 interrupt 携带的提示，以及恢复值中会写回状态的字段
+PLAYER_ACTION_PROMPT = "请输入(question/hint_request/answer_request/submit_answer)"
+PLAYER_ACTION_FIELDS = ("player_action", "current_question", "current_answer")
+
 class WorkflowNodes:
     """工作流节点类 - 组织所有节点函数 🎯"""
     
@@ -20,6 +34,12 @@ class WorkflowNodes:
         detection_agent=None,
         hint_tool=None,
         stuck_detector=None,
+        stuck_gate=None,
+        fused_agent=None,
+        reply_cache=None,
+        story_id=None,
+        summary_agent=None,
+        open_question_threshold: float = WORKFLOW_CONFIG["open_question_threshold"],
     ):
         """初始化节点处理器"""
         self.reply_agent = reply_agent
@@ -28,12 +48,59 @@ class WorkflowNodes:
         self.detection_agent = detection_agent
         self.hint_tool = hint_tool
         self.stuck_detector = stuck_detector
+        self.stuck_gate = stuck_gate
+        self.fused_agent = fused_agent
+        self.reply_cache = reply_cache
+        self.story_id = story_id
+        self.summary_agent = summary_agent
+        self.open_question_threshold = open_question_threshold
+
+    async def classify_question_node(self, state: GameState) -> Dict[str, Any]:
+        """问题分类节点 🚦
+
+        本地规则识别明显的开放式问题，直接给出 error 回复，不调用模型
+        """
+        verdict = classify_question(state.current_question, self.open_question_threshold)
+        if not verdict.is_open:
+            return {}
+        reply = "这个问题无法用“是 / 否 / 无关”回答，请换成封闭式问题再问一次"
+        get_stream_writer()({"host_reply_token": reply})
+        return {
+            "current_host_reply": reply,
+            "current_reply_type": "error",
+            "current_reply_notes": f"本地规则判定为开放式问题（{verdict.rule}，置信度 {verdict.confidence:.2f}）",
+            "current_reply_invalid": True
+        }
+
+    def route_classified_question(self, state: GameState) -> str:
+        """开放式问题直接结束本回合，其余问题进入回复生成 🔀"""
+        return "open" if state.current_reply_type == "error" else "closed"
 
     async def reply_generation_node(self, state: GameState) -> Dict[str, Any]:
         """回复生成节点 🎯"""
 
+        use_cache = self.reply_cache is not None and self.story_id is not None
+        if use_cache:
+            cached = self.reply_cache.lookup(self.story_id, state.current_question or "")
+            if cached is not None:
+                # 同一故事中已回答过相似问题，直接复用；流式调用方一次收到完整回复
+                get_stream_writer()({"host_reply_token": cached["current_host_reply"]})
+                return cached
+
         try:
-            result = await self.reply_agent.run(state)
+            if hasattr(self.reply_agent, "astream"):
+                # 流式生成：host_reply 片段通过 custom 流实时推送
+                writer = get_stream_writer()
+                result = None
+                async for event in self.reply_agent.astream(ReplyView(state)):
+                    if event["event"] == "token":
+                        writer({"host_reply_token": event["data"]})
+                    elif event["event"] == "reply":
+                        result = event["data"]
+            else:
+                result = await self.reply_agent.run(ReplyView(state))
+            if use_cache:
+                self.reply_cache.store(self.story_id, state.current_question or "", result)
             return {
                 "current_host_reply": result["current_host_reply"],
                 "current_reply_type": result["current_reply_type"],
@@ -44,12 +111,36 @@ class WorkflowNodes:
             logger.error(f"回复生成失败: {str(e)}")
             
 
+    async def fused_turn_node(self, state: GameState) -> Dict[str, Any]:
+        """融合回合节点 ⚡
+
+        一次模型调用给出回复、结构判断与分析；输出未通过校验时只标记失败，由路由回退到多 Agent 路径
+        """
+        try:
+            result = await self.fused_agent.run(ReplyView(state))
+        except Exception as e:
+            logger.error(f"融合回合失败: {str(e)}")
+            result = {"valid": False}
+        if not result.get("valid"):
+            return {"fused_turn_valid": False}
+        return {
+            "fused_turn_valid": True,
+            "current_host_reply": result["current_host_reply"],
+            "current_reply_type": result["current_reply_type"],
+            "current_reply_notes": result["current_reply_notes"],
+            "current_reply_invalid": result["current_reply_invalid"],
+            "current_chain_id": result["chain_id"],
+            "current_node_id": result["node_id"],
+            "analysis_note": result["analysis_note"],
+            "path_similarity": result["path_similarity"]
+        }
+
     async def structure_analysis_node(self, state: GameState) -> Dict[str, Any]:
         """结构分析节点 🧠"""
 
             
         try:
-            result = await self.structure_agent.run(state)
+            result = await self.structure_agent.run(StructureView(state))
             return {
                 "current_chain_id": result["chain_id"],
                 "current_node_id": result["node_id"],
@@ -60,9 +151,12 @@ class WorkflowNodes:
 
     async def analysis_node(self, state: GameState) -> Dict[str, Any]:
         """思维链分析节点 🔍"""
+        if state.fused_turn_valid:
+            # 融合回合已经给出分析结果并写入 memory
+            return {}
     
         try:
-            result = await self.analysis_agent.run(state)
+            result = await self.analysis_agent.run(AnalysisView(state))
             return {
                 "analysis_note": result["analysis_note"],
                 "path_similarity": result["path_similarity"]
@@ -75,26 +169,53 @@ class WorkflowNodes:
         """状态检测节点 🕵️"""
 
         try:
-            result = await self.detection_agent.run(state)
+            result = await self.detection_agent.run(DetectionView(state))
             return {
                 "is_deviated": result["is_deviated"],
                 "is_looping": result["is_looping"],
-                "hint": result["hint"]
+                "hint_text": result["hint"] or None
             }
         except Exception as e:
             logger.error(f"状态检测失败: {str(e)}")
             
 
     async def detect_stuck_node(self, state: GameState) -> Dict[str, Any]:
-        """卡住检测节点 🚫"""
+        """卡住检测节点 🚫
+
+        配置了 stuck_gate 时先按会话统计本地判断，只有灰区才调用 stuck_detector
+        """
+        if self.stuck_gate is not None:
+            verdict = self.stuck_gate.check()
+            if verdict.is_stuck is not None:
+                logger.info(f"卡住检测本地判定: {verdict.is_stuck}（{verdict.reasoning}）")
+                return {"is_stuck": verdict.is_stuck}
 
         try:
-            result = await self.stuck_detector.run(state)
+            result = await self.stuck_detector.arun({
+                "current_question": state.current_question or "",
+                "current_brainchain": state.current_brain_context or ""
+            })
             return {"is_stuck": result["is_stuck"]}
         except Exception as e:
             logger.error(f"卡住检测失败: {str(e)}")
             return {"is_stuck": False}
 
+    async def join_detection_node(self, state: GameState) -> Dict[str, Any]:
+        """检测结果汇合节点 🔗
+
+        analysis / detection / detect_stuck 三个分支全部完成后执行，汇总本轮检测结果
+        """
+        return {
+            "detection_result": {
+                "is_deviated": state.is_deviated,
+                "is_looping": state.is_looping,
+                "is_stuck": state.is_stuck,
+                "hint_text": state.hint_text,
+                "analysis_note": state.analysis_note,
+                "path_similarity": state.path_similarity
+            }
+        }
+
     async def hint_generation_node(self, state: GameState) -> Dict[str, Any]:
         """生成提示节点 💡"""
         return {
@@ -157,30 +278,58 @@ class WorkflowNodes:
             return "continue"
     
     async def get_player_action_node(self, state: GameState) -> Dict[str, Any]:
-        """获取玩家动作节点 🔍"""
-        user_action = await input("请输入(question/hint_request/answer_request/submit_answer): ")
-        
-        return {
-            "player_action": user_action
-        }
+        """获取玩家动作节点 🔍
+
+        初始状态中没有动作时以 interrupt 挂起本次运行（需要检查点），会话只保留为一条检查点；
+        玩家动作到达后以 Command(resume=...) 按 thread_id 恢复，恢复值可以是动作字符串，
+        或包含 player_action / current_question / current_answer 的字典
+        """
+        # 控制器已经在初始状态中给出本轮动作
+        if state.player_action != "None":
+            return {}
+        action = interrupt({"prompt": PLAYER_ACTION_PROMPT})
+        if isinstance(action, str):
+            action = {"player_action": action}
+        return {key: action[key] for key in PLAYER_ACTION_FIELDS if key in action}
+
+    def route_player_action(self, state: GameState) -> str:
+        """按玩家动作路由 🔀"""
+        return state.player_action
     
     async def give_hint_node(self, state: GameState) -> Dict[str, Any]:
         """给出提示节点 🔍"""
-        response = AIMessage(content=state.hint)
+        response = AIMessage(content=state.hint_text or "")
         return {    
-            "messages": [response]
+            "messages": await fold_overflow(state.messages, [response], self.summary_agent)
         }
 
-# Studio兼容的工厂函数 🎨
-def build_graph(config: dict = None) -> StateGraph:
+def build_workflow_nodes(
+    *,
+    reply_agent=None,
+    structure_agent=None,
+    analysis_agent=None,
+    detection_agent=None,
+    hint_tool=None,
+    stuck_detector=None,
+    context=None,
+    fused_agent=None,
+    reply_cache=None,
+    stuck_gate=None,
+    summary_agent=None,
+) -> WorkflowNodes:
     """
-    构建游戏流程图 🏗️ (LangGraph Studio兼容版本)
+    创建一个会话的节点处理器，缺省依赖使用 Mock 组件
     
     Args:
-        config: 运行时配置 (LangGraph Studio会传入这个参数)
-         
+        reply_agent / structure_agent / analysis_agent / detection_agent / hint_tool / stuck_detector / fused_agent:
+            节点依赖，未提供时使用 Mock 组件
+        context: 游戏上下文，提供 reply_cache 分区使用的 story_id
+        reply_cache: 跨会话的主持人回复缓存，为 None 时每个问题都调用 reply_agent
+        stuck_gate: 卡住检测的本地门控，为 None 时每回合都调用 stuck_detector
+        summary_agent: 消息历史采用 summarize 策略时把溢出消息并入摘要，为 None 时只截断
+        
     Returns:
-        StateGraph: 游戏流程图
+        WorkflowNodes: 节点处理器
     """
     # 导入Mock组件
     from src.mock_data import (
@@ -189,76 +338,205 @@ def build_graph(config: dict = None) -> StateGraph:
         MockAnalysisAgent, 
         MockDetectionAgent, 
         MockStuckDetector, 
-        MockHintTool
+        MockHintTool,
+        MockFusedTurnAgent
     )
     
-    # 创建Mock实例
-    mock_reply_agent = MockReplyAgent()
-    mock_structure_agent = MockStructureAgent()
-    mock_analysis_agent = MockAnalysisAgent()
-    mock_detection_agent = MockDetectionAgent()
-    mock_stuck_detector = MockStuckDetector()
-    hint_tool = MockHintTool()
-    
-    # 把内部构建函数直接写进来
-    # 创建节点处理器
-    nodes = WorkflowNodes(
-        reply_agent=mock_reply_agent,
-        structure_agent=mock_structure_agent,
-        analysis_agent=mock_analysis_agent,
-        detection_agent=mock_detection_agent,
-        hint_tool=hint_tool,
-        stuck_detector=mock_stuck_detector,
+    return WorkflowNodes(
+        reply_agent=reply_agent or MockReplyAgent(),
+        structure_agent=structure_agent or MockStructureAgent(),
+        analysis_agent=analysis_agent or MockAnalysisAgent(),
+        detection_agent=detection_agent or MockDetectionAgent(),
+        hint_tool=hint_tool or MockHintTool(),
+        stuck_detector=stuck_detector or MockStuckDetector(),
+        stuck_gate=stuck_gate,
+        fused_agent=fused_agent or MockFusedTurnAgent(),
+        reply_cache=reply_cache,
+        story_id=context.story.story_id if context is not None else None,
+        summary_agent=summary_agent,
     )
+
+
+def session_config(nodes: WorkflowNodes, thread_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    生成调用共享流程图时使用的 config
+    
+    Args:
+        nodes: 会话的节点处理器，注入图中
+        thread_id: 检查点中的会话ID，流程图带检查点时必须提供
+        
+    Returns:
+        Dict[str, Any]: config
+    """
+    configurable = {WORKFLOW_NODES_KEY: nodes}
+    if thread_id is not None:
+        configurable["thread_id"] = thread_id
+    return {"configurable": configurable}
+
+
+def session_node(default: WorkflowNodes, name: str):
+    """
+    包装节点方法：运行时优先使用 config 中注入的会话节点处理器，未注入时使用 default
+    
+    Args:
+        default: 构建流程图时的节点处理器
+        name: 节点方法名
+        
+    Returns:
+        节点函数
+    """
+    async def node(state: GameState, config: RunnableConfig) -> Dict[str, Any]:
+        nodes = (config.get("configurable") or {}).get(WORKFLOW_NODES_KEY) or default
+        return await getattr(nodes, name)(state)
+    node.__name__ = name
+    return node
+
+
+# Studio兼容的工厂函数 🎨
+def build_graph(
+    config: dict = None,
+    *,
+    reply_agent=None,
+    structure_agent=None,
+    analysis_agent=None,
+    detection_agent=None,
+    hint_tool=None,
+    stuck_detector=None,
+    context=None,
+    fused_agent=None,
+    reply_cache=None,
+    stuck_gate=None,
+    nodes: Optional[WorkflowNodes] = None,
+    checkpointer=None,
+    open_question_fast_path: Optional[bool] = None,
+    detection_topology: Optional[Literal["parallel", "sequential"]] = None,
+    turn_mode: Optional[Literal["multi_agent", "fused"]] = None,
+) -> StateGraph:
+    """
+    构建游戏流程图 🏗️ (LangGraph Studio兼容版本)
+    
+    编译好的图不绑定会话：调用时在 config["configurable"]["workflow_nodes"] 中传入
+    其它会话的 WorkflowNodes（见 session_config），即可在多个会话间共用同一个图
+    
+    Args:
+        config: 运行时配置 (LangGraph Studio会传入这个参数)
+        reply_agent / structure_agent / analysis_agent / detection_agent / hint_tool / stuck_detector / fused_agent
+        / context / reply_cache / stuck_gate:
+            默认会话的节点依赖，含义见 build_workflow_nodes
+        nodes: 已创建的默认节点处理器，提供时忽略上面的依赖参数
+        checkpointer: 检查点存储，提供时调用方需要在 config 中给出 thread_id，
+            等待玩家输入的会话可以挂起并按 thread_id 恢复（见 build_checkpointer）
+        open_question_fast_path: 是否先用本地规则拦截开放式问题，默认取 WORKFLOW_CONFIG["open_question_fast_path"]
+        detection_topology: 结构分析之后的检测拓扑，默认取 WORKFLOW_CONFIG["detection_topology"]。
+            parallel 时 analysis / detection / detect_stuck 并发执行，由 join_detection 汇合
+        turn_mode: 提问回合的模型调用方式，默认取 WORKFLOW_CONFIG["turn_mode"]。
+            fused 时先由 fused_turn 一次调用完成回复、结构判断与分析，校验失败才进入 reply_generation
+         
+    Returns:
+        StateGraph: 游戏流程图
+    """
+    if nodes is None:
+        nodes = build_workflow_nodes(
+            reply_agent=reply_agent,
+            structure_agent=structure_agent,
+            analysis_agent=analysis_agent,
+            detection_agent=detection_agent,
+            hint_tool=hint_tool,
+            stuck_detector=stuck_detector,
+            context=context,
+            fused_agent=fused_agent,
+            reply_cache=reply_cache,
+            stuck_gate=stuck_gate,
+        )
+    detection_topology = detection_topology or WORKFLOW_CONFIG["detection_topology"]
+    turn_mode = turn_mode or WORKFLOW_CONFIG["turn_mode"]
+    if open_question_fast_path is None:
+        open_question_fast_path = WORKFLOW_CONFIG["open_question_fast_path"]
+    question_entry = "fused_turn" if turn_mode == "fused" else "reply_generation"
     
     # 创建流程图
     graph = StateGraph(GameState)
     
     # 添加节点 - 使用类方法
-    graph.add_node("start", START)
-    graph.add_node("end", END)
-    graph.add_node("Get_player_action", nodes.get_player_action_node)
-    graph.add_node("reply_generation", nodes.reply_generation_node)
-    graph.add_node("structure_analysis", nodes.structure_analysis_node)
-    graph.add_node("analysis", nodes.analysis_node)
-    graph.add_node("detection", nodes.detection_node)
-    graph.add_node("reveal_answer", nodes.reveal_answer_node)
-    graph.add_node("judge_answer", nodes.judge_answer_node)
-    graph.add_node("answer_analysis", nodes.answer_analysis_node)
-    graph.add_node("output_result", nodes.output_result_node)
-    graph.add_node("hint_generation", nodes.hint_generation_node)
-    graph.add_node("Give_hint", nodes.give_hint_node)
+    graph.add_node("Get_player_action", session_node(nodes, "get_player_action_node"))
+    graph.add_node("reply_generation", session_node(nodes, "reply_generation_node"))
+    graph.add_node("structure_analysis", session_node(nodes, "structure_analysis_node"))
+    graph.add_node("analysis", session_node(nodes, "analysis_node"))
+    graph.add_node("detection", session_node(nodes, "detection_node"))
+    graph.add_node("detect_stuck", session_node(nodes, "detect_stuck_node"))
+    graph.add_node("join_detection", session_node(nodes, "join_detection_node"))
+    if turn_mode == "fused":
+        graph.add_node("fused_turn", session_node(nodes, "fused_turn_node"))
+    if open_question_fast_path:
+        graph.add_node("classify_question", session_node(nodes, "classify_question_node"))
+    graph.add_node("reveal_answer", session_node(nodes, "reveal_answer_node"))
+    graph.add_node("judge_answer", session_node(nodes, "judge_answer_node"))
+    graph.add_node("answer_analysis", session_node(nodes, "answer_analysis_node"))
+    graph.add_node("output_result", session_node(nodes, "output_result_node"))
+    graph.add_node("hint_generation", session_node(nodes, "hint_generation_node"))
+    graph.add_node("Give_hint", session_node(nodes, "give_hint_node"))
     
     graph.add_edge(START, "Get_player_action")
     
     # 玩家行为路由
     graph.add_conditional_edges(
         "Get_player_action",
-        nodes.get_player_action_node,
+        nodes.route_player_action,
         {
-            "question": "reply_generation",
+            "question": "classify_question" if open_question_fast_path else question_entry,
             "hint_request": "hint_generation",
-            "answer_request": "show_answer",
-            "submit_answer": "judge_answer"
+            "answer_request": "reveal_answer",
+            "submit_answer": "judge_answer",
+            "None": END
         }
     )
 
     #问答子图
+    if open_question_fast_path:
+        graph.add_conditional_edges(
+            "classify_question",
+            nodes.route_classified_question,
+            {"open": END, "closed": question_entry}
+        )
     graph.add_edge("reply_generation", "structure_analysis")
-    graph.add_edge("structure_analysis", "analysis")
-    graph.add_edge("analysis", "detection")
+    detection_branches = ["analysis", "detection", "detect_stuck"]
+    if detection_topology == "parallel":
+        # 三个检测分支只依赖回复和更新后的思维链，扇出并发执行，全部完成后汇合
+        for branch in detection_branches:
+            graph.add_edge("structure_analysis", branch)
+        graph.add_edge(detection_branches, "join_detection")
+    else:
+        graph.add_edge("structure_analysis", "analysis")
+        graph.add_edge("analysis", "detection")
+        graph.add_edge("detection", "detect_stuck")
+        graph.add_edge("detect_stuck", "join_detection")
+    if turn_mode == "fused":
+        # fused_turn 已给出分析结果，analysis 节点会直接跳过，汇合方式与多 Agent 路径相同
+        fused_branches = detection_branches if detection_topology == "parallel" else ["analysis"]
+
+        def route_fused_turn(state: GameState):
+            """融合输出通过校验时继续检测，否则回退到多 Agent 路径 🔀"""
+            return fused_branches if state.fused_turn_valid else "reply_generation"
+
+        graph.add_conditional_edges(
+            "fused_turn",
+            route_fused_turn,
+            [*fused_branches, "reply_generation"]
+        )
     graph.add_conditional_edges(
-        "detection",
+        "join_detection",
         nodes.check_detection_result,
         {
-            "is_stuck": "hint_generation",
-            "not_stuck": "Get_player_action"
+            "stuck": "hint_generation",
+            "hint": "Give_hint",
+            "answer": "judge_answer",
+            "continue": END
         }
     )
     
     # 求提示子图
     graph.add_edge("hint_generation", "Give_hint")
-    graph.add_edge("Give_hint", "Get_player_action")
+    graph.add_edge("Give_hint", END)
 
     # 判断答案子图
     graph.add_edge("judge_answer", "answer_analysis")
@@ -266,6 +544,6 @@ def build_graph(config: dict = None) -> StateGraph:
     graph.add_edge("output_result", END)
 
     # 显示答案子图
-    graph.add_edge("show_answer", END)
+    graph.add_edge("reveal_answer", END)
 
-    return graph.compile()
+    return graph.compile(checkpointer=checkpointer)
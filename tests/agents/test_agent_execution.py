@@ -0,0 +1,68 @@
+""" 测试无工具 Agent 的两种执行方式结果一致 """
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import json
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.agents.reply_agent import ReplyAgent
+from src.agents.analysis_agent import AnalysisAgent
+from src.memory.brainchain import BrainChainMemory
+
+EXECUTIONS = ["pipeline", "agent_executor"]
+REPLY = {"host_reply": "是的，他是司机。", "reply_type": "yes", "notes": "与谜底一致"}
+ANALYSIS = {"analysis_note": "方向正确", "path_similarity": 0.6}
+
+
+class TestReplyAgentExecution:
+    """ReplyAgent 的 run / astream 接口不随执行方式变化"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("execution", EXECUTIONS)
+    async def test_run(self, execution):
+        llm = FakeListChatModel(responses=[json.dumps(REPLY, ensure_ascii=False)])
+        agent = ReplyAgent(llm=llm, memory=BrainChainMemory(), execution=execution)
+        result = await agent.run({"current_question": "他是司机吗？", "true_answer": "他是司机"})
+        assert result == {
+            "current_host_reply": REPLY["host_reply"],
+            "current_reply_type": "yes",
+            "current_reply_notes": REPLY["notes"],
+            "current_reply_invalid": False,
+        }
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("execution", EXECUTIONS)
+    async def test_astream(self, execution):
+        llm = FakeListChatModel(responses=[json.dumps(REPLY, ensure_ascii=False)])
+        agent = ReplyAgent(llm=llm, memory=BrainChainMemory(), execution=execution)
+        events = [event async for event in agent.astream({"current_question": "他是司机吗？"})]
+        tokens = [event["data"] for event in events if event["event"] == "token"]
+        assert "".join(tokens) == REPLY["host_reply"]
+        assert events[-1]["data"]["current_reply_type"] == "yes"
+
+    def test_pipeline_skips_agent_executor(self):
+        agent = ReplyAgent(llm=FakeListChatModel(responses=["{}"]), memory=BrainChainMemory(), execution="pipeline")
+        assert not hasattr(agent, "executor")
+
+
+class TestAnalysisAgentExecution:
+    """AnalysisAgent 在两种执行方式下都把分析结果写回链元数据"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("execution", EXECUTIONS)
+    async def test_run_writes_metadata(self, execution):
+        llm = FakeListChatModel(responses=[json.dumps(ANALYSIS, ensure_ascii=False)])
+        memory = BrainChainMemory()
+        chain_id = memory.create_chain()
+        memory.add_node(
+            content="他是司机吗？", chain_id=chain_id, parent_id=None,
+            host_reply="是", reply_type="yes", notes=""
+        )
+        agent = AnalysisAgent(llm=llm, memory=memory, execution=execution)
+
+        result = await agent.run({})
+        assert result == ANALYSIS
+        metadata = memory.get_chain(chain_id).metadata
+        assert metadata["analysis_note"] == ANALYSIS["analysis_note"]
+        assert metadata["path_similarity"] == ANALYSIS["path_similarity"]
@@ -0,0 +1,88 @@
+""" 测试 DetectionAgent 的本地绕圈检测与 LLM 检测的分工 """
+import json
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.agents.detection_agent import DetectionAgent
+from src.memory.brainchain import BrainChainMemory
+from src.context import GameContext, Story
+from src.config import AGENT_CONFIG
+
+
+class FakeExecutor:
+    """记录调用并像 AgentExecutor 一样把模型输出放在 output 字符串中返回"""
+
+    def __init__(self, output: str):
+        self.output = output
+        self.calls = []
+
+    async def ainvoke(self, inputs):
+        self.calls.append(inputs)
+        return {**inputs, "output": self.output}
+
+
+def build_agent(result) -> DetectionAgent:
+    memory = BrainChainMemory()
+    chain_id = memory.create_chain()
+    memory.add_node(
+        content="这个男人是公交车司机吗？", chain_id=chain_id, parent_id=None,
+        host_reply="是", reply_type="yes", notes=""
+    )
+    context = GameContext(
+        game_id="test_001",
+        story=Story(story_id="test_001", content="一个男人上了公交车……", answer="他是司机")
+    )
+    agent = DetectionAgent(llm=FakeListChatModel(responses=["{}"]), memory=memory, context=context)
+    agent._executor = FakeExecutor(result if isinstance(result, str) else json.dumps(result, ensure_ascii=False))
+    return agent
+
+
+class TestDetectionAgent:
+    """本地索引只决定 is_looping"""
+
+    @pytest.mark.asyncio
+    async def test_deviating_question_still_flagged(self):
+        """本地判定未绕圈时，偏离检测与提示仍来自 LLM"""
+        agent = build_agent({"is_deviated": True, "is_looping": True, "hint": "回到公交车本身"})
+        result = await agent.run({"current_question": "他家里养了几只猫？"})
+        assert len(agent._executor.calls) == 1
+        assert result == {"is_deviated": True, "is_looping": False, "hint": "回到公交车本身"}
+
+    @pytest.mark.asyncio
+    async def test_local_loop_verdict_overrides_llm(self):
+        agent = build_agent({"is_deviated": False, "is_looping": False, "hint": ""})
+        result = await agent.run({"current_question": "这个男人是公交车司机吗"})
+        assert result["is_looping"] is True
+        assert "这个男人是公交车司机吗？" in result["hint"]
+
+    @pytest.mark.asyncio
+    async def test_skip_llm_when_definite(self, monkeypatch):
+        monkeypatch.setitem(AGENT_CONFIG["loop_detection"], "skip_llm_when_definite", True)
+        agent = build_agent({"is_deviated": True, "is_looping": False, "hint": ""})
+        result = await agent.run({"current_question": "他家里养了几只猫？"})
+        assert agent._executor.calls == []
+        assert result == {"is_deviated": False, "is_looping": False, "hint": ""}
+
+    @pytest.mark.asyncio
+    async def test_parses_executor_output(self):
+        """检测结果取自 output 中的 JSON，允许前后夹杂文字"""
+        output = '检测结果：{"is_deviated": true, "is_looping": false, "hint": "想想他的职业"}'
+        agent = build_agent(output)
+        result = await agent.run({"current_question": "他家里养了几只猫？"})
+        assert result == {"is_deviated": True, "is_looping": False, "hint": "想想他的职业"}
+
+    @pytest.mark.asyncio
+    async def test_unparseable_output_falls_back(self):
+        agent = build_agent("我无法判断")
+        result = await agent.run({"current_question": "他家里养了几只猫？"})
+        assert result == {"is_deviated": False, "is_looping": False, "hint": ""}
+
+    @pytest.mark.asyncio
+    async def test_does_not_mutate_shared_memory(self):
+        agent = build_agent({"is_deviated": False, "is_looping": False, "hint": ""})
+        await agent.run({"current_question": "他家里养了几只猫？"})
+        assert agent._executor.calls == [{"action_type": "no_action"}]
+        assert agent.memory.action_type == "no_action"
@@ -0,0 +1,71 @@
+""" 测试 FusedTurnAgent 的校验与写入 """
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import json
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.agents.fused_agent import FusedTurnAgent
+from src.memory.brainchain import BrainChainMemory
+
+
+def fused_output(**overrides) -> str:
+    output = {
+        "host_reply": "是的",
+        "reply_type": "yes",
+        "notes": "与谜底一致",
+        "structure_type": "new",
+        "chain_id": None,
+        "parent_id": None,
+        "analysis_note": "方向正确",
+        "path_similarity": 0.6,
+    }
+    output.update(overrides)
+    return json.dumps(output, ensure_ascii=False)
+
+
+def build_inputs(question: str) -> dict:
+    return {"current_question": question, "true_answer": "他是司机"}
+
+
+class TestFusedTurn:
+    """一次调用完成回复、结构判断与分析"""
+
+    @pytest.mark.asyncio
+    async def test_valid_output_is_dispatched_to_memory(self):
+        """通过校验的输出写入节点与链分析结果"""
+        llm = FakeListChatModel(responses=[
+            fused_output(),
+            fused_output(host_reply="不是", reply_type="no", structure_type="current", path_similarity=0.7),
+        ])
+        memory = BrainChainMemory()
+        agent = FusedTurnAgent(llm=llm, memory=memory)
+
+        first = await agent.run(build_inputs("他是司机吗？"))
+        second = await agent.run(build_inputs("他在开车吗？"))
+
+        assert first["valid"] and second["valid"]
+        assert second["current_host_reply"] == "不是"
+        assert first["chain_id"] == second["chain_id"] == memory.current_chain_id
+        chain = memory.get_chain()
+        assert [n.content for n in chain.get_focus_path()] == ["他是司机吗？", "他在开车吗？"]
+        assert chain.nodes[second["node_id"]].parent_id == first["node_id"]
+        assert chain.metadata["path_similarity"] == 0.7
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("response", [
+        "这不是 JSON",
+        fused_output(path_similarity=1.5),
+        fused_output(structure_type="old", chain_id="missing"),
+        fused_output(structure_type="current"),
+    ])
+    async def test_invalid_output_writes_nothing(self, response):
+        """解析或校验失败时返回 valid=False，memory 保持不变"""
+        memory = BrainChainMemory()
+        agent = FusedTurnAgent(llm=FakeListChatModel(responses=[response]), memory=memory)
+
+        result = await agent.run(build_inputs("他是司机吗？"))
+
+        assert result == {"valid": False}
+        assert memory.brainchains == {}
@@ -0,0 +1,60 @@
+""" 测试 StructureAgent 本地簿记模式 """
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.agents.structure_agent import StructureAgent
+from src.memory.brainchain import BrainChainMemory
+
+
+def build_inputs(question: str) -> dict:
+    return {
+        "current_question": question,
+        "current_host_reply": "是的",
+        "current_reply_type": "yes",
+        "current_reply_notes": "",
+    }
+
+
+class TestLocalBookkeeping:
+    """local 模式下 ID 与时间戳由 memory 生成，每回合一次模型调用"""
+
+    @pytest.mark.asyncio
+    async def test_single_model_call_per_turn(self):
+        """新链与续链各只调用一次模型"""
+        llm = FakeListChatModel(responses=[
+            '{"structure_type": "new", "chain_id": null, "parent_id": null}',
+            '{"structure_type": "current", "chain_id": null, "parent_id": null}',
+            "",  # 哨兵：FakeListChatModel 用完列表后会把计数归零
+        ])
+        memory = BrainChainMemory()
+        agent = StructureAgent(llm=llm, memory=memory, bookkeeping="local")
+        assert agent.tools == []
+
+        first = await agent._arun(build_inputs("他是司机吗？"))
+        assert llm.i == 1
+        second = await agent._arun(build_inputs("他下班了吗？"))
+        assert llm.i == 2
+
+        assert first["chain_id"] == second["chain_id"] == memory.current_chain_id
+        chain = memory.get_chain()
+        assert [n.content for n in chain.get_focus_path()] == ["他是司机吗？", "他下班了吗？"]
+        assert chain.nodes[second["node_id"]].parent_id == first["node_id"]
+
+    @pytest.mark.asyncio
+    async def test_old_chain_revisit_uses_aliases(self):
+        """回访旧链时可以使用短别名，并切换当前链"""
+        memory = BrainChainMemory(prompt_format="compact")
+        old_chain = memory.create_chain()
+        root_id = memory.add_node(content="他是乘客吗？", chain_id=old_chain, host_reply="不是", reply_type="no", notes="")
+        memory.create_chain()
+        memory.summarize_brainchains("compact")
+
+        llm = FakeListChatModel(responses=['{"structure_type": "old", "chain_id": "c1", "parent_id": "n1"}'])
+        agent = StructureAgent(llm=llm, memory=memory, bookkeeping="local")
+        result = await agent._arun(build_inputs("他是司机吗？"))
+
+        assert result["chain_id"] == old_chain
+        assert memory.get_chain(old_chain).nodes[result["node_id"]].parent_id == root_id
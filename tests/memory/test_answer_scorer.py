@@ -0,0 +1,124 @@
+""" 测试本地 path_similarity 评分 """
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.agents.analysis_agent import AnalysisAgent
+from src.memory.answer_scorer import AnswerScorer
+from src.memory.brainchain import BrainChainMemory
+from src.memory.node_store import NodeRecord
+
+ANSWER = "这个男人是公交车司机，他到点下班了。"
+STORY = "一个男人上了公交车，车上有很多空位。他选择了一个座位坐下，但很快就下车了。"
+
+
+def record(content: str, reply_type: str = "yes") -> NodeRecord:
+    return NodeRecord(content, content, 0.0, None, "", reply_type, "")
+
+
+def add_question(memory: BrainChainMemory, chain_id: str, question: str, reply_type: str = "yes") -> str:
+    return memory.add_node(
+        content=question, chain_id=chain_id, parent_id=memory.current_focus_id,
+        host_reply="", reply_type=reply_type, notes=""
+    )
+
+
+class TestAnswerScorer:
+
+    def test_related_questions_score_higher(self):
+        scorer = AnswerScorer(ANSWER, STORY)
+        scores = scorer.score_nodes([
+            record("他是司机吗？"),
+            record("他是司机吗？", "no"),
+            record("房间里有打斗痕迹吗？"),
+        ])
+        assert scores[0] > scores[1] > scores[2] == 0.0
+
+    def test_chain_score_accumulates_coverage(self):
+        scorer = AnswerScorer(ANSWER, STORY)
+        one = scorer.score(scorer.coverage([record("他是司机吗？")]))
+        both = scorer.score(scorer.coverage([record("他是司机吗？"), record("他是到点下班了吗？")]))
+        assert 0.0 < one < both <= 1.0
+
+
+class TestIncrementalSimilarity:
+
+    def test_add_node_updates_metadata_incrementally(self):
+        """逐个追加节点的结果与一次性计算一致"""
+        memory = BrainChainMemory()
+        scorer = AnswerScorer(ANSWER, STORY)
+        memory.set_answer_scorer(scorer)
+        chain_id = memory.create_chain()
+        questions = ["这个男人是乘客吗？", "他是司机吗？", "他是到点下班了吗？"]
+        scores = []
+        for question in questions:
+            add_question(memory, chain_id, question)
+            scores.append(memory.get_chain(chain_id).metadata["local_similarity"])
+
+        assert scores == sorted(scores)
+        full = scorer.score(scorer.coverage(memory.get_chain(chain_id).nodes.records()))
+        assert scores[-1] == full == memory.local_similarity(chain_id)
+
+
+    def test_local_and_llm_scores_kept_apart(self):
+        """追加节点不覆盖 LLM 写入的 path_similarity，对外只报告本地分数"""
+        memory = BrainChainMemory()
+        memory.set_answer_scorer(AnswerScorer(ANSWER, STORY))
+        chain_id = memory.create_chain()
+        add_question(memory, chain_id, "他是司机吗？")
+        memory.update_chain_metadata(chain_id, path_similarity=0.05)
+        add_question(memory, chain_id, "他是到点下班了吗？")
+
+        metadata = memory.get_chain(chain_id).metadata
+        assert metadata["path_similarity"] == 0.05
+        assert memory.reported_similarity(chain_id) == metadata["local_similarity"] != 0.05
+
+    def test_render_cache_shows_current_local_score(self):
+        """本地分数变化后渲染缓存失效，摘要中展示最新分数"""
+        memory = BrainChainMemory()
+        chain_id = memory.create_chain()
+        add_question(memory, chain_id, "他是司机吗？")
+        assert "相似性分数: 0.0" in memory.summarize_brainchains()
+
+        memory.set_answer_scorer(AnswerScorer(ANSWER, STORY))
+        score = memory.local_similarity(chain_id)
+        assert f"相似性分数: {score}" in memory.summarize_brainchains()
+        assert f"相似度 {score}" in memory.summarize_focus_path(chain_id, prompt_format="compact")
+
+        add_question(memory, chain_id, "他是到点下班了吗？")
+        new_score = memory.local_similarity(chain_id)
+        assert new_score != score
+        assert f"相似性分数: {new_score}" in memory.summarize_brainchains()
+
+        memory.set_answer_scorer(None)
+        assert "相似性分数: 0.0" in memory.summarize_brainchains()
+
+
+class TestAnalysisGate:
+    """本地分数平稳时跳过 LLM 分析"""
+
+    @pytest.mark.asyncio
+    async def test_llm_runs_every_n_turns_or_on_sharp_change(self):
+        llm = FakeListChatModel(responses=['{"analysis_note": "方向正确", "path_similarity": 0.5}'] * 10)
+        memory = BrainChainMemory()
+        memory.set_answer_scorer(AnswerScorer(ANSWER, STORY))
+        chain_id = memory.create_chain()
+        agent = AnalysisAgent(llm=llm, memory=memory)
+        agent.llm_every_n_turns, agent.llm_delta = 3, 0.2
+
+        add_question(memory, chain_id, "他在车上吗？", "irrelevant")
+        await agent.run({})
+        assert llm.i == 1
+        add_question(memory, chain_id, "车上有空位吗？", "irrelevant")
+        skipped = await agent.run({})
+        assert llm.i == 1
+        assert skipped["path_similarity"] == memory.local_similarity(chain_id)
+
+        # 本地分数大幅上升时立即重新分析；LLM 回合同样报告本地分数
+        add_question(memory, chain_id, "这个男人是公交车司机吗？")
+        analyzed = await agent.run({})
+        assert llm.i == 2
+        assert analyzed["path_similarity"] == memory.local_similarity(chain_id)
+        assert memory.get_chain(chain_id).metadata["path_similarity"] == 0.5
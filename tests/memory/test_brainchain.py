@@ -304,4 +304,232 @@ class TestBrainChainMemory:
             assert len(set(chain_ids)) == 5  # 确保创建了5个不同的链
             for chain_id in chain_ids:
                 chain = memory.get_chain(chain_id)
-                assert len(chain.nodes) == 1  # 每个链应该有一个节点 
\ No newline at end of file
+                assert len(chain.nodes) == 1  # 每个链应该有一个节点 
+
+class TestRenderCache:
+    """思维链渲染缓存单元测试"""
+
+    def _add(self, memory, chain_id, content):
+        return memory.add_node(
+            content=content,
+            chain_id=chain_id,
+            host_reply=f"{content}的回答",
+            reply_type="yes",
+            notes=""
+        )
+
+    def test_unchanged_chain_is_not_rerendered(self, memory):
+        """未变化的链直接复用缓存片段"""
+        chain_1 = memory.create_chain()
+        chain_2 = memory.create_chain()
+        self._add(memory, chain_1, "问题1")
+        self._add(memory, chain_2, "问题2")
+        first = memory.summarize_brainchains()
+
+        with patch.object(BrainChainMemory, "_render_chain", autospec=True) as render:
+            assert memory.summarize_brainchains() == first
+            render.assert_not_called()
+
+    def test_add_node_only_rerenders_changed_chain(self, memory):
+        """新增节点只重新渲染对应的链"""
+        chain_1 = memory.create_chain()
+        chain_2 = memory.create_chain()
+        self._add(memory, chain_1, "问题1")
+        self._add(memory, chain_2, "问题2")
+        memory.summarize_brainchains()
+
+        self._add(memory, chain_2, "问题3")
+        original = BrainChainMemory._render_chain
+        with patch.object(BrainChainMemory, "_render_chain", autospec=True, side_effect=original) as render:
+            summary = memory.summarize_brainchains()
+            assert [call.args[1] for call in render.call_args_list] == [chain_2]
+        assert "问题3" in summary
+        assert summary == "\n".join(
+            memory._render_chain(chain_id, chain) for chain_id, chain in memory.brainchains.items()
+        )
+
+    def test_metadata_update_invalidates(self, memory):
+        """save_context 写入元数据后摘要随之更新"""
+        chain_id = memory.create_chain()
+        self._add(memory, chain_id, "问题1")
+        assert "相似性分数: 0.0" in memory.summarize_brainchains()
+
+        memory.action_type = "inference"
+        memory.save_context({}, {"output": '{"analysis_note": "方向正确", "path_similarity": 0.6}'})
+        assert "相似性分数: 0.6" in memory.summarize_brainchains()
+
+    def test_direct_chain_mutation_is_detected(self, memory):
+        """绕过 memory 直接向链添加节点也能被检测到"""
+        chain_id = memory.create_chain()
+        self._add(memory, chain_id, "问题1")
+        memory.summarize_brainchains()
+
+        memory.get_chain(chain_id).add_node({
+            "id": "direct-node",
+            "content": "直接添加",
+            "timestamp": 1.0,
+        })
+        assert "直接添加" in memory.summarize_brainchains()
+
+    def test_clear_drops_cache(self, memory):
+        """清空记忆后摘要为空"""
+        chain_id = memory.create_chain()
+        self._add(memory, chain_id, "问题1")
+        memory.summarize_brainchains()
+        memory.clear()
+        assert memory.summarize_brainchains() == ""
+
+
+class TestBrainChainIndex:
+    """思维链父子索引单元测试"""
+
+    @pytest.fixture
+    def chain(self):
+        """构建一棵树: a -> (b -> d, c)，e 为独立根"""
+        chain = BrainChain(chain_id="chain")
+        for i, (node_id, parent_id) in enumerate([
+            ("a", None), ("b", "a"), ("c", "a"), ("d", "b"), ("e", "missing"),
+        ]):
+            chain.add_node({"id": node_id, "content": node_id, "timestamp": float(i), "parent_id": parent_id})
+        return chain
+
+    def test_children_and_leaves(self, chain):
+        """子节点与叶子节点查询"""
+        assert [n.id for n in chain.get_children("a")] == ["b", "c"]
+        assert [n.id for n in chain.get_leaves()] == ["c", "d", "e"]
+        assert chain.root_node_id == "a"
+
+    def test_ancestor_path(self, chain):
+        """祖先路径只包含真实父链"""
+        assert [n.id for n in chain.get_ancestor_path("d")] == ["a", "b", "d"]
+        assert [n.id for n in chain.get_ancestor_path("e")] == ["e"]
+        assert [n.id for n in chain.get_focus_path()] == ["e"]
+        assert chain.get_ancestor_path("unknown") == []
+
+    def test_subtree_and_tree_walk(self, chain):
+        """子树与整树先序遍历"""
+        assert [n.id for n in chain.get_subtree("b")] == ["b", "d"]
+        assert [(depth, n.id) for depth, n in chain.iter_tree()] == [
+            (0, "a"), (1, "b"), (2, "d"), (1, "c"), (0, "e"),
+        ]
+
+    def test_index_rebuilt_after_load(self, chain):
+        """从序列化数据加载后索引可用"""
+        loaded = BrainChain.model_validate(chain.model_dump())
+        assert [n.id for n in loaded.get_subtree("a")] == ["a", "b", "d", "c"]
+
+    def test_summarize_focus_path(self, memory):
+        """焦点分支摘要只包含祖先路径"""
+        chain_id = memory.create_chain()
+        root_id = memory.add_node(content="根问题", chain_id=chain_id, host_reply="是", reply_type="yes", notes="")
+        memory.add_node(content="旁支问题", chain_id=chain_id, parent_id=root_id, host_reply="否", reply_type="no", notes="")
+        memory.add_node(content="焦点问题", chain_id=chain_id, parent_id=root_id, host_reply="是", reply_type="yes", notes="")
+
+        branch = memory.summarize_focus_path(chain_id)
+        assert "根问题" in branch
+        assert "焦点问题" in branch
+        assert "旁支问题" not in branch
+        assert "旁支问题" in memory.summarize_brainchains()
+
+
+class TestContextWindow:
+    """按 token 预算构建思维链上下文"""
+
+    def _fill(self, memory, chain_id, count, prefix):
+        for i in range(count):
+            memory.add_node(
+                content=f"{prefix}问题{i}",
+                chain_id=chain_id,
+                host_reply="不是",
+                reply_type="no",
+                notes=""
+            )
+
+    def test_small_memory_fits_verbatim(self, memory):
+        """预算充足时当前链节点全部原样保留"""
+        chain_id = memory.create_chain()
+        self._fill(memory, chain_id, 3, "当前")
+        window = memory.build_context_window(1000)
+        for i in range(3):
+            assert f"当前问题{i}" in window
+        assert "更早的" not in window
+
+    def test_window_respects_budget(self, memory):
+        """长对局下上下文不超过预算"""
+        from src.utils.token_utils import estimate_tokens
+        for c in range(20):
+            chain_id = memory.create_chain()
+            self._fill(memory, chain_id, 30, f"链{c}")
+        for budget in (50, 200, 800):
+            window = memory.build_context_window(budget)
+            assert estimate_tokens(window) <= budget
+
+    def test_old_nodes_and_cold_chains_are_digested(self, memory):
+        """更早节点与其他链退化为一行摘要"""
+        cold_id = memory.create_chain()
+        self._fill(memory, cold_id, 5, "冷链")
+        chain_id = memory.create_chain()
+        self._fill(memory, chain_id, 20, "当前")
+
+        window = memory.build_context_window(400, recent_nodes=4, prompt_format="full")
+        assert "当前问题19" in window
+        assert "当前问题15" not in window
+        assert "更早的 16 个节点: no×16" in window
+        cold_lines = [line for line in window.splitlines() if cold_id in line]
+        assert len(cold_lines) == 1 and "最近问题: 冷链问题4" in cold_lines[0]
+
+    def test_load_memory_variables_with_budget(self, memory):
+        """传入 context_budget 时 load_memory_variables 使用预算窗口"""
+        chain_id = memory.create_chain()
+        self._fill(memory, chain_id, 3, "当前")
+        budgeted = memory.load_memory_variables({"context_budget": 1000})[memory.memory_key]
+        assert budgeted == memory.build_context_window(1000)
+        assert memory.load_memory_variables({})[memory.memory_key] == memory.summarize_brainchains(memory.prompt_format)
+
+
+class TestCompactPromptFormat:
+    """短别名紧凑序列化"""
+
+    def test_compact_summary_uses_aliases(self, memory):
+        """紧凑格式用短别名代替 UUID，且不包含时间戳"""
+        chain_id = memory.create_chain()
+        root_id = memory.add_node(content="他是司机吗", chain_id=chain_id, host_reply="是的", reply_type="yes", notes="关键")
+        memory.add_node(content="他下班了吗", chain_id=chain_id, parent_id=root_id, host_reply="是的", reply_type="yes", notes="")
+
+        compact = memory.summarize_brainchains("compact")
+        assert chain_id not in compact and root_id not in compact
+        assert "思维链 c1" in compact
+        assert " n1 问:他是司机吗 答:yes 是的 注:关键" in compact
+        assert "  n2<n1 问:他下班了吗" in compact
+        assert "创建时间" not in compact
+        assert memory.resolve_id("c1") == chain_id
+        assert memory.resolve_id(" N1 ") == root_id
+        assert memory.resolve_id("unknown") == "unknown"
+
+    def test_save_context_translates_aliases(self, memory):
+        """StructureAgent 返回的别名在 save_context 中被翻译回真实ID"""
+        chain_id = memory.create_chain()
+        root_id = memory.add_node(content="他是司机吗", chain_id=chain_id, host_reply="是的", reply_type="yes", notes="")
+        memory.create_chain()
+        memory.summarize_brainchains("compact")
+
+        memory.action_type = "creat_add"
+        memory.save_context(
+            {"question": "他在公交车上吗", "host_reply": "是的", "reply_type": "yes"},
+            {"output": '{"structure_type": "old", "chain_id": "c1", "parent_id": "n1"}'}
+        )
+        chain = memory.get_chain(chain_id)
+        assert len(chain.nodes) == 2
+        assert chain.nodes[memory.current_focus_id].parent_id == root_id
+
+    def test_full_and_compact_cached_independently(self, memory):
+        """两种格式的渲染缓存互不干扰"""
+        chain_id = memory.create_chain()
+        memory.add_node(content="问题1", chain_id=chain_id, host_reply="是", reply_type="yes", notes="")
+        full = memory.summarize_brainchains("full")
+        compact = memory.summarize_brainchains("compact")
+        assert full != compact
+        assert memory.summarize_brainchains("full") == full
+        memory.add_node(content="问题2", chain_id=chain_id, host_reply="否", reply_type="no", notes="")
+        assert "问题2" in memory.summarize_brainchains("compact")
+        assert "问题2" in memory.summarize_brainchains("full")
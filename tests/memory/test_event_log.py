@@ -0,0 +1,158 @@
+""" 测试思维链事件日志与快照恢复 """
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.memory.brainchain import BrainChainMemory
+from src.memory.event_log import BrainChainEventLog, build_event_log
+from src.runtime import RuntimeFactory
+from src.context import GameContext, Story
+from src.config import CONTEXT_CONFIG, WORKFLOW_CONFIG
+
+REPLIES = ["yes", "no", "irrelevant"]
+
+
+def play(memory: BrainChainMemory, turns: int, start: int = 0) -> None:
+    """每 4 个问题开一条新链，每 3 个问题更新一次元数据，偶尔回访第一条链"""
+    for i in range(start, start + turns):
+        if i % 4 == 0:
+            memory.create_chain()
+        elif i % 7 == 0:
+            memory.switch_chain(next(iter(memory.brainchains)))
+        chain_id = memory.current_chain_id
+        memory.add_node(
+            content=f"问题{i}", chain_id=chain_id, parent_id=memory.brainchains[chain_id].current_focus_id,
+            host_reply="是的", reply_type=REPLIES[i % 3], notes=""
+        )
+        if i % 3 == 0:
+            memory.update_chain_metadata(chain_id, analysis_note=f"分析{i}", path_similarity=i / 100)
+
+
+def restored(path) -> BrainChainMemory:
+    memory = BrainChainMemory(prompt_format="full")
+    memory.restore_from(BrainChainEventLog(path))
+    return memory
+
+
+class TestEventLog:
+    """追加写入、快照压缩与恢复"""
+
+    def test_replay_restores_memory(self, tmp_path):
+        memory = BrainChainMemory(prompt_format="full")
+        memory.attach_event_log(BrainChainEventLog(tmp_path / "game.jsonl", snapshot_every=1000))
+        play(memory, 20)
+
+        copy = restored(tmp_path / "game.jsonl")
+        assert copy.to_snapshot() == memory.to_snapshot()
+        assert copy.summarize_brainchains() == memory.summarize_brainchains()
+        assert copy.session_stats.to_dict() == memory.session_stats.to_dict()
+
+    def test_snapshot_compacts_log(self, tmp_path):
+        path = tmp_path / "game.jsonl"
+        memory = BrainChainMemory()
+        event_log = BrainChainEventLog(path, snapshot_every=10)
+        memory.attach_event_log(event_log)
+        play(memory, 30)
+
+        # 日志中只剩最近一次快照之后的事件，快照间隔随快照规模增长
+        with open(path, encoding="utf-8") as f:
+            lines = f.readlines()
+        assert event_log.snapshot_seq > 0
+        assert len(lines) == event_log.pending < max(10, event_log.snapshot_seq)
+        assert restored(path).to_snapshot() == memory.to_snapshot()
+
+        # 恢复后继续写入同一个日志
+        copy = BrainChainMemory()
+        copy.restore_from(BrainChainEventLog(path, snapshot_every=10))
+        play(copy, 5, start=30)
+        play(memory, 5, start=30)
+        assert restored(path).to_snapshot()["session_stats"] == memory.to_snapshot()["session_stats"]
+
+    def test_append_cost_does_not_grow(self, tmp_path):
+        path = tmp_path / "game.jsonl"
+        memory = BrainChainMemory()
+        memory.attach_event_log(BrainChainEventLog(path, snapshot_every=10_000))
+        chain_id = memory.create_chain()
+
+        sizes = []
+        for i in range(500):
+            before = path.stat().st_size
+            memory.add_node(content="他是司机吗？", chain_id=chain_id, host_reply="是的", reply_type="yes", notes="")
+            sizes.append(path.stat().st_size - before)
+        assert max(sizes[-10:]) <= max(sizes[:10]) + 4
+
+    def test_torn_tail_and_stale_events_are_skipped(self, tmp_path):
+        path = tmp_path / "game.jsonl"
+        memory = BrainChainMemory()
+        event_log = BrainChainEventLog(path, snapshot_every=1000)
+        memory.attach_event_log(event_log)
+        play(memory, 6)
+        with open(path, encoding="utf-8") as f:
+            events = f.read()
+
+        # 模拟快照写入后、日志截断前崩溃，且最后一行只写了一半
+        event_log.snapshot(memory.to_snapshot())
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(events + '{"seq": 99, "op": "add_')
+        assert restored(path).to_snapshot() == memory.to_snapshot()
+
+    def test_runtime_resumes_brain_chain(self, tmp_path, monkeypatch):
+        monkeypatch.setitem(CONTEXT_CONFIG, "event_log", {"enabled": True, "directory": tmp_path, "snapshot_every": 50})
+        factory = RuntimeFactory(FakeListChatModel(responses=["{}"]))
+
+        def context() -> GameContext:
+            return GameContext(
+                game_id="game_001",
+                story=Story(story_id="story_001", content="一个男人上了公交车……", answer="他是司机")
+            )
+
+        runtime = factory.create_session(context())
+        play(runtime.brain_chain, 8)
+        runtime.event_log.close()
+
+        resumed = factory.create_session(context())
+        assert set(resumed.brain_chain.brainchains) == set(runtime.brain_chain.brainchains)
+        assert "main" in resumed.brain_chain.brainchains
+        assert resumed.brain_chain.current_chain_id == runtime.brain_chain.current_chain_id
+        assert resumed.brain_chain.session_stats.total_nodes == 8
+
+    @pytest.mark.asyncio
+    async def test_sqlite_restart_restores_both_stores(self, tmp_path, monkeypatch):
+        """检查点持久化时即使未启用事件日志，重启后流程图检查点与思维链也一起恢复"""
+        monkeypatch.setitem(CONTEXT_CONFIG, "event_log", {"enabled": False, "directory": tmp_path, "snapshot_every": 50})
+        monkeypatch.setitem(
+            WORKFLOW_CONFIG, "checkpointer", {"backend": "sqlite", "sqlite_path": tmp_path / "checkpoints.sqlite"}
+        )
+
+        def context() -> GameContext:
+            return GameContext(
+                game_id="game_001",
+                story=Story(story_id="story_001", content="一个男人上了公交车……", answer="他是司机")
+            )
+
+        factory = RuntimeFactory(FakeListChatModel(responses=["{}"]))
+        runtime = factory.create_session(context())
+        assert runtime.event_log is not None
+        play(runtime.brain_chain, 8)
+        await runtime.controller.wait_for_player()
+        snapshot = runtime.brain_chain.to_snapshot()
+        runtime.event_log.close()
+        factory.checkpointer.close()
+
+        # 新的工厂相当于重启后的进程
+        factory = RuntimeFactory(FakeListChatModel(responses=["{}"]))
+        resumed = factory.create_session(context())
+        assert resumed.brain_chain.to_snapshot() == snapshot
+        controller = resumed.controller
+        assert resumed.graph.get_state(controller.graph_config).next == ("Get_player_action",)
+        resumed.event_log.close()
+        factory.checkpointer.close()
+
+
+def test_build_event_log(tmp_path):
+    assert build_event_log("game_001", {"enabled": False}) is None
+    event_log = build_event_log("game_001", {"enabled": True, "directory": tmp_path, "snapshot_every": 5})
+    assert event_log.path == tmp_path / "game_001.jsonl"
+    assert event_log.snapshot_every == 5
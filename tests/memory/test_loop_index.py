@@ -0,0 +1,71 @@
+""" 测试 MinHash/LSH 绕圈检测 """
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import time
+from src.memory.brainchain import BrainChainMemory
+from src.memory.loop_index import LoopDetector, MinHashLSH, shingles
+
+
+def add_question(memory: BrainChainMemory, chain_id: str, question: str) -> str:
+    return memory.add_node(
+        content=question, chain_id=chain_id, parent_id=memory.current_focus_id,
+        host_reply="不是", reply_type="no", notes=""
+    )
+
+
+def test_lsh_finds_near_duplicates():
+    index = MinHashLSH()
+    index.add("a", shingles("这个男人是公交车司机吗？"))
+    index.add("b", shingles("房间里有打斗痕迹吗？"))
+
+    matches = index.query(shingles("这个男人是公交车的司机吗"))
+    assert matches[0][0] == "a" and matches[0][1] >= 0.7
+    assert all(key != "b" for key, _ in matches)
+
+
+class TestLoopDetector:
+    """增量索引思维链节点并给出三态判断"""
+
+    def test_repeated_and_new_questions(self):
+        memory = BrainChainMemory()
+        chain_id = memory.create_chain()
+        first = add_question(memory, chain_id, "这个男人是公交车司机吗？")
+        add_question(memory, chain_id, "他下车和时间有关吗？")
+        detector = LoopDetector(memory, loop_threshold=0.7, clear_threshold=0.4)
+
+        repeated = detector.check("这个男人是公交车司机吗")
+        assert repeated.is_looping is True
+        assert repeated.match_node_id == first
+
+        assert detector.check("房间里有打斗痕迹吗？").is_looping is False
+        ambiguous = detector.check("这个男人是司机吗？")
+        assert ambiguous.is_looping is None
+        assert 0.4 <= ambiguous.similarity < 0.7
+
+    def test_excludes_current_node_and_syncs_incrementally(self):
+        """结构分析写入的当前节点不算重复；之后新增的节点被增量索引"""
+        memory = BrainChainMemory()
+        chain_id = memory.create_chain()
+        detector = LoopDetector(memory)
+
+        current = add_question(memory, chain_id, "他是自杀的吗？")
+        assert detector.check("他是自杀的吗？", exclude_node_id=current).is_looping is False
+
+        later = add_question(memory, chain_id, "他是自杀的吗")
+        assert detector.check("他是自杀的吗？", exclude_node_id=later).match_node_id == current
+        assert len(detector.index) == 2
+
+    def test_query_is_fast_with_many_nodes(self):
+        memory = BrainChainMemory()
+        chain_id = memory.create_chain()
+        for i in range(500):
+            add_question(memory, chain_id, f"第{i}个线索和车票编号{i * 7}有关吗？")
+        detector = LoopDetector(memory)
+        detector.sync()
+
+        start = time.perf_counter()
+        for i in range(100):
+            detector.check(f"死者身上有{i}道伤痕吗？")
+        assert (time.perf_counter() - start) / 100 < 0.005
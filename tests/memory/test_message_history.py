@@ -0,0 +1,155 @@
+""" 测试 GameState.messages 的有界消息历史 """
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage
+from src.memory.message_history import HISTORY_SUMMARY_ID, bounded_add_messages, fold_overflow
+from src.agents.summary_agent import SummaryAgent
+from src.workflow import build_graph
+from src.utils.checkpointer import LatestCheckpointSaver
+from src.game_controller import GameController
+from src.context import GameContext, Story
+from src.config import WORKFLOW_CONFIG
+from src.mock_data import (
+    MockReplyAgent,
+    MockStructureAgent,
+    MockAnalysisAgent,
+    MockDetectionAgent,
+    MockStuckDetector,
+    MockHintTool,
+)
+
+
+def hints(count: int, start: int = 0) -> list:
+    return [AIMessage(content=f"提示{i}", id=f"m{i}") for i in range(start, start + count)]
+
+
+class FakeSummaryAgent:
+    """记录调用并返回拼接摘要的 SummaryAgent"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def summarize_messages(self, previous_summary, messages):
+        self.calls.append((previous_summary, [message.content for message in messages]))
+        return previous_summary + "".join(message.content for message in messages)
+
+
+class TestReducer:
+    """合并后按策略截断"""
+
+    def test_last_n(self):
+        reducer = bounded_add_messages("last_n", max_messages=3)
+        merged = reducer(hints(3), hints(2, start=3))
+        assert [message.id for message in merged] == ["m2", "m3", "m4"]
+
+    def test_within_limit_returns_merged(self):
+        reducer = bounded_add_messages("last_n", max_messages=10)
+        assert len(reducer(hints(3), hints(1, start=3))) == 4
+
+    def test_token_budget(self):
+        reducer = bounded_add_messages("token_budget", max_tokens=7)
+        merged = reducer(hints(5), [])
+        # 每条 “提示N” 约 3 个 token
+        assert [message.id for message in merged] == ["m3", "m4"]
+        long = AIMessage(content="很长的提示" * 10, id="long")
+        assert reducer(hints(2), [long]) == [long]
+
+    def test_summary_pinned_first(self):
+        reducer = bounded_add_messages("last_n", max_messages=2)
+        summary = AIMessage(content="摘要", id=HISTORY_SUMMARY_ID)
+        merged = reducer(hints(2), [summary, *hints(2, start=2)])
+        assert [message.id for message in merged] == [HISTORY_SUMMARY_ID, "m2", "m3"]
+
+    def test_remove_and_replace_by_id(self):
+        reducer = bounded_add_messages("last_n", max_messages=5)
+        merged = reducer(hints(3), [RemoveMessage(id="m0"), AIMessage(content="新提示", id="m1")])
+        assert [message.content for message in merged] == ["新提示", "提示2"]
+
+    def test_unknown_policy(self):
+        with pytest.raises(ValueError):
+            bounded_add_messages("keep_all")(hints(1), [])
+
+
+class TestFoldOverflow:
+    """summarize 策略下把溢出消息并入摘要"""
+
+    config = {"policy": "summarize", "max_messages": 3, "summary_max_chars": 100}
+
+    @pytest.mark.asyncio
+    async def test_folds_overflow(self):
+        agent = FakeSummaryAgent()
+        update = await fold_overflow(hints(3), hints(2, start=3), agent, self.config)
+        assert [message.id for message in update if isinstance(message, RemoveMessage)] == ["m0", "m1"]
+        assert update[2].id == HISTORY_SUMMARY_ID and update[2].content == "提示0提示1"
+
+        merged = bounded_add_messages("summarize", max_messages=3)(hints(3), update)
+        assert [message.id for message in merged] == [HISTORY_SUMMARY_ID, "m2", "m3", "m4"]
+
+        # 再次溢出时在已有摘要上继续合并
+        update = await fold_overflow(merged, hints(1, start=5), agent, self.config)
+        assert agent.calls[-1] == ("提示0提示1", ["提示2"])
+
+    @pytest.mark.asyncio
+    async def test_no_overflow_or_other_policy(self):
+        agent = FakeSummaryAgent()
+        new = hints(1, start=3)
+        assert await fold_overflow(hints(2), new, agent, self.config) is new
+        assert await fold_overflow(hints(5), new, agent, {**self.config, "policy": "last_n"}) is new
+        assert await fold_overflow(hints(5), new, None, self.config) is new
+        assert agent.calls == []
+
+    @pytest.mark.asyncio
+    async def test_summary_agent(self):
+        agent = SummaryAgent(llm=FakeListChatModel(responses=["玩家已获得两条提示"]))
+        text = await agent.summarize_messages("", [HumanMessage(content="他是司机吗？"), AIMessage(content="是的")])
+        assert text == "玩家已获得两条提示"
+
+
+def checkpoint_bytes(saver: LatestCheckpointSaver, thread_id: str) -> int:
+    return sum(len(blob) for key, (_, blob) in saver.blobs.items() if key[0] == thread_id)
+
+
+class TestLongGame:
+    """500 回合脚本化对局中每个会话的状态大小保持恒定"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("policy", ["last_n", "summarize"])
+    async def test_state_size_constant(self, monkeypatch, policy):
+        monkeypatch.setitem(WORKFLOW_CONFIG, "message_history", {**WORKFLOW_CONFIG["message_history"], "policy": policy})
+        max_messages = WORKFLOW_CONFIG["message_history"]["max_messages"]
+        saver = LatestCheckpointSaver()
+        context = GameContext(
+            game_id="long_game",
+            story=Story(story_id="test_001", content="一个男人上了公交车……", answer="他是司机")
+        )
+        controller = GameController(
+            reply_agent=MockReplyAgent(),
+            structure_agent=MockStructureAgent(),
+            analysis_agent=MockAnalysisAgent(),
+            detection_agent=MockDetectionAgent(),
+            hint_tool=MockHintTool(),
+            stuck_detector=MockStuckDetector(),
+            context=context,
+            graph=build_graph(checkpointer=saver),
+            summary_agent=FakeSummaryAgent() if policy == "summarize" else None
+        )
+
+        sizes = {}
+        for turn in range(1, 501):
+            if turn % 2:
+                result = await controller.process_question(None, "hint_request")
+            else:
+                result = await controller.process_question(f"问题{turn}", "question")
+            assert len(result["messages"]) <= max_messages + 1
+            if turn in (100, 500):
+                sizes[turn] = checkpoint_bytes(saver, "long_game")
+
+        summary = [message for message in result["messages"] if message.id == HISTORY_SUMMARY_ID]
+        assert len(summary) == (1 if policy == "summarize" else 0)
+        # 250 次提示中只保留最近 max_messages 条
+        assert len(result["messages"]) - len(summary) == max_messages
+        assert sizes[500] <= sizes[100] * 1.05
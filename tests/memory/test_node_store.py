@@ -0,0 +1,68 @@
+""" 测试 NodeStore 紧凑节点存储 """
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import pytest
+from src.memory.brainchain import BrainChain, BrainNode
+from src.memory.node_store import NodeStore
+
+
+@pytest.fixture
+def store():
+    """构建一棵树: a -> (b, c)，d 的父节点不在本链中"""
+    store = NodeStore()
+    store.append("a", "问题a", 1.0, None, "是", "yes", "")
+    store.append("b", "问题b", 2.0, "a", "否", "no", "备注b")
+    store.append("c", "问题c", 3.0, "a", "", "irrelevant", "")
+    store.append("d", "问题d", 4.0, "other-chain-node", "", "irrelevant", "")
+    return store
+
+
+class TestNodeStore:
+    """NodeStore 单元测试"""
+
+    def test_mapping_returns_brainnode_views(self, store):
+        """按ID取值得到 BrainNode 视图"""
+        node = store["b"]
+        assert isinstance(node, BrainNode)
+        assert node.parent_id == "a"
+        assert node.notes == "备注b"
+        assert list(store) == ["a", "b", "c", "d"]
+        assert len(store) == 4
+        assert "c" in store and "x" not in store
+        with pytest.raises(KeyError):
+            store["x"]
+
+    def test_dangling_parent_is_kept(self, store):
+        """父节点不在本链中时按根处理，但保留原始 parent_id"""
+        assert store["d"].parent_id == "other-chain-node"
+        assert [pos for _, pos in store.walk()] == [0, 1, 2, 3]
+        assert store.ancestors(store.position("d")) == [3]
+
+    def test_duplicate_id_rejected(self, store):
+        """重复ID会被拒绝"""
+        with pytest.raises(ValueError):
+            store.append("a", "重复", 5.0)
+
+    def test_leaves_and_children(self, store):
+        """叶子与子节点查询"""
+        assert [store.record(pos).id for pos in store.leaves()] == ["b", "c", "d"]
+        assert [store.record(pos).id for pos in store.children(0)] == ["b", "c"]
+
+    def test_serialization_round_trip(self, store):
+        """通过 BrainChain 序列化与反序列化"""
+        chain = BrainChain(chain_id="chain", nodes=store)
+        data = chain.model_dump()
+        assert data["nodes"]["b"]["content"] == "问题b"
+
+        loaded = BrainChain.model_validate_json(chain.model_dump_json())
+        assert isinstance(loaded.nodes, NodeStore)
+        assert loaded.nodes.to_dict() == store.to_dict()
+        assert [n.id for n in loaded.get_subtree("a")] == ["a", "b", "c"]
+
+    def test_legacy_node_dict_is_accepted(self):
+        """仍然可以用 {id: BrainNode} 字典构建 BrainChain"""
+        node = BrainNode(id="n1", content="问题", timestamp=1.0)
+        chain = BrainChain(nodes={"n1": node})
+        assert chain.nodes["n1"] == node
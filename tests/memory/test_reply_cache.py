@@ -0,0 +1,70 @@
+""" 测试跨会话主持人回复缓存 """
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.memory.reply_cache import ReplyCache, only_filler_differences
+
+
+def reply(text: str = "是的", reply_type: str = "yes") -> dict:
+    return {
+        "current_host_reply": text,
+        "current_reply_type": reply_type,
+        "current_reply_notes": "",
+        "current_reply_invalid": reply_type == "error",
+    }
+
+
+class TestReplyCache:
+    """按故事分区的相似问题匹配与淘汰"""
+
+    def test_similar_question_hits_within_story(self):
+        """相似问题命中同一故事的缓存，其他故事与否定问题不命中"""
+        cache = ReplyCache(similarity_threshold=0.85)
+        assert cache.store("story_001", "这个男人是公交车司机吗？", reply())
+
+        assert cache.lookup("story_001", "那个男人是公交车司机吗")["current_host_reply"] == "是的"
+        assert cache.lookup("story_002", "这个男人是公交车司机吗？") is None
+        assert cache.lookup("story_001", "这个男人不是公交车司机吗？") is None
+        assert cache.lookup("story_001", "他死了吗？") is None
+
+        row = cache.report()[0]
+        assert (row["hits"], row["misses"]) == (1, 2)
+        assert "命中率" in cache.format_report()
+
+    def test_minimal_pairs_do_not_hit(self):
+        """字面相似但实词不同的问题不能复用回复（两组余弦相似度都在 0.85 以上）"""
+        cache = ReplyCache(similarity_threshold=0.85)
+        cache.store("s", "那个男人上车的时候他妻子死了吗", reply())
+        cache.store("s", "那个男人是在晚上十点钟回到家里的吗", reply("不是", "no"))
+
+        assert cache.lookup("s", "那个男人上车的时候他儿子死了吗") is None
+        assert cache.lookup("s", "那个男人是在晚上九点钟回到家里的吗") is None
+        assert cache.lookup("s", "请问那个男人上车的时候他妻子死了吗")["current_host_reply"] == "是的"
+
+    def test_only_filler_differences(self):
+        assert only_filler_differences("这个男人是司机", "那个男人是司机")
+        assert only_filler_differences("请问他死了", "他死")
+        assert not only_filler_differences("他妻子死了", "他儿子死了")
+        assert not only_filler_differences("十点", "九点")
+
+    def test_invalid_replies_are_not_cached(self):
+        cache = ReplyCache()
+        assert not cache.store("story_001", "他怎么死的？", reply("请重新提问", "error"))
+        assert cache.lookup("story_001", "他怎么死的？") is None
+
+    def test_lru_and_ttl_eviction(self):
+        """超过容量淘汰最久未用的条目，过期条目不再命中"""
+        now = [0.0]
+        cache = ReplyCache(max_entries_per_story=2, ttl_seconds=10, clock=lambda: now[0])
+        cache.store("s", "他是司机吗", reply())
+        cache.store("s", "他下班了吗", reply("不是", "no"))
+        cache.lookup("s", "他是司机吗")
+        cache.store("s", "车上有人吗", reply("无关", "irrelevant"))
+
+        assert cache.lookup("s", "他下班了吗") is None
+        assert cache.lookup("s", "他是司机吗") is not None
+
+        now[0] = 11.0
+        assert cache.lookup("s", "车上有人吗") is None
+        assert cache.report()[0]["evictions"] == 3
@@ -0,0 +1,121 @@
+""" 测试会话统计与卡住检测门控 """
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import pytest
+from src.memory.brainchain import BrainChainMemory
+from src.tools.detection_tools import StuckGate
+from src.workflow import build_graph
+from src.state_schema import GameState
+from src.mock_data import MockStuckDetector
+
+
+def ask(memory: BrainChainMemory, reply_type: str, new_chain: bool = False) -> str:
+    chain_id = memory.create_chain() if new_chain else memory.current_chain_id
+    parent_id = None if new_chain else memory.current_focus_id
+    return memory.add_node(
+        content="他是司机吗？", chain_id=chain_id, parent_id=parent_id,
+        host_reply="", reply_type=reply_type, notes=""
+    )
+
+
+class TestSessionStats:
+    """add_node 流式更新统计"""
+
+    def test_counters_follow_add_node(self):
+        memory = BrainChainMemory()
+        ask(memory, "yes", new_chain=True)
+        ask(memory, "irrelevant")
+        ask(memory, "irrelevant")
+        stats = memory.session_stats
+
+        assert stats.total_nodes == 3
+        assert stats.chain_count == 1
+        assert stats.consecutive_irrelevant == 2
+        assert stats.turns_since_new_chain == 2
+        assert stats.recent_yes_ratio == pytest.approx(1 / 3)
+
+        ask(memory, "no", new_chain=True)
+        assert stats.consecutive_irrelevant == 0
+        assert stats.turns_since_new_chain == 0
+        assert stats.chain_count == 2
+
+    def test_window_and_clear(self):
+        memory = BrainChainMemory()
+        ask(memory, "yes", new_chain=True)
+        for _ in range(memory.session_stats.window):
+            ask(memory, "no")
+        assert memory.session_stats.recent_yes_ratio == 0.0
+
+        memory.clear()
+        assert memory.session_stats.total_nodes == 0
+
+
+class TestStuckGate:
+    """本地打分的三态判断"""
+
+    def test_few_turns_not_stuck(self):
+        memory = BrainChainMemory()
+        ask(memory, "irrelevant", new_chain=True)
+        gate = StuckGate(memory)
+        assert gate.check().is_stuck is False
+
+    def test_progressing_not_stuck(self):
+        memory = BrainChainMemory()
+        ask(memory, "yes", new_chain=True)
+        for reply_type in ("no", "yes", "yes", "no"):
+            ask(memory, reply_type)
+        assert StuckGate(memory).check().is_stuck is False
+
+    def test_irrelevant_streak_stuck(self):
+        memory = BrainChainMemory()
+        ask(memory, "no", new_chain=True)
+        for _ in range(7):
+            ask(memory, "irrelevant")
+        verdict = StuckGate(memory).check()
+        assert verdict.is_stuck is True
+        assert verdict.score >= 0.75
+
+    def test_gray_zone_defers_to_llm(self):
+        memory = BrainChainMemory()
+        ask(memory, "no", new_chain=True)
+        for _ in range(4):
+            ask(memory, "no")
+        gate = StuckGate(memory)
+        assert gate.check().is_stuck is None
+        assert gate.stats == {
+            "llm_calls": 1, "short_circuit_stuck": 0,
+            "short_circuit_not_stuck": 0, "llm_calls_saved": 0,
+        }
+
+
+class TestDetectStuckNode:
+    """detect_stuck 节点只在灰区调用 stuck_detector"""
+
+    @pytest.mark.asyncio
+    async def test_gate_short_circuits_detector(self):
+        calls = []
+
+        class CountingStuckDetector(MockStuckDetector):
+            async def run(self, state):
+                calls.append(state)
+                return {"is_stuck": True}
+
+        memory = BrainChainMemory()
+        ask(memory, "yes", new_chain=True)
+        gate = StuckGate(memory)
+        graph = build_graph(stuck_detector=CountingStuckDetector(), stuck_gate=gate)
+        state = GameState(player_action="question", current_question="他是司机吗？").model_dump()
+
+        result = await graph.ainvoke(state)
+        assert result["is_stuck"] is False
+        assert calls == []
+        assert gate.stats["llm_calls_saved"] == 1
+
+        for _ in range(4):
+            ask(memory, "no")
+        result = await graph.ainvoke(state)
+        assert result["is_stuck"] is True
+        assert len(calls) == 1
+        assert gate.stats["llm_calls"] == 1
@@ -0,0 +1,116 @@
+""" 测试 GameState 历史的差分存储 """
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import json
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from src.memory.state_history import StateHistory, dump_state
+from src.state_schema import GameState
+from src.context import GameContext, Story
+
+
+def make_states(turns: int):
+    """模拟一局游戏：消息逐回合累积，其余字段部分变化"""
+    states, messages = [], []
+    for i in range(turns):
+        messages = messages + [HumanMessage(content=f"问题{i}"), AIMessage(content="是的")]
+        states.append(GameState(
+            player_action="question" if i % 5 else "hint_request",
+            game_id="game_001",
+            messages=messages,
+            current_question=f"问题{i}",
+            current_host_reply="是的",
+            current_reply_type="yes",
+            detection_result={"path_similarity": i / 100, "is_deviated": False},
+            hint_type="direction" if i % 5 == 0 else None,
+        ))
+    return states
+
+
+def fill(states, keyframe_every: int = 4) -> StateHistory:
+    history = StateHistory(keyframe_every=keyframe_every)
+    for state in states:
+        history.append(state)
+    return history
+
+
+class TestStateHistory:
+    """关键帧 + 差分"""
+
+    def test_random_access_reconstructs_every_turn(self):
+        states = make_states(11)
+        history = fill(states)
+        assert len(history) == 11
+        for i in (0, 3, 4, 5, 10, -1):
+            assert history[i] == states[i]
+        assert isinstance(history[7].messages[0], HumanMessage)
+        assert history[2:4] == states[2:4]
+        with pytest.raises(IndexError):
+            history[11]
+
+    def test_iteration_streams_states(self):
+        states = make_states(9)
+        assert list(fill(states)) == states
+
+    def test_diffs_only_store_changes(self):
+        states = make_states(8)
+        history = fill(states, keyframe_every=8)
+        diff = history.to_dict()["entries"][5]["diff"]
+        # 消息只保存本回合新增的两条，未变化的字段不出现
+        assert len(diff["extend"]["messages"]) == 2
+        assert "current_host_reply" not in diff["set"]
+        assert "detection_result" in diff["set"]
+
+        full_size = len(json.dumps([dump_state(s) for s in make_states(64)]))
+        delta_size = len(json.dumps(fill(make_states(64), keyframe_every=16).to_dict()))
+        assert delta_size < full_size / 3
+
+    def test_reconstructed_states_are_independent(self):
+        history = fill(make_states(3))
+        state = history[2]
+        state.detection_result["path_similarity"] = 1.0
+        state.messages.append(HumanMessage(content="额外"))
+        assert history[2].detection_result["path_similarity"] == 0.02
+        assert len(history[2].messages) == 6
+
+
+class TestGameContextHistory:
+    """GameContext 存档"""
+
+    def make_context(self) -> GameContext:
+        return GameContext(
+            game_id="game_001",
+            story=Story(story_id="story_001", content="一个男人上了公交车……", answer="他是司机")
+        )
+
+    def test_save_and_load_round_trip(self, tmp_path):
+        context = self.make_context()
+        states = make_states(20)
+        for state in states:
+            context.update_from_state(state)
+        assert context.current_round == 20
+        assert context.hint_count == 4
+
+        path = tmp_path / "game_001.json"
+        context.save_to_file(str(path))
+        loaded = GameContext.load_from_file(str(path))
+        assert len(loaded.state_history) == 20
+        assert list(loaded.state_history) == states
+
+        # 加载后继续记录，差分基于最后一回合
+        loaded.update_from_state(states[-1])
+        assert loaded.state_history[-1] == states[-1]
+        assert "set" not in loaded.state_history.to_dict()["entries"][-1]["diff"]
+
+    def test_legacy_full_state_list(self):
+        states = make_states(3)
+        context = GameContext(
+            game_id="game_001",
+            story=Story(story_id="story_001", content="……", answer="……"),
+            state_history=[s.model_dump(mode="json") for s in states]
+        )
+        assert isinstance(context.state_history, StateHistory)
+        assert [s.current_question for s in context.state_history] == [s.current_question for s in states]
+        assert len(context.state_history[-1].messages) == 6
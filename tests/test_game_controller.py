@@ -0,0 +1,223 @@
+""" 测试 GameController 回复优先模式 """
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+
+import json
+import time
+import asyncio
+import tracemalloc
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.game_controller import GameController
+from src.workflow import PLAYER_ACTION_PROMPT, build_graph, build_workflow_nodes, session_config
+from src.utils.checkpointer import LatestCheckpointSaver
+from src.agents.reply_agent import ReplyAgent
+from src.memory.brainchain import BrainChainMemory
+from src.context import GameContext, Story
+from src.mock_data import (
+    MockReplyAgent,
+    MockStructureAgent,
+    MockAnalysisAgent,
+    MockDetectionAgent,
+    MockStuckDetector,
+    MockHintTool,
+)
+
+
+def delayed(mock_cls, latency: float, log: list = None, name: str = ""):
+    class Delayed(mock_cls):
+        async def run(self, state):
+            await asyncio.sleep(latency)
+            if log is not None:
+                log.append(name)
+            return await super().run(state)
+    return Delayed()
+
+
+def build_controller(log: list, reply_agent=None, graph=None) -> GameController:
+    context = GameContext(
+        game_id="test_001",
+        story=Story(story_id="test_001", content="一个男人上了公交车……", answer="他是司机")
+    )
+    return GameController(
+        reply_agent=reply_agent or delayed(MockReplyAgent, 0.01, log, "reply"),
+        structure_agent=delayed(MockStructureAgent, 0.05, log, "structure"),
+        analysis_agent=delayed(MockAnalysisAgent, 0.3, log, "analysis"),
+        detection_agent=delayed(MockDetectionAgent, 0.3, log, "detection"),
+        hint_tool=MockHintTool(),
+        stuck_detector=delayed(MockStuckDetector, 0.3, log, "stuck"),
+        context=context,
+        graph=graph
+    )
+
+
+class TestReplyFirst:
+    """回复优先模式"""
+
+    @pytest.mark.asyncio
+    async def test_reply_returned_before_bookkeeping(self):
+        """回复生成后立即返回，其余节点在后台完成"""
+        log = []
+        controller = build_controller(log)
+
+        start = time.perf_counter()
+        result = await controller.process_question("他是司机吗？", reply_first=True)
+        assert time.perf_counter() - start < 0.2
+        assert result["current_host_reply"]
+        assert result["detection_result"] is None
+        assert log == ["reply"]
+
+        final = await controller.wait_pending()
+        assert final["detection_result"]["path_similarity"] == 0.8
+        assert {"structure", "analysis", "detection", "stuck"} <= set(log)
+
+    @pytest.mark.asyncio
+    async def test_next_turn_waits_only_for_memory_writes(self):
+        """下一回合只等待上一回合的结构分析，而不等待分析与检测"""
+        log = []
+        controller = build_controller(log)
+
+        await controller.process_question("他是司机吗？", reply_first=True)
+        await controller.process_question("他下班了吗？", reply_first=True)
+        assert log.index("structure") < log.index("reply", 1)
+        assert "analysis" not in log[:log.index("reply", 1)]
+        await controller.wait_pending()
+        # 等待最后一个回合的同时，上一回合的后台任务也已结束
+        await asyncio.sleep(0.35)
+
+    @pytest.mark.asyncio
+    async def test_checkpointed_turns_wait_for_bookkeeping(self):
+        """带检查点时同一 thread_id 串行：下一回合要等上一回合的分析与检测全部结束"""
+        log = []
+        controller = build_controller(log, graph=build_graph(checkpointer=LatestCheckpointSaver()))
+        assert controller.checkpointed
+
+        await controller.process_question("他是司机吗？", reply_first=True)
+        await controller.process_question("他下班了吗？", reply_first=True)
+        second_reply = log.index("reply", 1)
+        assert {"analysis", "detection", "stuck"} <= set(log[:second_reply])
+        await controller.wait_pending()
+
+    @pytest.mark.asyncio
+    async def test_submit_action_waits_for_pending_turn(self):
+        """submit_action 同样要等后台回合结束，不能与同一 thread_id 上的运行重叠"""
+        log = []
+        controller = build_controller(log, graph=build_graph(checkpointer=LatestCheckpointSaver()))
+
+        await controller.process_question("他是司机吗？", reply_first=True)
+        assert not controller.pending.done
+        await controller.submit_action("question", "他下班了吗？")
+        assert controller.pending.done
+        # 重叠运行会让分析与检测节点在同一检查点上再跑一遍
+        assert sorted(log) == ["analysis", "detection", "reply", "structure", "stuck"]
+
+    @pytest.mark.asyncio
+    async def test_blocking_mode_runs_whole_graph(self):
+        """默认模式仍然等待整个图执行完毕"""
+        controller = build_controller([])
+        result = await controller.process_question("他是司机吗？", reply_first=False)
+        assert result["detection_result"]["path_similarity"] == 0.8
+        assert controller.pending is None
+
+
+class TestStreaming:
+    """主持人回复的逐段推送"""
+
+    @pytest.mark.asyncio
+    async def test_host_reply_tokens_arrive_before_results(self):
+        """host_reply 逐字推送，结构化结果事件在回复之后到达"""
+        reply = {"host_reply": "是的，他是司机。", "reply_type": "yes", "notes": "与谜底一致"}
+        # FakeListChatModel 流式调用时逐字符输出
+        llm = FakeListChatModel(responses=[json.dumps(reply, ensure_ascii=False)])
+        controller = build_controller([], ReplyAgent(llm=llm, memory=BrainChainMemory()))
+
+        events = [event async for event in controller.stream_question("他是司机吗？")]
+        kinds = [event["event"] for event in events]
+
+        tokens = [event["data"] for event in events if event["event"] == "token"]
+        assert len(tokens) > 1
+        assert "".join(tokens) == reply["host_reply"]
+
+        nodes = [event.get("node") for event in events]
+        first_token = kinds.index("token")
+        assert first_token < nodes.index("reply_generation") < nodes.index("structure_analysis")
+        reply_update = next(e for e in events if e.get("node") == "reply_generation")["data"]
+        assert reply_update["current_host_reply"] == reply["host_reply"]
+        assert reply_update["current_reply_type"] == "yes"
+
+        assert kinds[-1] == "result"
+        final = events[-1]["data"]
+        assert final["current_host_reply"] == reply["host_reply"]
+        assert final["detection_result"]["path_similarity"] == 0.8
+
+
+def build_checkpointed_controller(graph, game_id: str = "test_001") -> GameController:
+    context = GameContext(
+        game_id=game_id,
+        story=Story(story_id="test_001", content="一个男人上了公交车……", answer="他是司机")
+    )
+    return GameController(
+        reply_agent=MockReplyAgent(),
+        structure_agent=MockStructureAgent(),
+        analysis_agent=MockAnalysisAgent(),
+        detection_agent=MockDetectionAgent(),
+        hint_tool=MockHintTool(),
+        stuck_detector=MockStuckDetector(),
+        context=context,
+        graph=graph
+    )
+
+
+class TestPlayerInterrupt:
+    """等待玩家输入时以 interrupt 挂起会话"""
+
+    @pytest.mark.asyncio
+    async def test_wait_and_submit(self):
+        graph = build_graph(checkpointer=LatestCheckpointSaver())
+        controller = build_checkpointed_controller(graph)
+
+        prompt = await controller.wait_for_player()
+        assert prompt == {"prompt": PLAYER_ACTION_PROMPT}
+        assert graph.get_state(controller.graph_config).next == ("Get_player_action",)
+
+        result = await controller.submit_action("question", "他是司机吗？")
+        assert result["current_host_reply"]
+        assert result["current_question"] == "他是司机吗？"
+        assert graph.get_state(controller.graph_config).next == ()
+
+    @pytest.mark.asyncio
+    async def test_requires_checkpointer(self):
+        controller = build_controller([])
+        with pytest.raises(ValueError):
+            await controller.wait_for_player()
+        with pytest.raises(ValueError):
+            await controller.submit_action("question", "他是司机吗？")
+
+    @pytest.mark.asyncio
+    async def test_idle_sessions_hold_no_tasks(self):
+        """10k 个等待输入的会话只是检查点记录：不占协程，内存随会话数线性且有界"""
+        saver = LatestCheckpointSaver()
+        graph = build_graph(checkpointer=saver)
+        nodes = build_workflow_nodes()
+        tasks_before = len(asyncio.all_tasks())
+
+        for i in range(10_000):
+            await graph.ainvoke({"player_action": "None"}, session_config(nodes, f"s{i}"))
+        assert saver.thread_count == 10_000
+        assert len(asyncio.all_tasks()) == tasks_before
+
+        # 再挂起一批会话，估算每个会话常驻的内存
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        for i in range(200):
+            await graph.ainvoke({"player_action": "None"}, session_config(nodes, f"extra{i}"))
+        per_session = (tracemalloc.get_traced_memory()[0] - start) / 200
+        tracemalloc.stop()
+        assert per_session < 16 * 1024
+
+        # 任意会话都可以按 thread_id 恢复，由新的控制器接管
+        controller = build_checkpointed_controller(graph, game_id="s4242")
+        result = await controller.submit_action("question", "他是司机吗？")
+        assert result["current_host_reply"]
+        assert saver.thread_count == 10_200
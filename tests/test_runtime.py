@@ -0,0 +1,129 @@
+""" 测试进程级运行时工厂与共享流程图 """
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+import gc
+from src.runtime import GameRuntime, RuntimeFactory, get_runtime_factory, clear_runtime_factories
+from src.runtime import _factories
+from src.config import LLM_CONFIG
+from src.game_controller import GameController
+from src.workflow import build_graph
+from src.context import GameContext, Story
+from src.mock_data import (
+    MockReplyAgent,
+    MockStructureAgent,
+    MockAnalysisAgent,
+    MockDetectionAgent,
+    MockStuckDetector,
+    MockHintTool,
+)
+
+
+def make_context(game_id: str) -> GameContext:
+    return GameContext(
+        game_id=game_id,
+        story=Story(story_id="story_001", content="一个男人上了公交车……", answer="他是司机")
+    )
+
+
+def fixed_reply(text: str):
+    class FixedReply(MockReplyAgent):
+        async def run(self, state):
+            result = await super().run(state)
+            result["current_host_reply"] = text
+            return result
+    return FixedReply()
+
+
+class TestSharedGraph:
+    """同一个编译好的图按 config 注入的依赖服务不同会话"""
+
+    @pytest.mark.asyncio
+    async def test_sessions_use_their_own_dependencies(self):
+        graph = build_graph()
+        controllers = [
+            GameController(
+                reply_agent=fixed_reply(text),
+                structure_agent=MockStructureAgent(),
+                analysis_agent=MockAnalysisAgent(),
+                detection_agent=MockDetectionAgent(),
+                hint_tool=MockHintTool(),
+                stuck_detector=MockStuckDetector(),
+                context=make_context(text),
+                graph=graph
+            )
+            for text in ("会话一", "会话二")
+        ]
+        assert controllers[0].graph is controllers[1].graph
+
+        results = [await c.process_question("他是司机吗？", reply_first=False) for c in controllers]
+        assert [r["current_host_reply"] for r in results] == ["会话一", "会话二"]
+
+
+class TestRuntimeFactory:
+    """共享组件只构建一次，会话之间记忆独立"""
+
+    def test_sessions_share_pipelines_and_graph(self):
+        llm = FakeListChatModel(responses=["{}"])
+        factory = get_runtime_factory(llm)
+        assert get_runtime_factory(llm) is factory
+
+        first = GameRuntime(llm=llm, context=make_context("g1"))
+        second = factory.create_session(make_context("g2"))
+
+        assert first.factory is second.factory is factory
+        assert first.graph is second.graph is factory.graph
+        assert first.reply_agent.chain is second.reply_agent.chain is factory.reply_chain
+        assert first.hint_tool is second.hint_tool
+
+        assert first.brain_chain is not second.brain_chain
+        assert first.stuck_detector.memory is first.brain_chain
+        assert second.stuck_detector.memory is second.brain_chain
+        assert factory.stuck_detector.memory is None
+
+    def test_metrics_separate_session_and_process(self):
+        llm = FakeListChatModel(responses=["{}"])
+        factory = get_runtime_factory(llm)
+        first = factory.create_session(make_context("g1"))
+        second = factory.create_session(make_context("g2"))
+
+        # 响应缓存是进程级的，两个会话看到同一份统计；卡住检测门控按会话统计
+        assert first.metrics["process"] == second.metrics["process"]
+        assert first.llm_cache is second.llm_cache
+        if first.stuck_gate is not None:
+            assert first.stuck_gate is not second.stuck_gate
+        assert set(first.metrics) == {"session", "process"}
+
+    def test_new_model_gets_new_factory(self):
+        first = get_runtime_factory(FakeListChatModel(responses=["{}"]))
+        second = get_runtime_factory(FakeListChatModel(responses=["{}"]))
+        assert isinstance(first, RuntimeFactory) and first is not second
+
+    def test_factory_does_not_mutate_caller_model(self, monkeypatch):
+        """工厂在模型副本上挂缓存；默认只有温度为 0 时才启用缓存"""
+        llm = FakeListChatModel(responses=["{}"])
+        factory = RuntimeFactory(llm)
+        assert factory.llm is not llm and llm.cache is None
+        assert factory.llm_cache is None  # 默认温度 0.7
+
+        monkeypatch.setitem(LLM_CONFIG, "temperature", 0)
+        factory = RuntimeFactory(llm)
+        assert factory.llm_cache is not None and factory.llm.cache is factory.llm_cache
+        assert llm.cache is None
+
+    def test_factories_released_with_model(self):
+        llm = FakeListChatModel(responses=["{}"])
+        get_runtime_factory(llm)
+        key = id(llm)
+        assert key in _factories
+        del llm
+        gc.collect()
+        assert key not in _factories
+
+        kept = FakeListChatModel(responses=["{}"])
+        factory = get_runtime_factory(kept)
+        clear_runtime_factories()
+        assert get_runtime_factory(kept) is not factory
@@ -0,0 +1,179 @@
+""" 测试工作流图的检测拓扑 """
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+
+import time
+import asyncio
+import pytest
+from src.workflow import build_graph
+from src.state_schema import GameState
+from src.context import GameContext, Story
+from src.memory.reply_cache import ReplyCache
+from src.mock_data import (
+    MockReplyAgent,
+    MockAnalysisAgent,
+    MockDetectionAgent,
+    MockStuckDetector,
+    MockFusedTurnAgent,
+)
+
+
+def recording(mock_cls, spans: dict, name: str, latency: float = 0.05):
+    """记录每个分支的执行区间"""
+    class Recording(mock_cls):
+        async def run(self, state):
+            start = time.perf_counter()
+            await asyncio.sleep(latency)
+            spans[name] = (start, time.perf_counter())
+            return await super().run(state)
+    return Recording()
+
+
+def build(spans: dict, topology: str):
+    return build_graph(
+        analysis_agent=recording(MockAnalysisAgent, spans, "analysis"),
+        detection_agent=recording(MockDetectionAgent, spans, "detection"),
+        stuck_detector=recording(MockStuckDetector, spans, "detect_stuck"),
+        detection_topology=topology,
+    )
+
+
+def question_state() -> dict:
+    return GameState(player_action="question", current_question="他是司机吗？").model_dump()
+
+
+class TestDetectionTopology:
+    """analysis / detection / detect_stuck 的执行拓扑"""
+
+    @pytest.mark.asyncio
+    async def test_parallel_branches_overlap_and_join(self):
+        """并发拓扑下三个分支同时运行，汇合节点拿到全部结果"""
+        spans = {}
+        result = await build(spans, "parallel").ainvoke(question_state())
+
+        assert set(spans) == {"analysis", "detection", "detect_stuck"}
+        latest_start = max(start for start, _ in spans.values())
+        earliest_end = min(end for _, end in spans.values())
+        assert latest_start < earliest_end
+
+        detection = result["detection_result"]
+        assert detection["path_similarity"] == 0.8
+        assert detection["hint_text"] == "测试提示信息 💡"
+        assert detection["is_stuck"] is False
+
+    @pytest.mark.asyncio
+    async def test_sequential_branches_do_not_overlap(self):
+        """顺序拓扑下分支依次执行，结果一致"""
+        spans = {}
+        result = await build(spans, "sequential").ainvoke(question_state())
+
+        ordered = [spans[name] for name in ("analysis", "detection", "detect_stuck")]
+        for (_, prev_end), (next_start, _) in zip(ordered, ordered[1:]):
+            assert prev_end <= next_start
+        assert result["detection_result"]["path_similarity"] == 0.8
+
+
+class TestFusedTurnMode:
+    """fused 模式下 fused_turn 替代 reply / structure / analysis，校验失败时回退"""
+
+    def build(self, spans: dict, valid: bool, topology: str):
+        class Fused(MockFusedTurnAgent):
+            async def run(self, state):
+                spans["fused"] = None
+                return await super().run(state) if valid else {"valid": False}
+
+        return build_graph(
+            reply_agent=recording(MockReplyAgent, spans, "reply", latency=0),
+            analysis_agent=recording(MockAnalysisAgent, spans, "analysis", latency=0),
+            detection_agent=recording(MockDetectionAgent, spans, "detection", latency=0),
+            stuck_detector=recording(MockStuckDetector, spans, "detect_stuck", latency=0),
+            fused_agent=Fused(),
+            detection_topology=topology,
+            turn_mode="fused",
+        )
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("topology", ["parallel", "sequential"])
+    async def test_valid_output_skips_multi_agent_path(self, topology):
+        """通过校验时不再调用回复与分析 Agent"""
+        spans = {}
+        result = await self.build(spans, True, topology).ainvoke(question_state())
+
+        assert set(spans) == {"fused", "detection", "detect_stuck"}
+        assert result["fused_turn_valid"] is True
+        assert result["current_node_id"] == "test_node_001"
+        assert result["detection_result"]["path_similarity"] == 0.8
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("topology", ["parallel", "sequential"])
+    async def test_invalid_output_falls_back(self, topology):
+        """校验失败时回退到多 Agent 路径"""
+        spans = {}
+        result = await self.build(spans, False, topology).ainvoke(question_state())
+
+        assert set(spans) == {"fused", "reply", "analysis", "detection", "detect_stuck"}
+        assert result["fused_turn_valid"] is False
+        assert result["detection_result"]["path_similarity"] == 0.8
+
+
+class TestReplyCache:
+    """reply_generation 先查同一故事的回复缓存"""
+
+    @pytest.mark.asyncio
+    async def test_cached_reply_skips_reply_agent(self):
+        spans = {}
+        context = GameContext(
+            game_id="test_001",
+            story=Story(story_id="story_001", content="一个男人上了公交车……", answer="他是司机")
+        )
+        cache = ReplyCache()
+        graph = build_graph(
+            reply_agent=recording(MockReplyAgent, spans, "reply", latency=0),
+            context=context,
+            reply_cache=cache,
+        )
+
+        first = await graph.ainvoke(question_state())
+        assert "reply" in spans
+        spans.clear()
+        second = await graph.ainvoke(
+            GameState(player_action="question", current_question="他是司机么").model_dump()
+        )
+
+        assert "reply" not in spans
+        assert second["current_host_reply"] == first["current_host_reply"]
+        assert cache.report()[0]["hits"] == 1
+
+
+class TestOpenQuestionFastPath:
+    """本地规则拦截开放式问题"""
+
+    @pytest.mark.asyncio
+    async def test_open_question_ends_turn_without_agents(self):
+        spans = {}
+        graph = build_graph(
+            reply_agent=recording(MockReplyAgent, spans, "reply", latency=0),
+            analysis_agent=recording(MockAnalysisAgent, spans, "analysis", latency=0),
+            open_question_fast_path=True,
+        )
+        result = await graph.ainvoke(
+            GameState(player_action="question", current_question="他为什么要下车？").model_dump()
+        )
+
+        assert spans == {}
+        assert result["current_reply_type"] == "error"
+        assert result["current_reply_invalid"] is True
+        assert result["detection_result"] is None
+
+    @pytest.mark.asyncio
+    async def test_closed_question_reaches_reply_agent(self):
+        spans = {}
+        graph = build_graph(
+            reply_agent=recording(MockReplyAgent, spans, "reply", latency=0),
+            open_question_fast_path=True,
+        )
+        result = await graph.ainvoke(question_state())
+
+        assert "reply" in spans
+        assert result["detection_result"]["path_similarity"] == 0.8
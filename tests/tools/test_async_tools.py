@@ -0,0 +1,113 @@
+""" 测试 DetectStuckTool / HintGenerator 的异步调用不阻塞事件循环 """
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import time
+import asyncio
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from src.context import GameContext, Story
+from src.tools.hint_generator import HintGenerator
+from src.tools.detection_tools import DetectStuckTool
+
+HINT_JSON = '{"hint_text": "问问他的职业", "confidence": 0.8, "hint_type": "default"}'
+STUCK_JSON = '{"is_stuck": true, "confidence": 0.9, "reasoning": "连续无关"}'
+
+
+class SlowChatModel(BaseChatModel):
+    """固定回复、只有同步实现的慢模型"""
+    reply: str
+    delay: float = 0.3
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-fake"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+
+class SlowAsyncChatModel(SlowChatModel):
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+
+def make_context() -> GameContext:
+    return GameContext(
+        game_id="g1",
+        story=Story(story_id="story_001", content="一个男人上了公交车……", answer="他是司机")
+    )
+
+
+async def other_session(ticks: list, count: int = 5, interval: float = 0.02) -> None:
+    """另一个会话：在慢提示生成期间持续推进"""
+    for _ in range(count):
+        await asyncio.sleep(interval)
+        ticks.append(time.perf_counter())
+
+
+class TestHintGenerator:
+    """提示生成期间其它会话继续推进"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("model_cls", [SlowAsyncChatModel, SlowChatModel])
+    async def test_concurrent_sessions_progress_during_slow_hint(self, model_cls):
+        generator = HintGenerator(llm=model_cls(reply=HINT_JSON, delay=0.3))
+        ticks = []
+        start = time.perf_counter()
+        hint, _ = await asyncio.gather(
+            generator.agenerate("default", make_context(), current_question="他是谁？"),
+            other_session(ticks)
+        )
+        hint_done = time.perf_counter()
+
+        assert hint["hint_text"] == "问问他的职业"
+        assert len(ticks) == 5
+        # 另一个会话在提示返回之前就已经全部完成
+        assert ticks[-1] - start < 0.25 < hint_done - start
+
+    @pytest.mark.asyncio
+    async def test_timeout(self):
+        generator = HintGenerator(llm=SlowAsyncChatModel(reply=HINT_JSON, delay=1.0), timeout=0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            await generator.agenerate("default", make_context())
+
+    @pytest.mark.asyncio
+    async def test_cancellation(self):
+        generator = HintGenerator(llm=SlowAsyncChatModel(reply=HINT_JSON, delay=1.0))
+        task = asyncio.create_task(generator.agenerate("default", make_context()))
+        await asyncio.sleep(0.05)
+        started = time.perf_counter()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert time.perf_counter() - started < 0.5
+
+
+class TestDetectStuckTool:
+    """卡住检测的异步路径"""
+
+    @pytest.mark.asyncio
+    async def test_arun_parses_result(self):
+        tool = DetectStuckTool(llm=SlowAsyncChatModel(reply=STUCK_JSON, delay=0.01))
+        result = await tool.arun({"current_question": "他是谁？", "current_brainchain": "链"})
+        assert result["is_stuck"] is True
+
+    @pytest.mark.asyncio
+    async def test_timeout_falls_back(self):
+        tool = DetectStuckTool(llm=SlowAsyncChatModel(reply=STUCK_JSON, delay=1.0), timeout=0.05)
+        started = time.perf_counter()
+        result = await tool.arun({"current_question": "他是谁？", "current_brainchain": "链"})
+        assert result["is_stuck"] is False
+        assert "超时" in result["reasoning"]
+        assert time.perf_counter() - started < 0.5
+
+    def test_sync_run(self):
+        tool = DetectStuckTool(llm=SlowChatModel(reply=STUCK_JSON, delay=0.0))
+        result = tool.run({"current_question": "他是谁？", "current_brainchain": "链"})
+        assert result["is_stuck"] is True
@@ -0,0 +1,160 @@
+""" 测试只保留最新检查点的本地检查点存储 """
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import pytest
+from langgraph.types import Command
+from langgraph.checkpoint.base.id import uuid6
+from src.utils.checkpointer import LatestCheckpointSaver, SqliteCheckpointSaver, build_checkpointer
+from src.workflow import build_graph, build_workflow_nodes, session_config
+from src.state_schema import GameState
+
+
+def idle_state() -> dict:
+    return GameState(player_action="None").model_dump()
+
+
+def blob_keys(saver: LatestCheckpointSaver, thread_id: str) -> list:
+    return [key for key in saver.blobs if key[0] == thread_id]
+
+
+class TestLatestCheckpointSaver:
+    """每个会话只保留最新检查点"""
+
+    @pytest.mark.asyncio
+    async def test_history_does_not_grow_with_turns(self):
+        saver = LatestCheckpointSaver()
+        graph = build_graph(checkpointer=saver)
+        config = session_config(build_workflow_nodes(), "game_001")
+
+        sizes = []
+        for _ in range(3):
+            await graph.ainvoke(idle_state(), config)
+            result = await graph.ainvoke(
+                Command(resume={"player_action": "question", "current_question": "他是司机吗？"}), config
+            )
+            assert result["detection_result"]["path_similarity"] == 0.8
+            assert len(saver.storage["game_001"][""]) == 1
+            sizes.append(len(blob_keys(saver, "game_001")))
+        assert sizes[0] == sizes[-1]
+        assert saver.thread_count == 1
+
+    @pytest.mark.asyncio
+    async def test_delete_thread(self):
+        saver = LatestCheckpointSaver()
+        graph = build_graph(checkpointer=saver)
+        nodes = build_workflow_nodes()
+        for thread_id in ("a", "b"):
+            await graph.ainvoke(idle_state(), session_config(nodes, thread_id))
+
+        saver.delete_thread("a")
+        assert blob_keys(saver, "a") == []
+        assert not any(key[0] == "a" for key in saver.writes)
+        assert saver.thread_count == 1
+        assert graph.get_state(session_config(nodes, "b")).next == ("Get_player_action",)
+
+
+def table_rows(saver: SqliteCheckpointSaver, table: str, thread_id: str) -> int:
+    return saver._conn.execute(f"SELECT COUNT(*) FROM {table} WHERE thread_id = ?", (thread_id,)).fetchone()[0]
+
+
+class TestSqliteCheckpointSaver:
+    """SQLite 检查点：跨进程重启恢复，每步只写变化的通道"""
+
+    @pytest.mark.asyncio
+    async def test_resume_after_restart(self, tmp_path):
+        path = tmp_path / "checkpoints.sqlite"
+        saver = SqliteCheckpointSaver(path)
+        await build_graph(checkpointer=saver).ainvoke(idle_state(), session_config(build_workflow_nodes(), "game_001"))
+        saver.close()
+
+        # 新的存储实例与新编译的图，相当于重启后的进程
+        saver = SqliteCheckpointSaver(path)
+        graph = build_graph(checkpointer=saver)
+        config = session_config(build_workflow_nodes(), "game_001")
+        assert graph.get_state(config).next == ("Get_player_action",)
+
+        result = await graph.ainvoke(
+            Command(resume={"player_action": "question", "current_question": "他是司机吗？"}), config
+        )
+        assert result["current_question"] == "他是司机吗？"
+        assert result["current_host_reply"]
+        assert graph.get_state(config).next == ()
+        saver.close()
+
+    @pytest.mark.asyncio
+    async def test_keeps_latest_checkpoint_only(self, tmp_path):
+        saver = SqliteCheckpointSaver(tmp_path / "checkpoints.sqlite")
+        graph = build_graph(checkpointer=saver)
+        config = session_config(build_workflow_nodes(), "game_001")
+
+        blob_counts = []
+        for _ in range(3):
+            await graph.ainvoke(idle_state(), config)
+            await graph.ainvoke(Command(resume={"player_action": "question", "current_question": "他是司机吗？"}), config)
+            assert table_rows(saver, "checkpoints", "game_001") == 1
+            blob_counts.append(table_rows(saver, "blobs", "game_001"))
+        assert blob_counts[0] == blob_counts[-1]
+        assert len(list(saver.list(config))) == 1
+
+        saver.delete_thread("game_001")
+        assert saver.thread_count == 0
+        assert all(table_rows(saver, t, "game_001") == 0 for t in ("checkpoints", "blobs", "writes"))
+        saver.close()
+
+    @pytest.mark.asyncio
+    async def test_writes_only_changed_channels(self, tmp_path):
+        saver = SqliteCheckpointSaver(tmp_path / "checkpoints.sqlite")
+        config = session_config(build_workflow_nodes(), "game_001")
+        await build_graph(checkpointer=saver).ainvoke(idle_state(), config)
+        checkpoint = saver.get_tuple(config)
+
+        before = saver._conn.total_changes
+        saver.put(
+            checkpoint.config,
+            {**checkpoint.checkpoint, "id": str(uuid6())},
+            checkpoint.metadata,
+            {}
+        )
+        # 没有通道变化：只替换 checkpoints 中的一行并清理旧检查点的待写入记录
+        assert saver._conn.total_changes - before <= 1 + len(checkpoint.pending_writes)
+        assert saver.get_tuple(config).checkpoint["channel_values"] == checkpoint.checkpoint["channel_values"]
+        saver.close()
+
+    @pytest.mark.asyncio
+    async def test_superseded_checkpoint_id_raises(self, tmp_path):
+        """只保留最新检查点：按旧的 checkpoint_id 读取时明确报错，而不是当作会话不存在"""
+        saver = SqliteCheckpointSaver(tmp_path / "checkpoints.sqlite")
+        graph = build_graph(checkpointer=saver)
+        config = session_config(build_workflow_nodes(), "game_001")
+        await graph.ainvoke(idle_state(), config)
+        old = saver.get_tuple(config).config
+        await graph.ainvoke(Command(resume={"player_action": "question", "current_question": "他是司机吗？"}), config)
+
+        latest = saver.get_tuple(config)
+        assert saver.get_tuple(latest.config).checkpoint["id"] == latest.checkpoint["id"]
+        with pytest.raises(ValueError, match="已被替换"):
+            saver.get_tuple(old)
+        with pytest.raises(ValueError):
+            saver.get_tuple({"configurable": {**config["configurable"], "checkpoint_id": str(uuid6())}})
+        # 会话本身不存在时仍返回 None
+        assert saver.get_tuple({"configurable": {"thread_id": "unknown", "checkpoint_id": str(uuid6())}}) is None
+        saver.close()
+
+
+def test_build_checkpointer(tmp_path):
+    assert build_checkpointer({"backend": "none"}) is None
+    assert isinstance(build_checkpointer({"backend": "memory"}), LatestCheckpointSaver)
+    saver = build_checkpointer({"backend": "sqlite", "sqlite_path": tmp_path / "c.sqlite"})
+    assert isinstance(saver, SqliteCheckpointSaver)
+    saver.close()
+    with pytest.raises(ValueError):
+        build_checkpointer({"backend": "redis"})
+
+
+def test_auto_backend_skips_checkpointer_for_reply_first():
+    """auto 在回复优先模式下不创建检查点，保留回复与后台簿记的重叠"""
+    assert isinstance(build_checkpointer({"backend": "auto"}), LatestCheckpointSaver)
+    assert build_checkpointer({"backend": "auto"}, reply_first=True) is None
+    assert isinstance(build_checkpointer({"backend": "memory"}, reply_first=True), LatestCheckpointSaver)
@@ -0,0 +1,40 @@
+""" 测试流式 JSON 字段提取 """
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import json
+from src.utils.json_stream import JsonFieldExtractor
+
+
+def feed_all(text: str, field: str = "host_reply", size: int = 1) -> str:
+    extractor = JsonFieldExtractor(field)
+    pieces = [extractor.feed(text[i:i + size]) for i in range(0, len(text), size)]
+    assert extractor.done
+    return "".join(pieces)
+
+
+def test_extracts_field_across_chunks():
+    """任意切分方式下都能还原字段值，且忽略其他字段与嵌套对象中的同名键"""
+    payload = {
+        "meta": {"host_reply": "嵌套"},
+        "notes": "含有 \"host_reply\": 的说明",
+        "host_reply": "是的，他是司机\n\"下班\"了 🚌 \\ end",
+        "reply_type": "yes",
+    }
+    for ensure_ascii in (True, False):
+        text = json.dumps(payload, ensure_ascii=ensure_ascii)
+        for size in (1, 3, 7, len(text)):
+            assert feed_all(text, size=size) == payload["host_reply"]
+
+
+def test_stops_after_field_and_skips_non_string():
+    """字段结束后不再输出；字段不是字符串时放弃提取"""
+    extractor = JsonFieldExtractor("host_reply")
+    assert extractor.feed('```json\n{"host_reply": "是"') == "是"
+    assert extractor.feed(', "notes": "无关"}') == ""
+    assert extractor.value == "是"
+
+    extractor = JsonFieldExtractor("host_reply")
+    assert extractor.feed('{"host_reply": null, "x": "y"}') == ""
+    assert extractor.done
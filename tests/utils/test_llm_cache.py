@@ -0,0 +1,56 @@
+""" 测试 LLM 响应缓存 """
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.utils.llm_cache import TieredLLMCache, build_llm_cache
+
+
+class TestTieredLLMCache:
+    """LRU + SQLite 两级精确匹配缓存"""
+
+    @pytest.mark.asyncio
+    async def test_identical_prompt_skips_model(self):
+        """相同提示词第二次调用直接命中缓存，不同提示词仍然请求模型"""
+        cache = TieredLLMCache(memory_size=8)
+        llm = FakeListChatModel(responses=["是", "否", "无关"], cache=cache)
+
+        assert (await llm.ainvoke("他是司机吗？")).content == "是"
+        assert (await llm.ainvoke("他是司机吗？")).content == "是"
+        assert (await llm.ainvoke("他下班了吗？")).content == "否"
+        assert llm.i == 2
+        assert cache.stats == {"memory_hits": 1, "sqlite_hits": 0, "misses": 2, "hit_rate": 1 / 3}
+
+    def test_sqlite_tier_survives_new_process(self, tmp_path):
+        """SQLite 层在新的缓存实例中仍然可用，并回填 LRU 层"""
+        path = tmp_path / "llm_cache.sqlite"
+        first = FakeListChatModel(responses=["是"], cache=TieredLLMCache(sqlite_path=path))
+        first.invoke("他是司机吗？")
+        first.cache.sqlite.close()
+
+        # 模型参数（包括 responses）相同才会命中，因此用调用计数确认没有请求模型
+        cache = TieredLLMCache(sqlite_path=path)
+        replay = FakeListChatModel(responses=["是"], cache=cache)
+        assert replay.invoke("他是司机吗？").content == "是"
+        assert replay.invoke("他是司机吗？").content == "是"
+        assert replay.i == 0
+        assert (cache.sqlite_hits, cache.memory_hits) == (1, 1)
+
+    def test_lru_eviction_and_model_params_in_key(self):
+        """LRU 超出容量时淘汰最久未用的条目；模型参数不同不会串用"""
+        cache = TieredLLMCache(memory_size=1)
+        cache.update("a", "model-x", ["A"])
+        cache.update("b", "model-x", ["B"])
+        assert cache.lookup("a", "model-x") is None
+        assert cache.lookup("b", "model-x") == ["B"]
+        assert cache.lookup("b", "model-y") is None
+
+    def test_build_from_config(self, tmp_path):
+        assert build_llm_cache({"backend": "none"}) is None
+        assert build_llm_cache({"backend": "memory"}).sqlite is None
+        cache = build_llm_cache({"backend": "sqlite", "sqlite_path": tmp_path / "c.sqlite"})
+        assert cache.memory is not None and cache.sqlite is not None
+        with pytest.raises(ValueError):
+            build_llm_cache({"backend": "redis"})
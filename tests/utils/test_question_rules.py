@@ -0,0 +1,58 @@
+""" 测试开放式问题的本地规则分类 """
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import pytest
+from src.utils.question_rules import classify_question, normalize_question
+
+
+@pytest.mark.parametrize("question", [
+    "为什么他要下车？",
+    "他怎么死的？",
+    "请你分析一下他的动机",
+    "你觉得凶手是谁？",
+    "他的职业是什么？",
+    "他是司机还是乘客？",
+    "他死了还是活着",
+    "请你解释一下他为什么下车",
+    "这件事发生在哪一天？",
+    "谁知道他是凶手？",
+])
+def test_open_questions(question):
+    assert classify_question(question).is_open
+
+
+@pytest.mark.parametrize("question", [
+    "他是司机吗？",
+    "座位上有什么东西吗？",
+    "他是不是因为什么原因才下车的？",
+    "他有没有家人",
+    "他还是个孩子吗",
+    "他还是活着？",
+    "那个男人还是在车上？",
+    "他是司机还是乘客吗？",
+    "他在分析数据？",
+    "这说明他是司机？",
+    "他写了一份总结？",
+    "他在解释原因？",
+    "他是在描述梦境？",
+    "哪怕下雨他也会去？",
+    "他知道谁是凶手？",
+    "",
+])
+def test_closed_questions(question):
+    assert not classify_question(question).is_open
+
+
+def test_threshold_is_tunable():
+    """阈值越高越保守"""
+    verdict = classify_question("他是司机还是乘客？")
+    assert verdict.rule == "choice"
+    assert not classify_question("他是司机还是乘客？", threshold=verdict.confidence + 0.01).is_open
+
+
+def test_normalize_question():
+    """全角/半角折叠，去掉标点、空白与句末语气词"""
+    assert normalize_question("他是ＡＢＣ司机吗？ ") == "他是abc司机"
+    assert normalize_question("他是司机么!!") == normalize_question("他是司机吗?") == "他是司机"
@@ -0,0 +1,156 @@
+""" 测试 Agent 状态投影与免复制的状态更新 """
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import pytest
+from src.state_schema import GameState
+from src.utils.state_utils import AnalysisView, DetectionView, ReplyView, StructureView, with_state_update
+from src.workflow import build_graph, build_workflow_nodes
+from src.game_controller import GameController
+from src.context import GameContext, Story
+from src.mock_data import (
+    MockReplyAgent,
+    MockStructureAgent,
+    MockAnalysisAgent,
+    MockDetectionAgent,
+    MockStuckDetector,
+    MockHintTool,
+)
+
+
+def sample_state() -> GameState:
+    return GameState(
+        player_action="question",
+        current_question="他是司机吗？",
+        true_answer="他是司机",
+        current_host_reply="是的",
+        current_node_id="node_1"
+    )
+
+
+class TestStateView:
+    """只读投影"""
+
+    def test_reads_through_without_copy(self):
+        state = sample_state()
+        view = StructureView(state)
+        assert view["current_question"] == "他是司机吗？"
+        assert view.current_host_reply == "是的"
+        state.current_host_reply = "不是"
+        assert view.get("current_host_reply") == "不是"
+
+    def test_matches_dict_get_semantics(self):
+        state = sample_state()
+        full = dict(state)
+        for view_cls in (ReplyView, StructureView, DetectionView):
+            view = view_cls(state)
+            assert dict(view) == {key: full[key] for key in view_cls.FIELDS}
+            for key in view_cls.FIELDS:
+                assert view.get(key) == full.get(key)
+
+    def test_hides_undeclared_fields(self):
+        view = DetectionView(sample_state())
+        assert "true_answer" not in view
+        assert view.get("true_answer", "default") == "default"
+        with pytest.raises(KeyError):
+            view["true_answer"]
+        with pytest.raises(AttributeError):
+            view.true_answer
+        assert len(AnalysisView(sample_state())) == 0
+
+    def test_read_only(self):
+        view = ReplyView(sample_state())
+        with pytest.raises(AttributeError):
+            view.current_question = "改写"
+        with pytest.raises(TypeError):
+            view["current_question"] = "改写"
+
+    def test_accepts_plain_dict(self):
+        view = ReplyView({"current_question": "他是司机吗？", "true_answer": "他是司机"})
+        assert view.current_question == "他是司机吗？"
+
+
+class TestStateUpdates:
+    """部分更新与 copy_with_updates"""
+
+    @pytest.mark.asyncio
+    async def test_with_state_update_returns_partial(self):
+        @with_state_update
+        async def node(state):
+            return {"current_host_reply": "是的"}
+
+        @with_state_update
+        async def empty_node(state):
+            return None
+
+        assert await node(sample_state()) == {"current_host_reply": "是的"}
+        assert await empty_node(sample_state()) == {}
+
+    def test_copy_with_updates_keeps_other_fields(self):
+        state = sample_state()
+        updated = state.copy_with_updates(current_host_reply="不是")
+        assert updated.current_host_reply == "不是"
+        assert state.current_host_reply == "是的"
+        assert updated.current_question == state.current_question
+        assert updated.messages is state.messages
+
+    @pytest.mark.asyncio
+    async def test_agents_receive_views(self):
+        received = {}
+
+        def recording(mock_cls, name):
+            class Recording(mock_cls):
+                async def run(self, inputs):
+                    received[name] = inputs
+                    return await super().run(inputs)
+            return Recording()
+
+        nodes = build_workflow_nodes(
+            reply_agent=recording(MockReplyAgent, "reply"),
+            structure_agent=recording(MockStructureAgent, "structure"),
+            analysis_agent=recording(MockAnalysisAgent, "analysis"),
+            detection_agent=recording(MockDetectionAgent, "detection"),
+        )
+        await build_graph(nodes=nodes, turn_mode="multi_agent").ainvoke(sample_state().model_dump())
+        assert isinstance(received["reply"], ReplyView)
+        assert isinstance(received["structure"], StructureView)
+        assert isinstance(received["analysis"], AnalysisView)
+        assert isinstance(received["detection"], DetectionView)
+        assert received["reply"]["true_answer"] == "他是司机"
+
+
+class TestInitialState:
+    """控制器由模板构建每回合的初始状态"""
+
+    def build_controller(self) -> GameController:
+        context = GameContext(
+            game_id="test_001",
+            story=Story(story_id="test_001", content="一个男人上了公交车……", answer="他是司机")
+        )
+        return GameController(
+            reply_agent=MockReplyAgent(),
+            structure_agent=MockStructureAgent(),
+            analysis_agent=MockAnalysisAgent(),
+            detection_agent=MockDetectionAgent(),
+            hint_tool=MockHintTool(),
+            stuck_detector=MockStuckDetector(),
+            context=context
+        )
+
+    def test_matches_game_state_dump(self):
+        controller = self.build_controller()
+        state = controller._initial_state("他是司机吗？", "question", None)
+        expected = GameState(player_action="question", current_question="他是司机吗？", true_answer="他是司机").model_dump()
+        assert state.keys() == expected.keys()
+        for key in expected.keys() - {"timestamp", "current_timestamp"}:
+            assert state[key] == expected[key]
+        assert GameState.model_validate(state).true_answer == "他是司机"
+
+    def test_fresh_per_turn(self):
+        controller = self.build_controller()
+        first = controller._initial_state("问题1", "question", None)
+        second = controller._initial_state("问题2", "question", None)
+        assert first["messages"] is not second["messages"]
+        assert second["timestamp"] >= first["timestamp"]
+        assert controller._turn_template["current_question"] is None
@@ -0,0 +1,15 @@
+""" 测试本地 token 估算 """
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.utils.token_utils import estimate_tokens
+
+
+def test_estimate_tokens():
+    """中文按字、英文按字符数/4 估算"""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("他是司机吗") == 5
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("是 yes") == 2
+    assert estimate_tokens("🔮") == 1